@@ -0,0 +1,126 @@
+"""
+Compares YOLOv8 output decoding strategies on synthetic model outputs.
+
+`per-anchor` is a direct Python port of the loop in the C++
+OnnxRuntimeEngine::process_frame: one max over the class scores per anchor,
+boxes built one at a time, then OpenCV's NMS. `vectorized` is
+perception.postprocess.decode_batch, which decodes the whole batch with array
+operations and a single class-aware NMS pass. No model or GPU is needed.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from perception.onnx_engine import CLASS_NAMES, OnnxRuntimeEngine
+from perception.postprocess import decode_batch, nms
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+SCORE_THRESHOLD = OnnxRuntimeEngine.SCORE_THRESHOLD
+NMS_THRESHOLD = OnnxRuntimeEngine.NMS_THRESHOLD
+
+
+def synthetic_outputs(batch: int, input_size: int, objects: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Builds (batch, 4 + classes, anchors) outputs shaped like a 1280px YOLOv8
+    head: background anchors score low, and a few hundred anchors around
+    each of `objects` objects score above the threshold with jittered boxes.
+    """
+    anchors = sum((input_size // stride) ** 2 for stride in (8, 16, 32))
+    outputs = np.empty((batch, 4 + len(CLASS_NAMES), anchors), dtype=np.float32)
+    outputs[:, 0:2] = rng.uniform(0, input_size, (batch, 2, anchors))
+    outputs[:, 2:4] = rng.uniform(4, 200, (batch, 2, anchors))
+    outputs[:, 4:] = rng.uniform(0, 0.3, (batch, len(CLASS_NAMES), anchors))
+
+    for image in range(batch):
+        for _ in range(objects):
+            centre = rng.uniform(100, input_size - 100, 2)
+            size = rng.uniform(20, 200, 2)
+            cluster = rng.choice(anchors, 20, replace=False)
+            outputs[image][0:2, cluster] = centre[:, None] + rng.normal(0, 3, (2, 20))
+            outputs[image][2:4, cluster] = size[:, None] + rng.normal(0, 3, (2, 20))
+            outputs[image, 4 + rng.integers(len(CLASS_NAMES)), cluster] = rng.uniform(0.5, 0.95, 20)
+    return outputs
+
+
+def decode_per_anchor(output: np.ndarray) -> List[int]:
+    """Python port of the C++ per-anchor decode loop for one image."""
+    mat_t = output.T
+    class_ids, confidences, boxes = [], [], []
+    for row in mat_t:
+        scores = row[4:]
+        class_id = int(scores.argmax())
+        max_score = float(scores[class_id])
+        if max_score > SCORE_THRESHOLD:
+            confidences.append(max_score)
+            class_ids.append(class_id)
+            cx, cy, w, h = row[:4]
+            boxes.append([int(cx - 0.5 * w), int(cy - 0.5 * h), int(w), int(h)])
+
+    if cv2 is not None:
+        return list(np.asarray(cv2.dnn.NMSBoxes(boxes, confidences, SCORE_THRESHOLD, NMS_THRESHOLD)).reshape(-1))
+    rects = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    rects[:, 2:] += rects[:, :2]
+    return list(nms(rects, np.asarray(confidences, dtype=np.float32), NMS_THRESHOLD))
+
+
+def time_per_frame(fn, repeats: int, frames: int) -> float:
+    """Returns the best-of-`repeats` wall time of `fn()` in milliseconds per frame."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0 / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YOLOv8 output decoding.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--input-size", type=int, default=1280)
+    parser.add_argument("--objects", type=int, default=30, help="Objects per synthetic frame.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=None, help="Write results as JSON to this file.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = []
+    for batch in args.batch_sizes:
+        outputs = synthetic_outputs(batch, args.input_size, args.objects, rng)
+        loop_ms = time_per_frame(lambda: [decode_per_anchor(output) for output in outputs], args.repeats, batch)
+        vector_ms = time_per_frame(lambda: decode_batch(outputs, SCORE_THRESHOLD, NMS_THRESHOLD),
+                                   args.repeats, batch)
+        detections = sum(len(scores) for _, scores, _ in decode_batch(outputs, SCORE_THRESHOLD, NMS_THRESHOLD))
+        results.append(dict(
+            batch_size=batch,
+            anchors=outputs.shape[2],
+            per_anchor_ms_per_frame=loop_ms,
+            vectorized_ms_per_frame=vector_ms,
+            speedup=loop_ms / vector_ms,
+            detections_per_frame=detections / batch,
+        ))
+
+    print(f"\n{'batch':>6}{'anchors':>9}{'per-anchor ms':>15}{'vectorized ms':>15}{'speedup':>9}{'dets/frame':>12}")
+    for r in results:
+        print(f"{r['batch_size']:>6}{r['anchors']:>9}{r['per_anchor_ms_per_frame']:>15.2f}"
+              f"{r['vectorized_ms_per_frame']:>15.2f}{r['speedup']:>8.1f}x{r['detections_per_frame']:>12.1f}")
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
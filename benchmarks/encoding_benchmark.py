@@ -0,0 +1,170 @@
+"""
+Compares the on-the-wire frame encodings used by run_simulation.py.
+
+For every encoding this reports bytes per frame, compression ratio, encode
+and decode time. When `--endpoint` points at a running inference server,
+frames are also streamed through FrameStreamer for `--duration` seconds to
+measure the end-to-end FPS each encoding achieves. No CARLA server is needed:
+frames are synthesized, or loaded from a directory of driving images such as
+the BDD100K JPEGs (which share CARLA's 1280x720 resolution).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from frame_codec import FrameEncoder, cv2, decode_frame, lz4
+from frame_protocol import ENCODINGS, FrameHeader, FrameSlot
+
+
+def synthetic_frame(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """Builds a BGRA frame with a sky gradient, road, blocky 'vehicles' and sensor noise."""
+    frame = np.empty((height, width, 4), dtype=np.uint8)
+    sky = np.linspace(230, 120, height // 2, dtype=np.float32)[:, None]
+    frame[:height // 2, :, 0] = sky
+    frame[:height // 2, :, 1] = sky * 0.8
+    frame[:height // 2, :, 2] = sky * 0.6
+    frame[height // 2:, :, :3] = 70
+    for _ in range(12):
+        x, y = rng.integers(0, width - 120), rng.integers(height // 2, height - 80)
+        frame[y:y + 80, x:x + 120, :3] = rng.integers(0, 255, 3, dtype=np.uint8)
+    noise = rng.integers(-4, 5, (height, width, 3), dtype=np.int16)
+    frame[:, :, :3] = np.clip(frame[:, :, :3].astype(np.int16) + noise, 0, 255)
+    frame[:, :, 3] = 255
+    return frame
+
+
+def load_frames(image_dir: Path, width: int, height: int, count: int) -> List[np.ndarray]:
+    """Loads up to `count` images as BGRA frames of the requested size."""
+    if cv2 is None:
+        raise SystemExit("Loading --image-dir requires OpenCV.")
+    frames = []
+    for path in sorted(image_dir.glob("*.jpg"))[:count]:
+        image = cv2.resize(cv2.imread(str(path)), (width, height))
+        frames.append(cv2.cvtColor(image, cv2.COLOR_BGR2BGRA))
+    if not frames:
+        raise SystemExit(f"No .jpg images found in {image_dir}")
+    return frames
+
+
+def available_encodings() -> List[str]:
+    names = ["raw", "bgr", "zlib"]
+    if lz4 is not None:
+        names.append("lz4")
+    if cv2 is not None:
+        names.append("jpeg")
+    return names
+
+
+def measure_codec(encoding: str, frames: List[np.ndarray], quality: int) -> dict:
+    """Encodes and decodes every frame, returning size and timing statistics."""
+    encoder = FrameEncoder(encoding, quality=quality)
+    height, width = frames[0].shape[:2]
+    slot = FrameSlot(0, width * height * 4)
+    sizes, encode_ms, decode_ms = [], [], []
+
+    for index, frame in enumerate(frames):
+        start = time.perf_counter()
+        payload = encoder.encode(slot, frame.reshape(-1).data, width, height)
+        encoded = time.perf_counter()
+
+        header = FrameHeader(index, width, height, encoder.channels, len(payload),
+                             encoder.encoding, encoder.quality)
+        decode_frame(header, payload)
+        decoded = time.perf_counter()
+
+        sizes.append(len(payload))
+        encode_ms.append((encoded - start) * 1000.0)
+        decode_ms.append((decoded - encoded) * 1000.0)
+
+    raw_size = width * height * 4
+    return dict(
+        encoding=encoding,
+        bytes_per_frame=float(np.mean(sizes)),
+        compression_ratio=raw_size / float(np.mean(sizes)),
+        encode_ms=float(np.mean(encode_ms)),
+        decode_ms=float(np.mean(decode_ms)),
+    )
+
+
+def measure_stream_fps(encoding: str, frames: List[np.ndarray], quality: int,
+                       endpoint: str, duration: float, max_in_flight: int) -> float:
+    """Streams frames to a live server as fast as it accepts them and returns acknowledged FPS."""
+    import zmq
+    from frame_streamer import FrameStreamer
+
+    height, width = frames[0].shape[:2]
+    context = zmq.Context.instance()
+    streamer = FrameStreamer(
+        context, endpoint, max_in_flight=max_in_flight, policy="queue",
+        max_queue_depth=max_in_flight, frame_size=width * height * 4,
+        encoder=FrameEncoder(encoding, quality=quality)
+    ).start()
+
+    frame_id = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        frame = frames[frame_id % len(frames)]
+        streamer.submit(FrameHeader(frame_id, width, height, 4, frame.nbytes), frame.reshape(-1).data)
+        frame_id += 1
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    time.sleep(0.5)
+    streamer.close()
+    return streamer.acknowledged / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark frame encodings for the sensor stream.")
+    parser.add_argument("--encodings", nargs="+", choices=tuple(ENCODINGS), default=None,
+                        help="Encodings to compare (default: every available one).")
+    parser.add_argument("--image-dir", type=Path, default=None,
+                        help="Directory of .jpg driving images to use instead of synthetic frames.")
+    parser.add_argument("--frames", type=int, default=30, help="Number of frames to encode per mode.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--jpeg-quality", type=int, default=90)
+    parser.add_argument("--endpoint", default=None,
+                        help="Inference server endpoint for the end-to-end FPS measurement.")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="Seconds to stream per encoding when --endpoint is given.")
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--output", type=Path, default=None, help="Write results as JSON to this file.")
+    args = parser.parse_args()
+
+    if args.image_dir is not None:
+        frames = load_frames(args.image_dir, args.width, args.height, args.frames)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [synthetic_frame(args.width, args.height, rng) for _ in range(args.frames)]
+
+    results = []
+    for encoding in args.encodings or available_encodings():
+        result = measure_codec(encoding, frames, args.jpeg_quality)
+        if args.endpoint:
+            result["end_to_end_fps"] = measure_stream_fps(
+                encoding, frames, args.jpeg_quality, args.endpoint, args.duration, args.max_in_flight
+            )
+        results.append(result)
+
+    print(f"\n{'encoding':<10}{'bytes/frame':>14}{'ratio':>8}{'encode ms':>12}{'decode ms':>12}{'e2e FPS':>10}")
+    for r in results:
+        fps = f"{r['end_to_end_fps']:.1f}" if "end_to_end_fps" in r else "-"
+        print(f"{r['encoding']:<10}{r['bytes_per_frame']:>14,.0f}{r['compression_ratio']:>8.1f}"
+              f"{r['encode_ms']:>12.2f}{r['decode_ms']:>12.2f}{fps:>10}")
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Measures the end-to-end frame path camera callback -> ZMQ -> inference server.
+
+Synthetic camera frames are submitted through FrameStreamer exactly as
+run_simulation.camera_callback does, so no CARLA server is needed. Every
+combination of `--resolutions`, `--rates` and `--in-flight` is run for
+`--duration` seconds after a warm-up, and throughput, round-trip latency
+percentiles and the per-stage timings reported by the server are printed.
+
+Results can be written as JSON with `--output` (tagged with the git commit)
+and compared against an earlier run with `--baseline`, so regressions show up
+between commits:
+
+    python benchmarks/server_benchmark.py --output before.json
+    python benchmarks/server_benchmark.py --baseline before.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import zmq
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from encoding_benchmark import synthetic_frame
+from frame_codec import FrameEncoder
+from frame_protocol import ENCODINGS, FrameHeader
+from frame_streamer import FrameStreamer
+
+PERCENTILES = (50, 95, 99)
+
+
+def parse_resolution(text: str) -> Tuple[int, int]:
+    width, _, height = text.partition("x")
+    return int(width), int(height)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(samples: List[float]) -> dict:
+    if not samples:
+        return {}
+    values = np.asarray(samples)
+    summary = {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+    summary["mean"] = float(values.mean())
+    return summary
+
+
+class ReplyCollector:
+    """Gathers the replies that arrive inside the measurement window."""
+
+    def __init__(self):
+        self.window = (float("inf"), float("inf"))
+        self.latencies = []
+        self.stages = defaultdict(list)
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, reply, latency_ms):
+        now = time.perf_counter()
+        if not self.window[0] <= now < self.window[1]:
+            return
+        with self._lock:
+            if reply.get("status") != "OK":
+                self.errors += 1
+                return
+            self.latencies.append(latency_ms)
+            for stage, duration_ms in (reply.get("stages") or {}).items():
+                self.stages[stage].append(duration_ms)
+
+
+def run_config(context, args, width: int, height: int, rate: float, in_flight: int, frames: list) -> dict:
+    """Streams frames at `rate` fps per sensor (0 = as fast as the server replies) and measures the replies."""
+    collector = ReplyCollector()
+    streamer = FrameStreamer(
+        context, args.endpoint,
+        max_in_flight=in_flight,
+        policy="queue" if rate == 0 else args.policy,
+        on_reply=collector,
+        frame_size=width * height * 4,
+        encoder=FrameEncoder(args.encoding, quality=args.jpeg_quality),
+        sensor_count=args.sensors,
+        shared_memory=args.shared_memory
+    ).start()
+
+    submit_ms = []
+    frame = 0
+    start = time.perf_counter()
+    collector.window = (start + args.warmup, start + args.warmup + args.duration)
+    measured_from = None
+    try:
+        while time.perf_counter() < collector.window[1]:
+            if measured_from is None and time.perf_counter() >= collector.window[0]:
+                measured_from = streamer.stats()
+
+            if rate:
+                delay = start + frame / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                # Keep the window full without letting frames queue up and be dropped.
+                streamer.wait_for_backlog(max(in_flight - args.sensors, 0), timeout=1.0)
+
+            payload = frames[frame % len(frames)]
+            for sensor_id in range(args.sensors):
+                header = FrameHeader(frame=frame, width=width, height=height, channels=4,
+                                     payload_size=len(payload), sensor_id=sensor_id)
+                submitted_at = time.perf_counter()
+                streamer.submit(header, payload)
+                if measured_from is not None:
+                    submit_ms.append((time.perf_counter() - submitted_at) * 1000.0)
+            frame += 1
+        measured_to = streamer.stats()
+    finally:
+        streamer.close()
+
+    measured_from = measured_from or {}
+    sent = measured_to["sent"] - measured_from.get("sent", 0)
+    dropped = measured_to["dropped"] - measured_from.get("dropped", 0)
+    stages = {"submit": summarize(submit_ms), "round_trip": summarize(collector.latencies)}
+    stages.update({stage: summarize(samples) for stage, samples in sorted(collector.stages.items())})
+    return dict(
+        width=width,
+        height=height,
+        rate=rate,
+        max_in_flight=in_flight,
+        sensors=args.sensors,
+        encoding=args.encoding,
+        shared_memory=args.shared_memory,
+        sent_fps=sent / args.duration,
+        throughput_fps=len(collector.latencies) / args.duration,
+        dropped=dropped,
+        errors=collector.errors,
+        latency_ms=stages["round_trip"],
+        stages_ms=stages,
+    )
+
+
+def config_key(result: dict) -> tuple:
+    return (result["width"], result["height"], result["rate"], result["max_in_flight"],
+            result["sensors"], result["encoding"], result.get("shared_memory", False))
+
+
+def print_results(results: List[dict], baseline: Optional[dict]):
+    print(f"\n{'resolution':>11}{'rate':>6}{'window':>7}{'sent/s':>8}{'done/s':>8}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'dropped':>8}{'errors':>7}")
+    for r in results:
+        latency = r["latency_ms"]
+        print(f"{r['width']:>6}x{r['height']:<4}{r['rate'] or 'max':>6}{r['max_in_flight']:>7}"
+              f"{r['sent_fps']:>8.1f}{r['throughput_fps']:>8.1f}"
+              f"{latency.get('p50', float('nan')):>9.2f}{latency.get('p95', float('nan')):>9.2f}"
+              f"{latency.get('p99', float('nan')):>9.2f}{r['dropped']:>8}{r['errors']:>7}")
+        stage_means = ", ".join(f"{stage} {summary['mean']:.2f}" for stage, summary in r["stages_ms"].items()
+                                if summary and stage != "round_trip")
+        print(f"{'':>11}mean stage ms: {stage_means}")
+
+        previous = baseline.get(config_key(r)) if baseline else None
+        if previous and previous["throughput_fps"] and previous["latency_ms"] and latency:
+            print(f"{'':>11}vs baseline {previous.get('commit') or ''}: "
+                  f"throughput {r['throughput_fps'] / previous['throughput_fps'] - 1:+.1%}, "
+                  f"p99 {latency['p99'] / previous['latency_ms']['p99'] - 1:+.1%}")
+
+
+def load_baseline(path: Path) -> dict:
+    document = json.loads(path.read_text())
+    return {config_key(r): dict(r, commit=document.get("commit")) for r in document["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the inference server end to end.")
+    parser.add_argument("--endpoint", default="tcp://localhost:5555", help="ZMQ endpoint of the inference server.")
+    parser.add_argument("--resolutions", type=parse_resolution, nargs="+", default=[(1280, 720)],
+                        metavar="WxH", help="Camera resolutions to test.")
+    parser.add_argument("--rates", type=float, nargs="+", default=[0],
+                        help="Frames per second per sensor; 0 sends as fast as the server replies.")
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 4],
+                        help="Maximum frames awaiting a reply (client concurrency).")
+    parser.add_argument("--sensors", type=int, default=1, help="Number of simulated cameras.")
+    parser.add_argument("--policy", default="latest", help="Backpressure policy for fixed rates.")
+    parser.add_argument("--encoding", choices=tuple(ENCODINGS), default="raw")
+    parser.add_argument("--jpeg-quality", type=int, default=90)
+    parser.add_argument("--shared-memory", action="store_true",
+                        help="Pass frames through shared memory instead of the socket (same host, "
+                             "inference_server.py, Python 3.8+, 'raw' or 'bgr' encoding).")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per configuration.")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each measurement.")
+    parser.add_argument("--output", type=Path, default=None, help="Write results as JSON to this file.")
+    parser.add_argument("--baseline", type=Path, default=None, help="Compare against results from --output.")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    context = zmq.Context()
+    rng = np.random.default_rng(0)
+    results = []
+    for width, height in args.resolutions:
+        # A few distinct frames, so compressing encodings do not see the same bytes every time.
+        frames = [synthetic_frame(width, height, rng).reshape(-1).data for _ in range(8)]
+        for rate in args.rates:
+            for in_flight in args.in_flight:
+                print(f"Running {width}x{height} at {rate or 'max'} fps with {in_flight} in flight...")
+                results.append(run_config(context, args, width, height, rate, in_flight, frames))
+    context.term()
+
+    print_results(results, baseline)
+
+    if args.output is not None:
+        document = dict(
+            commit=git_commit(),
+            timestamp=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            host=platform.node(),
+            endpoint=args.endpoint,
+            results=results,
+        )
+        args.output.write_text(json.dumps(document, indent=2))
+        print(f"\nResults written to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,92 @@
+from collections import namedtuple
+
 import carla
 
+# Camera mounting transforms relative to the parent vehicle, keyed by position.
+CAMERA_MOUNTS = {
+    'front': carla.Transform(carla.Location(z=1.8)),
+    'left': carla.Transform(carla.Location(z=1.8), carla.Rotation(yaw=-90)),
+    'right': carla.Transform(carla.Location(z=1.8), carla.Rotation(yaw=90)),
+    'rear': carla.Transform(carla.Location(z=1.8), carla.Rotation(yaw=180)),
+}
+
+# Describes one camera of a rig. `fps=None` lets the camera capture on every simulation tick.
+CameraSpec = namedtuple('CameraSpec', ['mount', 'width', 'height', 'fps'], defaults=('front', 1280, 720, None))
+
+# A spawned rig camera; `sensor_id` tags its frames on the wire.
+RigCamera = namedtuple('RigCamera', ['sensor_id', 'vehicle', 'spec', 'actor'])
+
+
 class CarlaActorFactory:
-    def __init__(self, world, blueprint_library):
+    def __init__(self, world, blueprint_library, client=None):
         self.world = world
         self.bp_lib = blueprint_library
+        # Batched spawning goes through the client; single spawns only need the world.
+        self.client = client
 
     def create_vehicle(self, blueprint_id, spawn_point):
         vehicle_bp = self.bp_lib.find(blueprint_id)
         vehicle = self.world.spawn_actor(vehicle_bp, spawn_point)
         return vehicle
-    
-    def create_camera(self, parent_actor):
-        camera_bp = self.bp_lib.find('sensor.camera.rgb')
-        camera_bp.set_attribute('image_size_x', '1280')
-        camera_bp.set_attribute('image_size_y', '720')
-        camera_transform = carla.Transform(carla.Location(z=1.8))
-        camera = self.world.spawn_actor(camera_bp, camera_transform, attach_to = parent_actor)
+
+    def create_camera(self, parent_actor, spec=None):
+        spec = spec or CameraSpec()
+        camera_bp = self._camera_blueprint(spec)
+        camera = self.world.spawn_actor(camera_bp, CAMERA_MOUNTS[spec.mount], attach_to = parent_actor)
         return camera
+
+    def create_vehicles(self, blueprint_id, spawn_points, autopilot=True):
+        """
+        Spawns one vehicle per spawn point in a single batch. Spawn points that
+        are blocked are skipped, so fewer vehicles than requested may be returned.
+        """
+        vehicle_bp = self.bp_lib.find(blueprint_id)
+        commands = []
+        for spawn_point in spawn_points:
+            command = carla.command.SpawnActor(vehicle_bp, spawn_point)
+            if autopilot:
+                command = command.then(carla.command.SetAutopilot(carla.command.FutureActor, True))
+            commands.append(command)
+
+        return self._spawn_batch(commands)
+
+    def create_camera_rig(self, vehicles, camera_specs):
+        """
+        Attaches every camera in `camera_specs` to every vehicle using a single
+        apply_batch call. Sensor ids are assigned in vehicle-major order.
+
+        Returns:
+            A list of RigCamera tuples for the cameras that spawned successfully.
+        """
+        placements = [(vehicle, spec) for vehicle in vehicles for spec in camera_specs]
+        commands = [
+            carla.command.SpawnActor(self._camera_blueprint(spec), CAMERA_MOUNTS[spec.mount], vehicle.id)
+            for vehicle, spec in placements
+        ]
+        responses = self.client.apply_batch_sync(commands)
+
+        rig = []
+        actors = {actor.id: actor for actor in self.world.get_actors([r.actor_id for r in responses if not r.error])}
+        for sensor_id, ((vehicle, spec), response) in enumerate(zip(placements, responses)):
+            if response.error:
+                print(f"Could not spawn {spec.mount} camera on vehicle {vehicle.id}: {response.error}")
+                continue
+            rig.append(RigCamera(sensor_id, vehicle, spec, actors[response.actor_id]))
+        return rig
+
+    def _camera_blueprint(self, spec):
+        camera_bp = self.bp_lib.find('sensor.camera.rgb')
+        camera_bp.set_attribute('image_size_x', str(spec.width))
+        camera_bp.set_attribute('image_size_y', str(spec.height))
+        if spec.fps:
+            camera_bp.set_attribute('sensor_tick', str(1.0 / spec.fps))
+        return camera_bp
+
+    def _spawn_batch(self, commands):
+        responses = self.client.apply_batch_sync(commands)
+        for response in responses:
+            if response.error:
+                print(f"Could not spawn actor: {response.error}")
+        actor_ids = [r.actor_id for r in responses if not r.error]
+        actors = {actor.id: actor for actor in self.world.get_actors(actor_ids)}
+        return [actors[actor_id] for actor_id in actor_ids]
@@ -0,0 +1,109 @@
+import zlib
+
+import numpy as np
+
+from frame_protocol import (
+    ENCODING_BGR, ENCODING_JPEG, ENCODING_LZ4, ENCODING_RAW, ENCODING_ZLIB, ENCODINGS
+)
+
+# --- Optional codecs ---
+# LZ4 and JPEG need extra packages; the other encodings only need numpy.
+try:
+    import lz4.block
+except ImportError:
+    lz4 = None
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+
+def _require(encoding):
+    if encoding == ENCODING_LZ4 and lz4 is None:
+        raise ValueError("The 'lz4' encoding requires the lz4 package (pip install lz4)")
+    if encoding == ENCODING_JPEG and cv2 is None:
+        raise ValueError("The 'jpeg' encoding requires OpenCV (pip install opencv-python-headless)")
+
+
+class FrameEncoder:
+    """
+    Encodes camera frames for the wire in one of the protocol ENCODINGS.
+
+    Encoding happens in two steps so the zero-copy path is preserved:
+    `fill` runs in the sensor callback and copies the BGRA camera buffer
+    into a ring slot, dropping the alpha channel on the way when the
+    encoding does not need it; `compress` runs on the sender thread and
+    returns the slot view untouched for 'raw'/'bgr', or a new compressed
+    buffer otherwise.
+    """
+
+    def __init__(self, encoding="raw", quality=90, zlib_level=1):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding '{encoding}', expected one of {tuple(ENCODINGS)}")
+
+        self.name = encoding
+        self.encoding = ENCODINGS[encoding]
+        self.quality = quality if self.encoding == ENCODING_JPEG else 0
+        self.zlib_level = zlib_level
+        self.channels = 4 if self.encoding == ENCODING_RAW else 3
+        self.compressed = self.encoding not in (ENCODING_RAW, ENCODING_BGR)
+        _require(self.encoding)
+
+    def fill(self, slot, raw_data, width, height):
+        """Copies a BGRA camera buffer into `slot` in this encoding's pixel layout."""
+        if self.channels == 4:
+            slot.fill(raw_data)
+            return
+
+        bgra = np.frombuffer(raw_data, dtype=np.uint8).reshape(height, width, 4)
+        bgr = np.frombuffer(slot.reserve(height * width * 3), dtype=np.uint8).reshape(height, width, 3)
+        np.copyto(bgr, bgra[:, :, :3])
+
+    def compress(self, view, width, height):
+        """Returns the wire payload for a slot view produced by `fill`."""
+        if not self.compressed:
+            return view
+        if self.encoding == ENCODING_ZLIB:
+            return zlib.compress(view, self.zlib_level)
+        if self.encoding == ENCODING_LZ4:
+            return lz4.block.compress(view, store_size=False)
+
+        bgr = np.frombuffer(view, dtype=np.uint8).reshape(height, width, 3)
+        ok, jpeg = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return jpeg.reshape(-1).data
+
+    def encode(self, slot, raw_data, width, height):
+        """Convenience for callers that fill and compress on the same thread."""
+        self.fill(slot, raw_data, width, height)
+        return self.compress(slot.view, width, height)
+
+
+def decode_frame(header, payload):
+    """
+    Decodes a frame payload into a (height, width, 3) BGR uint8 array,
+    mirroring the decoding done by the C++ server.
+    """
+    _require(header.encoding)
+    height, width = header.height, header.width
+
+    if header.encoding == ENCODING_RAW:
+        bgra = np.frombuffer(payload, dtype=np.uint8).reshape(height, width, header.channels)
+        return np.ascontiguousarray(bgra[:, :, :3])
+    if header.encoding == ENCODING_BGR:
+        pixels = payload
+    elif header.encoding == ENCODING_ZLIB:
+        pixels = zlib.decompress(payload)
+    elif header.encoding == ENCODING_LZ4:
+        pixels = lz4.block.decompress(payload, uncompressed_size=height * width * 3)
+    elif header.encoding == ENCODING_JPEG:
+        image = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None or image.shape[:2] != (height, width):
+            raise ValueError(f"Could not decode JPEG frame {header.frame}")
+        return image
+    else:
+        raise ValueError(f"Unknown frame encoding: {header.encoding}")
+
+    return np.frombuffer(pixels, dtype=np.uint8).reshape(height, width, 3)
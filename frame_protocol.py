@@ -0,0 +1,141 @@
+import struct
+import threading
+from collections import namedtuple
+
+# --- Wire format shared with src/main.cpp (include/perception/FrameProtocol.h) ---
+# Every frame is sent as two ZMQ message parts: a fixed-size little-endian
+# header followed by the pixel payload in the encoding named by the header.
+FRAME_MAGIC = b"PFRM"
+PROTOCOL_VERSION = 4
+
+# magic, version, channels, encoding, quality, frame, width, height, payload_size,
+# sensor_id, flags, capture_ns, send_ns
+HEADER_STRUCT = struct.Struct("<4sBBBBQIIIHHQQ")
+
+# Payload encodings. `channels` in the header always describes the decoded
+# image; every encoding except 'raw' drops CARLA's unused alpha channel.
+ENCODING_RAW = 0    # BGRA pixels as delivered by the camera
+ENCODING_BGR = 1    # BGR pixels
+ENCODING_ZLIB = 2   # zlib-compressed BGR pixels
+ENCODING_LZ4 = 3    # LZ4 block-compressed BGR pixels (no size prefix)
+ENCODING_JPEG = 4   # JPEG-encoded BGR image, `quality` holds the JPEG quality
+
+ENCODINGS = {
+    "raw": ENCODING_RAW,
+    "bgr": ENCODING_BGR,
+    "zlib": ENCODING_ZLIB,
+    "lz4": ENCODING_LZ4,
+    "jpeg": ENCODING_JPEG,
+}
+
+# Header flags.
+# The second message part is a shm_transport slot descriptor; the pixels, in
+# the header's encoding, are in a shared-memory segment on the same host.
+FLAG_SHARED_MEMORY = 0x1
+
+# `capture_ns` (frame handed to the streamer) and `send_ns` (frame written to
+# the socket) are Unix-epoch nanoseconds, so the server can tell queueing and
+# transport time apart from its own processing time; 0 means unknown.
+FrameHeader = namedtuple(
+    "FrameHeader",
+    ["frame", "width", "height", "channels", "payload_size", "encoding", "quality", "sensor_id",
+     "capture_ns", "send_ns", "flags"],
+    defaults=(ENCODING_RAW, 0, 0, 0, 0, 0)
+)
+
+
+def pack_header(header):
+    """Serializes a FrameHeader into its fixed binary representation."""
+    return HEADER_STRUCT.pack(
+        FRAME_MAGIC, PROTOCOL_VERSION, header.channels, header.encoding, header.quality,
+        header.frame, header.width, header.height, header.payload_size,
+        header.sensor_id, header.flags, header.capture_ns, header.send_ns
+    )
+
+
+def unpack_header(buffer):
+    """
+    Parses a binary frame header. Raises ValueError if the buffer is not a
+    header produced by this protocol version.
+    """
+    if len(buffer) != HEADER_STRUCT.size:
+        raise ValueError(f"Frame header must be {HEADER_STRUCT.size} bytes, got {len(buffer)}")
+
+    (magic, version, channels, encoding, quality, frame, width, height, payload_size, sensor_id, flags,
+     capture_ns, send_ns) = HEADER_STRUCT.unpack(buffer)
+    if magic != FRAME_MAGIC:
+        raise ValueError(f"Bad frame header magic: {magic!r}")
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported frame protocol version: {version}")
+
+    return FrameHeader(frame, width, height, channels, payload_size, encoding, quality, sensor_id,
+                       capture_ns, send_ns, flags)
+
+
+class FrameSlot:
+    """A single preallocated frame buffer handed out by FrameBufferRing."""
+
+    def __init__(self, index, capacity):
+        self.index = index
+        self.buffer = bytearray(capacity)
+        self.size = 0
+
+    @property
+    def view(self):
+        return memoryview(self.buffer)[:self.size]
+
+    def reserve(self, size):
+        """Sizes the slot for `size` bytes and returns a writable view of them."""
+        if size > len(self.buffer):
+            self.buffer = bytearray(size)
+        self.size = size
+        return self.view
+
+    def fill(self, data):
+        self.reserve(len(data))
+        self.buffer[:self.size] = data
+
+
+class FrameBufferRing:
+    """
+    A fixed ring of reusable frame buffers for zero-copy ZMQ sends.
+
+    A slot is owned by the caller from `acquire` until it is either released
+    explicitly or handed to ZMQ with `track`; in the latter case the slot only
+    becomes reusable once the MessageTracker reports that libzmq is done
+    with the buffer, so a frame is never overwritten while still on the wire.
+    """
+
+    def __init__(self, slot_count, slot_size=0):
+        self._slots = [FrameSlot(i, slot_size) for i in range(slot_count)]
+        # None = free, True = held by the caller, MessageTracker = owned by ZMQ
+        self._owners = [None] * slot_count
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Returns a free FrameSlot, or None if every slot is still in use."""
+        with self._lock:
+            for _ in range(len(self._slots)):
+                index = self._next
+                self._next = (index + 1) % len(self._slots)
+
+                owner = self._owners[index]
+                if owner is None or (owner is not True and owner.done):
+                    self._owners[index] = True
+                    return self._slots[index]
+        return None
+
+    def track(self, slot, tracker):
+        with self._lock:
+            self._owners[slot.index] = tracker
+
+    def release(self, slot):
+        with self._lock:
+            self._owners[slot.index] = None
+
+    @property
+    def in_use(self):
+        with self._lock:
+            return sum(1 for owner in self._owners
+                       if owner is True or (owner is not None and not owner.done))
@@ -0,0 +1,185 @@
+import mmap
+import queue
+import struct
+import threading
+import time
+
+from frame_protocol import HEADER_STRUCT, PROTOCOL_VERSION, pack_header, unpack_header
+
+# --- Recording container format ---
+# file header | chunk | chunk | ... | chunk index | trailer
+#
+# A chunk is a chunk header followed by `record_count` records. A record is
+# the capture time (monotonic ns), the binary frame header exactly as sent on
+# the wire and the frame payload. The index lists the file offset of every
+# chunk; if it is missing because a recording was cut short, readers rebuild
+# it by walking the chunk headers.
+RECORDING_MAGIC = b"PREC"
+RECORDING_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHH")        # magic, recording version, frame protocol version
+CHUNK_HEADER = struct.Struct("<4sIQ")       # magic, record count, record bytes
+CHUNK_MAGIC = b"CHNK"
+RECORD_PREFIX = struct.Struct("<Q")         # capture time in monotonic nanoseconds
+TRAILER = struct.Struct("<QI4s")            # index offset, chunk count, magic
+TRAILER_MAGIC = b"PIDX"
+
+
+class FrameRecorder:
+    """
+    Records frames exactly as camera_callback hands them to the streamer.
+
+    Records are packed into large in-memory chunks which a background thread
+    writes out whole, so the sensor callback only pays for one memcpy and
+    never waits on disk I/O unless every chunk buffer is still being written.
+    """
+
+    def __init__(self, path, chunk_size=64 * 1024 * 1024, buffer_count=3):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._file = open(path, "wb")
+        self._file.write(FILE_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, PROTOCOL_VERSION))
+
+        self._free = queue.Queue()
+        for _ in range(buffer_count):
+            self._free.put(bytearray(chunk_size))
+        self._full = queue.Queue()
+        self._chunk_offsets = []
+        self._lock = threading.Lock()
+        self._buffer = self._free.get()
+        self._used = 0
+        self._count = 0
+
+        self.recorded = 0
+        self._writer = threading.Thread(target=self._write_chunks, name="frame-recorder", daemon=True)
+        self._writer.start()
+
+    def record(self, header, payload, captured_ns=None):
+        """Appends one frame; `header.payload_size` must equal len(payload)."""
+        captured_ns = time.monotonic_ns() if captured_ns is None else captured_ns
+        size = RECORD_PREFIX.size + HEADER_STRUCT.size + len(payload)
+
+        with self._lock:
+            if self._used + size > len(self._buffer):
+                self._flush()
+                if size > len(self._buffer):
+                    self._buffer = bytearray(size)
+
+            offset = self._used
+            RECORD_PREFIX.pack_into(self._buffer, offset, captured_ns)
+            offset += RECORD_PREFIX.size
+            self._buffer[offset:offset + HEADER_STRUCT.size] = pack_header(header)
+            offset += HEADER_STRUCT.size
+            self._buffer[offset:offset + len(payload)] = payload
+
+            self._used += size
+            self._count += 1
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            self._flush()
+        self._full.put(None)
+        self._writer.join()
+
+        index_offset = self._file.tell()
+        self._file.write(struct.pack(f"<{len(self._chunk_offsets)}Q", *self._chunk_offsets))
+        self._file.write(TRAILER.pack(index_offset, len(self._chunk_offsets), TRAILER_MAGIC))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _flush(self):
+        if self._count:
+            self._full.put((self._buffer, self._used, self._count))
+            self._buffer = self._free.get()
+            self._used = 0
+            self._count = 0
+
+    def _write_chunks(self):
+        while True:
+            item = self._full.get()
+            if item is None:
+                return
+            buffer, used, count = item
+            self._chunk_offsets.append(self._file.tell())
+            self._file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, count, used))
+            self._file.write(memoryview(buffer)[:used])
+            if len(buffer) == self.chunk_size:
+                self._free.put(buffer)
+            else:
+                # An oversized one-off buffer; replace it with a regular one.
+                self._free.put(bytearray(self.chunk_size))
+
+
+class FrameRecording:
+    """
+    Memory-mapped reader for files written by FrameRecorder.
+
+    Iterating yields (captured_ns, FrameHeader, payload) tuples in recording
+    order, where `payload` is a zero-copy memoryview into the mapped file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, protocol_version = FILE_HEADER.unpack_from(self._map, 0)
+        if magic != RECORDING_MAGIC:
+            raise ValueError(f"'{path}' is not a frame recording")
+        if version != RECORDING_VERSION or protocol_version != PROTOCOL_VERSION:
+            raise ValueError(f"'{path}' was recorded with an incompatible format version")
+
+        self.chunks = self._read_index()
+
+    def __len__(self):
+        return sum(count for _, count, _ in self.chunks)
+
+    def __iter__(self):
+        view = memoryview(self._map)
+        for offset, count, _ in self.chunks:
+            offset += CHUNK_HEADER.size
+            for _ in range(count):
+                (captured_ns,) = RECORD_PREFIX.unpack_from(view, offset)
+                offset += RECORD_PREFIX.size
+                header = unpack_header(view[offset:offset + HEADER_STRUCT.size])
+                offset += HEADER_STRUCT.size
+                yield captured_ns, header, view[offset:offset + header.payload_size]
+                offset += header.payload_size
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _read_index(self):
+        """Returns (offset, record count, record bytes) for every chunk."""
+        size = len(self._map)
+        if size >= FILE_HEADER.size + TRAILER.size:
+            index_offset, chunk_count, magic = TRAILER.unpack_from(self._map, size - TRAILER.size)
+            if magic == TRAILER_MAGIC:
+                offsets = struct.unpack_from(f"<{chunk_count}Q", self._map, index_offset)
+                return [(offset,) + CHUNK_HEADER.unpack_from(self._map, offset)[1:] for offset in offsets]
+
+        # No trailer: the recording was interrupted, so walk the chunks that made it to disk.
+        chunks = []
+        offset = FILE_HEADER.size
+        while offset + CHUNK_HEADER.size <= size:
+            magic, count, used = CHUNK_HEADER.unpack_from(self._map, offset)
+            if magic != CHUNK_MAGIC or offset + CHUNK_HEADER.size + used > size:
+                break
+            chunks.append((offset, count, used))
+            offset += CHUNK_HEADER.size + used
+        print(f"Warning: '{self.path}' has no index, recovered {len(chunks)} complete chunk(s)")
+        return chunks
@@ -0,0 +1,193 @@
+import threading
+import time
+import zlib
+from collections import Counter
+
+from frame_streamer import FrameStreamer
+
+# --- Sharding strategies ---
+# round-robin:       rotate through the healthy shards frame by frame.
+# least-outstanding: pick the healthy shard with the fewest frames queued or in flight.
+# sticky:            keep each camera on one shard (rendezvous hashing), so only the
+#                    cameras of a failed shard move, and server-side state such as a
+#                    tracker keeps seeing consecutive frames.
+SHARDING_STRATEGIES = ("round-robin", "least-outstanding", "sticky")
+
+
+class Shard:
+    """One pooled connection (a FrameStreamer) to one inference endpoint."""
+
+    def __init__(self, index, endpoint, streamer, retry_interval):
+        self.index = index
+        self.endpoint = endpoint
+        self.streamer = streamer
+        self.healthy = True
+        self.retry_at = 0.0
+        # Back-off before the next retry; doubles each time a retry fails.
+        self.retry_interval = retry_interval
+        # When the shard was last given traffic again, and its reply count then.
+        self.admitted_at = float("-inf")
+        self.admitted_replies = 0
+        self.failovers = 0
+
+    def rank(self, sensor_id):
+        """Rendezvous hashing weight of this shard for a sensor; stable across runs."""
+        return zlib.crc32(f"{sensor_id}/{self.endpoint}/{self.index}".encode())
+
+
+class ShardedStreamer:
+    """
+    Spreads camera frames over several inference servers.
+
+    Each endpoint gets `connections` FrameStreamers (its own DEALER socket and
+    sender thread each), built from the same keyword arguments as a single
+    FrameStreamer. `submit` routes every frame to one shard according to
+    `strategy`; the rest of the interface (submitted, max_in_flight,
+    wait_for_submitted, wait_for_backlog, stats, close) matches FrameStreamer,
+    so callers such as SynchronousDriver can treat the pool as one streamer.
+
+    A monitor thread health-checks the shards from their traffic: a shard
+    that has had frames outstanding for `health_timeout_s` without a single
+    reply is marked down, its unsent frames are dropped and new frames fail
+    over to the remaining shards. Frames already in flight to a failed shard
+    are not resent; by then they are stale.
+
+    A failed shard is re-admitted on a timer, whatever its backlog: after
+    `retry_interval_s` it is given traffic again and judged only on the
+    frames it gets from then on. Each retry that fails doubles the back-off,
+    up to `max_retry_interval_s`, so a dead endpoint costs its cameras fewer
+    frames over time; the first reply after a retry resets it.
+    """
+
+    def __init__(self, context, endpoints, strategy="sticky", connections=1, health_timeout_s=3.0,
+                 retry_interval_s=5.0, max_retry_interval_s=60.0, health_interval_s=0.5, **streamer_options):
+        if strategy not in SHARDING_STRATEGIES:
+            raise ValueError(f"Unknown sharding strategy '{strategy}', expected one of {SHARDING_STRATEGIES}")
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+
+        self.strategy = strategy
+        self.health_timeout = health_timeout_s
+        self.retry_interval = retry_interval_s
+        self.max_retry_interval = max(max_retry_interval_s, retry_interval_s)
+        self.health_interval = health_interval_s
+        self.shards = [
+            Shard(index, endpoint, FrameStreamer(context, endpoint, **streamer_options), retry_interval_s)
+            for index, endpoint in enumerate(endpoint for endpoint in endpoints for _ in range(connections))
+        ]
+        self._next = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._monitor = None
+
+        self.submitted = 0
+
+    def start(self):
+        for shard in self.shards:
+            shard.streamer.start()
+        self._monitor = threading.Thread(target=self._run_monitor, name="shard-monitor", daemon=True)
+        self._monitor.start()
+        return self
+
+    def close(self, timeout=2.0):
+        self._stop.set()
+        if self._monitor is not None:
+            self._monitor.join(timeout)
+            self._monitor = None
+        for shard in self.shards:
+            shard.streamer.close(timeout)
+
+    @property
+    def max_in_flight(self):
+        return sum(shard.streamer.max_in_flight for shard in self.shards)
+
+    @property
+    def healthy_shards(self):
+        healthy = [shard for shard in self.shards if shard.healthy]
+        # With every shard down, keep routing so frames flow again as soon as one recovers.
+        return healthy or self.shards
+
+    def submit(self, header, payload):
+        """Routes the frame to a shard and submits it there. Returns False if it was dropped."""
+        accepted = self._route(header.sensor_id).streamer.submit(header, payload)
+        with self._changed:
+            self.submitted += 1
+            self._changed.notify_all()
+        return accepted
+
+    def _route(self, sensor_id):
+        shards = self.healthy_shards
+        if self.strategy == "sticky":
+            return max(shards, key=lambda shard: shard.rank(sensor_id))
+
+        with self._lock:
+            start = self._next % len(shards)
+            self._next += 1
+        rotated = shards[start:] + shards[:start]
+        if self.strategy == "round-robin":
+            return rotated[0]
+        return min(rotated, key=lambda shard: shard.streamer.outstanding)
+
+    def wait_for_submitted(self, count, timeout=None):
+        """Blocks until `count` frames have been submitted. Returns False on timeout."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.submitted >= count, timeout)
+
+    def wait_for_backlog(self, max_outstanding, timeout=None):
+        """
+        Blocks until at most `max_outstanding` frames are queued or awaiting a
+        reply across all shards. Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            backlogs = [shard.streamer.outstanding for shard in self.shards]
+            if sum(backlogs) <= max_outstanding:
+                return True
+            remaining = 0.05 if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # Wait for the busiest shard to make progress, re-checking the total regularly.
+            busiest = max(range(len(backlogs)), key=backlogs.__getitem__)
+            self.shards[busiest].streamer.wait_for_backlog(backlogs[busiest] - 1, min(remaining, 0.05))
+
+    def stats(self):
+        """Returns the frame counters summed over all shards."""
+        total = Counter()
+        for shard in self.shards:
+            total.update(shard.streamer.stats())
+        return dict(total, healthy_shards=sum(shard.healthy for shard in self.shards), shards=len(self.shards))
+
+    def shard_stats(self):
+        """Returns each shard's endpoint, health and frame counters."""
+        return [
+            dict(endpoint=shard.endpoint, healthy=shard.healthy, failovers=shard.failovers, **shard.streamer.stats())
+            for shard in self.shards
+        ]
+
+    def _run_monitor(self):
+        while not self._stop.wait(self.health_interval):
+            self._check_health(time.monotonic())
+
+    def _check_health(self, now):
+        for shard in self.shards:
+            if not shard.healthy:
+                if now >= shard.retry_at:
+                    shard.healthy = True
+                    shard.admitted_at = now
+                    shard.admitted_replies = shard.streamer.acknowledged
+                    print(f"Retrying inference endpoint {shard.endpoint} (shard {shard.index})")
+                continue
+
+            # Frames written off before the shard was re-admitted do not count against it.
+            stalled = min(shard.streamer.stalled_for(), now - shard.admitted_at)
+            if stalled > self.health_timeout:
+                shard.healthy = False
+                shard.failovers += 1
+                shard.retry_at = now + shard.retry_interval
+                shard.retry_interval = min(2 * shard.retry_interval, self.max_retry_interval)
+                shard.streamer.drop_pending("failover")
+                print(f"Inference endpoint {shard.endpoint} (shard {shard.index}) has not replied for "
+                      f"{stalled:.1f} s; failing over to the other shards")
+            elif shard.streamer.acknowledged > shard.admitted_replies:
+                shard.retry_interval = self.retry_interval
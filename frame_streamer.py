@@ -0,0 +1,386 @@
+import json
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+import zmq
+
+from frame_codec import FrameEncoder
+from frame_protocol import FLAG_SHARED_MEMORY, FrameBufferRing, pack_header
+
+# --- Backpressure policies ---
+# Policies apply per sensor, so one busy camera cannot starve the others.
+# latest:    keep only the newest unsent frame; a new frame replaces a queued one.
+# queue:     keep up to `max_queue_depth` unsent frames, evicting the oldest when full.
+# subsample: admit at most `max_fps` frames per second, then queue like 'queue'.
+BACKPRESSURE_POLICIES = ("latest", "queue", "subsample")
+
+
+class FrameStreamer:
+    """
+    Streams camera frames to the C++ inference server from a background thread.
+
+    The CARLA sensor callback only hands frames to `submit`, which never
+    blocks. A sender thread owns the ZMQ DEALER socket, keeps at most
+    `max_in_flight` frames outstanding on the wire and matches every reply
+    back to its frame using the `sensor_id` and `frame` echoed by the server. Throughput
+    is therefore bounded by inference time instead of by round-trip latency.
+
+    Frames are copied once into a preallocated FrameBufferRing and sent from
+    there with `copy=False`, so no per-frame buffers are allocated and ZMQ
+    never makes its own copy of the pixel data.
+
+    When the server falls behind, the backpressure policy decides which
+    frames to drop so the freshest frame is always the next one sent. Frames
+    older than `max_age_ms` are discarded instead of sent, and frames whose
+    reply does not arrive within `reply_timeout_s` are written off, which
+    keeps end-to-end latency bounded instead of queueing without limit.
+
+    The `encoder` decides what goes on the wire: alpha stripping happens
+    while the frame is copied into its slot, compression on the sender
+    thread, and the chosen encoding is announced in each frame header.
+
+    Several cameras can share one streamer: each sensor gets its own queue
+    and the sender serves the sensors' queues round-robin.
+
+    With `shared_memory=True` (client and server on the same host, Python
+    3.8+, inference_server.py only) the ring lives in a shared-memory segment
+    and only slot descriptors go over ZMQ; a slot is then held until the
+    server's reply for its frame arrives (see shm_transport).
+
+    Every frame header is stamped with its capture and send time. When
+    `metrics` (a PipelineMetrics) is given, the client-side stages and the
+    per-stage timings returned in each reply are recorded there.
+
+    A frame that fails to encode is dropped ('encode_error') and a reply
+    that cannot be parsed or whose `on_reply` callback raises is counted in
+    `reply_errors`; both are logged and the sender thread carries on. Should
+    the sender thread stop anyway (e.g. its socket fails), the next `submit`
+    raises instead of queueing frames that would never be sent.
+    """
+
+    def __init__(self, context, endpoint, max_in_flight=4, policy="latest",
+                 max_queue_depth=4, max_fps=None, max_age_ms=None,
+                 reply_timeout_s=5.0, poll_interval_ms=2, on_reply=None, frame_size=0,
+                 encoder=None, sensor_count=1, metrics=None, shared_memory=False):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy '{policy}', expected one of {BACKPRESSURE_POLICIES}")
+        if policy == "subsample" and not max_fps:
+            raise ValueError("The 'subsample' policy requires max_fps")
+
+        self.context = context
+        self.endpoint = endpoint
+        self.max_in_flight = max_in_flight
+        self.policy = policy
+        self.max_queue_depth = 1 if policy == "latest" else max_queue_depth
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.max_age = max_age_ms / 1000.0 if max_age_ms else None
+        self.reply_timeout = reply_timeout_s
+        self.poll_interval_ms = poll_interval_ms
+        self.on_reply = on_reply
+        self.encoder = encoder if encoder is not None else FrameEncoder("raw")
+        self.metrics = metrics
+        self.shared_memory = shared_memory
+
+        # Enough slots for every sensor's full queue, a full window and one
+        # frame being filled per sensor.
+        slot_count = sensor_count * (self.max_queue_depth + 1) + max_in_flight
+        if shared_memory:
+            if self.encoder.compressed:
+                raise ValueError("The shared-memory transport only carries 'raw' or 'bgr' frames")
+            if not frame_size:
+                raise ValueError("The shared-memory transport requires frame_size")
+            # Imported lazily: multiprocessing.shared_memory needs Python 3.8+.
+            from shm_transport import SharedFrameRing
+            self._ring = SharedFrameRing(slot_count, frame_size)
+        else:
+            self._ring = FrameBufferRing(slot_count, frame_size)
+        self._pending = defaultdict(deque)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        # Signalled whenever a frame is submitted or leaves the backlog.
+        self._changed = threading.Condition(self._lock)
+        self._last_admitted = defaultdict(float)
+        self._last_served = -1
+        # When the backlog last became non-empty or a reply last arrived.
+        self._progress_at = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        # Why the sender thread stopped, if it did so on its own.
+        self._error = None
+
+        self.submitted = 0
+        self.sent = 0
+        self.acknowledged = 0
+        self.reply_errors = 0
+        self.drop_reasons = Counter()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="frame-streamer", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, header, payload):
+        """
+        Copies the frame into a ring slot and queues it for sending according
+        to the backpressure policy. Returns False if this frame was dropped.
+        Raises RuntimeError if the sender thread has stopped.
+        """
+        if self._error is not None:
+            raise RuntimeError(f"Frame streamer for {self.endpoint} has stopped") from self._error
+        if not header.capture_ns:
+            header = header._replace(capture_ns=time.time_ns())
+        accepted = self._admit(header, payload)
+        with self._changed:
+            self.submitted += 1
+            self._changed.notify_all()
+        return accepted
+
+    def wait_for_submitted(self, count, timeout=None):
+        """Blocks until `count` frames have been submitted. Returns False on timeout."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.submitted >= count, timeout)
+
+    def wait_for_backlog(self, max_outstanding, timeout=None):
+        """
+        Blocks until at most `max_outstanding` frames are queued or awaiting a
+        reply. Returns False on timeout.
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: self._backlog() <= max_outstanding, timeout)
+
+    def _backlog(self):
+        return sum(len(pending) for pending in self._pending.values()) + len(self._in_flight)
+
+    def _admit(self, header, payload):
+        now = time.monotonic()
+        sensor_id = header.sensor_id
+        with self._lock:
+            if self.min_interval and now - self._last_admitted[sensor_id] < self.min_interval:
+                self.drop_reasons["subsampled"] += 1
+                return False
+
+            # Make room by evicting this sensor's stalest queued frames first.
+            pending = self._pending[sensor_id]
+            while len(pending) >= self.max_queue_depth:
+                _, stale_slot, _ = pending.popleft()
+                self._ring.release(stale_slot)
+                self.drop_reasons["stale"] += 1
+
+            slot = self._ring.acquire()
+            if slot is None:
+                self.drop_reasons["no_slot"] += 1
+                return False
+
+            self._last_admitted[sensor_id] = now
+
+        try:
+            self.encoder.fill(slot, payload, header.width, header.height)
+        except Exception:
+            self._ring.release(slot)
+            raise
+        if self.metrics is not None:
+            self.metrics.observe("fill", (time.monotonic() - now) * 1000.0)
+        with self._lock:
+            if not self._backlog():
+                self._progress_at = now
+            pending.append((header, slot, now))
+        return True
+
+    def drop_pending(self, reason):
+        """Discards every queued, unsent frame, counting them as dropped for `reason`."""
+        with self._lock:
+            for pending in self._pending.values():
+                while pending:
+                    _, slot, _ = pending.popleft()
+                    self._ring.release(slot)
+                    self.drop_reasons[reason] += 1
+            self._changed.notify_all()
+
+    @property
+    def outstanding(self):
+        """Frames queued or awaiting a reply."""
+        with self._lock:
+            return self._backlog()
+
+    def stalled_for(self):
+        """Seconds the streamer has had frames outstanding without receiving a reply; 0 when idle."""
+        with self._lock:
+            if not self._backlog():
+                return 0.0
+            return time.monotonic() - self._progress_at
+
+    def close(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.shared_memory:
+            self._ring.close()
+
+    @property
+    def dropped(self):
+        return sum(self.drop_reasons.values())
+
+    @property
+    def in_flight(self):
+        return len(self._in_flight)
+
+    def stats(self):
+        """Returns a snapshot of the frame counters."""
+        with self._lock:
+            return dict(
+                submitted=self.submitted,
+                sent=self.sent,
+                acknowledged=self.acknowledged,
+                reply_errors=self.reply_errors,
+                dropped=self.dropped,
+                queued=sum(len(pending) for pending in self._pending.values()),
+                in_flight=len(self._in_flight),
+                **{f"dropped_{reason}": count for reason, count in self.drop_reasons.items()}
+            )
+
+    def _run(self):
+        socket = self.context.socket(zmq.DEALER)
+        socket.setsockopt(zmq.LINGER, 0)
+        # Only queue messages on a completed connection, so frames wait in
+        # the backlog (where policies and max_age apply) while the server is down.
+        socket.setsockopt(zmq.IMMEDIATE, 1)
+        socket.connect(self.endpoint)
+        try:
+            while not self._stop.is_set():
+                self._expire_in_flight()
+                self._send_queued(socket)
+                if socket.poll(self.poll_interval_ms, zmq.POLLIN):
+                    self._receive_replies(socket)
+        except Exception as e:
+            self._error = e
+            print(f"Error in frame streamer: {e!r}")
+        finally:
+            socket.close()
+
+    def _next_frame(self):
+        """
+        Pops the next frame and marks it in flight, taking sensors round-robin
+        and discarding frames older than max_age.
+        """
+        now = time.monotonic()
+        with self._lock:
+            while True:
+                ready = sorted(sensor for sensor, pending in self._pending.items() if pending)
+                if not ready:
+                    return None
+                sensor = next((candidate for candidate in ready if candidate > self._last_served), ready[0])
+                self._last_served = sensor
+                header, slot, submitted_at = self._pending[sensor].popleft()
+                if self.max_age is not None and now - submitted_at > self.max_age:
+                    self._ring.release(slot)
+                    self.drop_reasons["expired"] += 1
+                    self._changed.notify_all()
+                    continue
+                # Shared-memory slots stay reserved until the reply, as the server reads them in place.
+                held_slot = slot if self.shared_memory else None
+                self._in_flight[(header.sensor_id, header.frame)] = (submitted_at, held_slot)
+                return header, slot, submitted_at
+
+    def _send_queued(self, socket):
+        while len(self._in_flight) < self.max_in_flight and socket.poll(0, zmq.POLLOUT):
+            item = self._next_frame()
+            if item is None:
+                return
+            header, slot, submitted_at = item
+
+            encode_start = time.monotonic()
+            try:
+                payload = self.encoder.compress(slot.view, header.width, header.height)
+            except Exception as e:
+                print(f"Dropping frame {header.frame} of sensor {header.sensor_id}: encoding failed: {e!r}")
+                self._drop_in_flight(header, slot, "encode_error")
+                continue
+            header = header._replace(
+                channels=self.encoder.channels,
+                payload_size=len(payload),
+                encoding=self.encoder.encoding,
+                quality=self.encoder.quality,
+                flags=FLAG_SHARED_MEMORY if self.shared_memory else 0,
+                send_ns=time.time_ns()
+            )
+            send_start = time.monotonic()
+
+            # The empty delimiter frame lets a DEALER talk to the server's REP socket.
+            socket.send(b"", zmq.SNDMORE)
+            socket.send(pack_header(header), zmq.SNDMORE)
+            if self.shared_memory:
+                # Only the slot descriptor goes on the wire; the reply releases the slot.
+                socket.send(slot.publish())
+            elif self.encoder.compressed:
+                # Compressed payloads are new buffers, so the slot is free again.
+                self._ring.release(slot)
+                socket.send(payload, copy=False)
+            else:
+                tracker = socket.send(payload, copy=False, track=True)
+                self._ring.track(slot, tracker)
+
+            if self.metrics is not None:
+                sent_at = time.monotonic()
+                self.metrics.observe("queue", (encode_start - submitted_at) * 1000.0)
+                self.metrics.observe("encode", (send_start - encode_start) * 1000.0)
+                self.metrics.observe("send", (sent_at - send_start) * 1000.0)
+
+            with self._lock:
+                self.sent += 1
+
+    def _drop_in_flight(self, header, slot, reason):
+        with self._lock:
+            self._in_flight.pop((header.sensor_id, header.frame), None)
+            self._ring.release(slot)
+            self.drop_reasons[reason] += 1
+            self._changed.notify_all()
+
+    def _expire_in_flight(self):
+        """Writes off frames whose reply never arrived so the window cannot stall."""
+        deadline = time.monotonic() - self.reply_timeout
+        with self._lock:
+            lost = [key for key, (submitted_at, _) in self._in_flight.items() if submitted_at < deadline]
+            for key in lost:
+                _, slot = self._in_flight.pop(key)
+                if slot is not None:
+                    self._ring.release(slot)
+            if lost:
+                self.drop_reasons["lost"] += len(lost)
+                self._changed.notify_all()
+
+    def _receive_replies(self, socket):
+        while socket.poll(0, zmq.POLLIN):
+            try:
+                self._handle_reply(socket.recv_multipart())
+            except zmq.ZMQError:
+                raise
+            except Exception as e:
+                print(f"Error handling reply: {e!r}")
+                with self._lock:
+                    self.reply_errors += 1
+
+    def _handle_reply(self, message):
+        _, reply_message = message
+        reply = json.loads(reply_message)
+
+        key = (reply.get("sensor", 0), reply["frame"])
+        with self._lock:
+            submitted_at, slot = self._in_flight.pop(key, (None, None))
+            if slot is not None:
+                self._ring.release(slot)
+            if submitted_at is not None:
+                self.acknowledged += 1
+                self._progress_at = time.monotonic()
+                self._changed.notify_all()
+
+        if submitted_at is None:
+            print(f"Received reply for unknown frame {reply['frame']} of sensor {key[0]}")
+            return
+
+        latency_ms = (time.monotonic() - submitted_at) * 1000.0
+        if self.metrics is not None:
+            self.metrics.observe_reply(reply, latency_ms)
+        if self.on_reply is not None:
+            self.on_reply(reply, latency_ms)
@@ -0,0 +1,68 @@
+#pragma once
+
+#include <cstdint>
+#include <cstring>
+#include <stdexcept>
+#include <string>
+
+// Binary frame header shared with frame_protocol.py.
+// Every frame arrives as two message parts: this header followed by the encoded pixels.
+namespace frame_protocol {
+
+constexpr char MAGIC[4] = {'P', 'F', 'R', 'M'};
+constexpr uint8_t VERSION = 4;
+
+// Payload encodings; see frame_protocol.ENCODINGS.
+enum Encoding : uint8_t {
+    ENCODING_RAW = 0,   // BGRA pixels
+    ENCODING_BGR = 1,   // BGR pixels
+    ENCODING_ZLIB = 2,  // zlib-compressed BGR pixels
+    ENCODING_LZ4 = 3,   // LZ4 block-compressed BGR pixels
+    ENCODING_JPEG = 4,  // JPEG-encoded BGR image
+};
+
+// Header flags; see frame_protocol.FLAG_SHARED_MEMORY.
+constexpr uint16_t FLAG_SHARED_MEMORY = 0x1;  // Payload is a shared-memory slot descriptor
+
+#pragma pack(push, 1)
+struct FrameHeader {
+    char magic[4];
+    uint8_t version;
+    uint8_t channels;
+    uint8_t encoding;
+    uint8_t quality;
+    uint64_t frame;
+    uint32_t width;
+    uint32_t height;
+    uint32_t payload_size;
+    uint16_t sensor_id;
+    uint16_t flags;
+    uint64_t capture_ns;  // Unix-epoch time the client captured the frame, 0 if unknown
+    uint64_t send_ns;     // Unix-epoch time the client wrote the frame to the socket, 0 if unknown
+};
+#pragma pack(pop)
+
+static_assert(sizeof(FrameHeader) == 48, "FrameHeader must match frame_protocol.HEADER_STRUCT");
+
+inline FrameHeader parse_header(const void* data, size_t size) {
+    if (size != sizeof(FrameHeader)) {
+        throw std::runtime_error("Frame header must be " + std::to_string(sizeof(FrameHeader)) +
+                                 " bytes, got " + std::to_string(size));
+    }
+
+    FrameHeader header;
+    std::memcpy(&header, data, sizeof(FrameHeader));
+
+    if (std::memcmp(header.magic, MAGIC, sizeof(MAGIC)) != 0) {
+        throw std::runtime_error("Bad frame header magic");
+    }
+    if (header.version != VERSION) {
+        throw std::runtime_error("Unsupported frame protocol version: " + std::to_string(header.version));
+    }
+    if (header.width == 0 || header.height == 0) {
+        throw std::runtime_error("Frame dimensions must be non-zero");
+    }
+    return header;
+}
+
+} // namespace frame_protocol
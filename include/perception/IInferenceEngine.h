@@ -1,8 +1,27 @@
 #pragma once
 #include <opencv2/opencv.hpp>
+#include <string>
+#include <vector>
+
+struct Detection {
+    int class_id;
+    std::string class_name;
+    float confidence;
+    cv::Rect box;  // In the pixel coordinates of the processed frame
+};
+
+// Milliseconds spent in each stage of one process_frame call.
+struct StageTimings {
+    double letterbox_ms = 0.0;
+    double blob_ms = 0.0;
+    double forward_ms = 0.0;
+    double decode_ms = 0.0;  // Parsing the raw model output into candidate boxes
+    double nms_ms = 0.0;
+};
 
 class IInferenceEngine {
 public:
     virtual ~IInferenceEngine() = default;
-    virtual void process_frame(cv::Mat& image) = 0;
-};
\ No newline at end of file
+    // Detects objects in `image`, draws them onto it and returns them.
+    virtual std::vector<Detection> process_frame(cv::Mat& image, StageTimings& timings) = 0;
+};
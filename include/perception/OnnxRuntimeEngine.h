@@ -9,7 +9,7 @@ class OnnxRuntimeEngine : public IInferenceEngine {
 public:
     OnnxRuntimeEngine(const std::string& model_path);
 
-    void process_frame(cv::Mat& image) override;
+    std::vector<Detection> process_frame(cv::Mat& image, StageTimings& timings) override;
 
 private:
     const float INPUT_WIDTH = 1280.0;
@@ -21,5 +21,14 @@ private:
         "motor", "bike", "traffic light", "traffic sign"
     };
 
+    // Resizes `image` with its aspect ratio preserved and centres it on the
+    // reused `canvas`, returning the scale applied; `pad` receives the offset.
+    float letterbox(const cv::Mat& image, cv::Point2f& pad);
+
     cv::dnn::Net net;
+    cv::Mat canvas;
+    // Where the last frame was placed on `canvas`; the padding is repainted when it changes.
+    cv::Rect window_rect;
+    cv::Mat resized;
+    cv::Mat blob;
 };
\ No newline at end of file
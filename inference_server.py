@@ -0,0 +1,393 @@
+"""
+Multi-process Python inference server speaking the frame protocol of
+src/main.cpp, so FrameStreamer clients (run_simulation.py, replay_stream.py,
+the benchmarks) can use either server unchanged.
+
+A load-balancing broker sits in front of a pool of worker processes:
+
+    clients (DEALER) --> ROUTER frontend | broker | ROUTER backend --> workers (DEALER)
+
+Each worker loads its own OnnxRuntimeEngine session and announces itself to
+the broker, which hands every incoming frame to the worker with the fewest
+frames outstanding (at most `--worker-queue` each) and routes the reply back
+to the client that sent it. While every worker is full the broker stops
+reading from clients, so backpressure reaches FrameStreamer's window instead
+of frames piling up in the broker. Frame payloads are forwarded without
+being copied or parsed by the broker.
+
+With `--detect-every N` each worker runs the detector only on keyframes and
+tracks objects in between (see perception.keyframes); frames are then routed
+to workers by camera instead, so every camera's frames reach the same
+tracker in order, and replies also carry track ids and what triggered the
+keyframe.
+
+With `--gate-threshold` each worker skips inference on frames that barely
+differ from the camera's last inferred frame (e.g. the ego vehicle waiting
+at a light) and replies with that frame's detections again, marked
+"gated" along with the inference time it estimates was saved (see
+perception.gating). Frames are routed by camera as for tracking.
+
+Clients on the same host can stream with `shared_memory=True` instead, in
+which case only slot descriptors pass through the broker and workers read
+the pixels straight from the client's segment (see shm_transport).
+
+Replies match the C++ server: {"sensor", "frame", "status", "stages",
+"detections"}, plus the id of the worker that handled the frame. The broker
+periodically prints how busy each worker was, so an under-used pool (client
+or transport bound) is easy to tell apart from a saturated one.
+
+    python inference_server.py --workers 4 --threads 2
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+import zmq
+
+from frame_codec import decode_frame
+from frame_protocol import ENCODING_RAW, FLAG_SHARED_MEMORY, unpack_header
+from perception import CLASS_NAMES, Detection, FrameGate, KeyframeDetector, OnnxRuntimeEngine
+from shm_transport import SharedFrameReader
+
+# Sent by a worker once its model is loaded.
+READY = b"READY"
+
+
+def detections_to_json(detections: List[Detection]) -> List[dict]:
+    results = []
+    for d in detections:
+        result = {"class_id": d.class_id, "class": CLASS_NAMES[d.class_id], "confidence": d.confidence,
+                  "box": [d.left, d.top, d.width, d.height]}
+        if d.track_id is not None:
+            result["track_id"] = d.track_id
+        results.append(result)
+    return results
+
+
+def handle_frame(engine: OnnxRuntimeEngine, reader: SharedFrameReader, header_bytes: bytes,
+                 payload: memoryview, keyframes: Optional[KeyframeDetector] = None,
+                 gate: Optional[FrameGate] = None) -> dict:
+    """
+    Runs one frame through `engine`, or through `keyframes` when tracking,
+    unless `gate` finds it unchanged; returns the reply dict (status ERROR
+    on bad frames or any error while processing them).
+    """
+    received_ns = time.time_ns()
+    start = time.perf_counter()
+    frame_id = sensor_id = None
+    shared_frame = None
+    stages = {}
+    try:
+        header = unpack_header(header_bytes)
+        frame_id, sensor_id = header.frame, header.sensor_id
+        if header.flags & FLAG_SHARED_MEMORY:
+            shared_frame = reader.read(payload)
+            payload = shared_frame.view
+        if len(payload) != header.payload_size:
+            raise ValueError("Payload size does not match frame header")
+        # Only meaningful when the client and server clocks are synchronised (e.g. NTP).
+        if header.send_ns:
+            stages["transport"] = (received_ns - header.send_ns) / 1e6
+
+        decode_start = time.perf_counter()
+        if header.encoding == ENCODING_RAW:
+            # The letterbox reads BGRA directly, so raw frames need no colour conversion.
+            image = np.frombuffer(payload, dtype=np.uint8).reshape(header.height, header.width, header.channels)
+        else:
+            image = decode_frame(header, payload)
+        stages["frame_decode"] = (time.perf_counter() - decode_start) * 1000.0
+    except ValueError as e:
+        print(f"Rejecting frame: {e}")
+        return {"sensor": sensor_id, "frame": frame_id, "status": "ERROR", "error": str(e)}
+    except Exception as e:
+        # E.g. OSError attaching to a client's shared-memory segment or a decoder error.
+        print(f"Failed to read frame {frame_id} from sensor {sensor_id}: {e!r}")
+        return {"sensor": sensor_id, "frame": frame_id, "status": "ERROR", "error": repr(e)}
+
+    reply = {"sensor": sensor_id, "frame": frame_id, "status": "OK", "stages": stages}
+    try:
+        detections = gate.check(sensor_id, image, stages) if gate is not None else None
+        if detections is not None:
+            reply["gated"] = True
+            reply["saved_ms"] = gate.inference_ms
+        else:
+            inference_start = time.perf_counter()
+            if keyframes is not None:
+                detections, reply["keyframe"] = keyframes.process_frame(sensor_id, frame_id, image, stages)
+            else:
+                detections = engine.process_frame(image, stages)
+            # Frames the tracker propagated never ran the detector, so they must not become the gate's reference.
+            detector_ran = keyframes is None or reply["keyframe"] is not None
+            if gate is not None and detector_ran:
+                gate.store(sensor_id, detections, (time.perf_counter() - inference_start) * 1000.0)
+    except Exception as e:
+        # Keep the worker alive: the broker would otherwise route frames to a dead process.
+        print(f"Failed to process frame {frame_id} from sensor {sensor_id}: {e!r}")
+        return {"sensor": sensor_id, "frame": frame_id, "status": "ERROR", "error": repr(e)}
+    if shared_frame is not None and not shared_frame.intact():
+        error = "Shared-memory slot was reused while the frame was processed"
+        print(f"Rejecting frame: {error}")
+        return {"sensor": sensor_id, "frame": frame_id, "status": "ERROR", "error": error}
+    stages["server"] = (time.perf_counter() - start) * 1000.0
+    reply["detections"] = detections_to_json(detections)
+    return reply
+
+
+def run_worker(worker_id: int, backend: str, model_path: str, threads: int, keyframe_options: Optional[dict] = None,
+               gate_options: Optional[dict] = None):
+    """
+    Worker process: loads a model session and serves frames handed out by
+    the broker, tracking between keyframes if `keyframe_options` are given
+    and gating static frames if `gate_options` are.
+    """
+    engine = OnnxRuntimeEngine(model_path, intra_op_threads=threads, max_batch_size=1)
+    keyframes = KeyframeDetector(engine, **keyframe_options) if keyframe_options else None
+    gate = FrameGate(**gate_options) if gate_options else None
+    reader = SharedFrameReader()
+    context = zmq.Context()
+    socket = context.socket(zmq.DEALER)
+    socket.setsockopt(zmq.IDENTITY, f"worker-{worker_id}".encode())
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.connect(backend)
+    socket.send(READY)
+
+    try:
+        while True:
+            client, header_msg, payload_msg = socket.recv_multipart(copy=False)
+            reply = handle_frame(engine, reader, header_msg.bytes, payload_msg.buffer, keyframes, gate)
+            reply["worker"] = worker_id
+            socket.send_multipart([client, json.dumps(reply).encode()], copy=False)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+        socket.close()
+        context.term()
+
+
+class WorkerStats:
+    """Frames and busy time of one worker since the last report."""
+
+    def __init__(self):
+        self.outstanding = 0
+        self.frames = 0
+        self.errors = 0
+        self.tracked = 0
+        self.gated = 0
+        self.saved_ms = 0.0
+        self.busy_ms = 0.0
+
+    def reset(self):
+        self.frames = 0
+        self.errors = 0
+        self.tracked = 0
+        self.gated = 0
+        self.saved_ms = 0.0
+        self.busy_ms = 0.0
+
+
+class Broker:
+    """
+    Routes frames from clients to the least-loaded ready worker and replies
+    back to the originating client.
+
+    With `sticky` set, each camera's frames always go to the same worker
+    (rendezvous hashing over the ready workers) so per-camera state
+    (trackers, gate references) stays in one process. The per-worker queue
+    limit does not apply then; the clients' in-flight windows bound the
+    backlog instead. Frames whose header cannot be parsed have no camera to
+    route by and are answered with an ERROR by the broker itself.
+    """
+
+    def __init__(self, frontend: zmq.Socket, backend: zmq.Socket, worker_queue: int = 2,
+                 report_interval_s: float = 5.0, sticky: bool = False):
+        self.frontend = frontend
+        self.backend = backend
+        self.worker_queue = worker_queue
+        self.report_interval = report_interval_s
+        self.sticky = sticky
+        self.workers: Dict[bytes, WorkerStats] = {}
+
+    def _pick_worker(self) -> Optional[bytes]:
+        candidates = [(stats.outstanding, worker) for worker, stats in self.workers.items()
+                      if stats.outstanding < self.worker_queue]
+        return min(candidates)[1] if candidates else None
+
+    def _camera_worker(self, sensor_id: int) -> bytes:
+        return max(self.workers, key=lambda worker: zlib.crc32(b"%d/" % sensor_id + worker))
+
+    def run(self, processes: Optional[List[multiprocessing.Process]] = None):
+        poll_backend = zmq.Poller()
+        poll_backend.register(self.backend, zmq.POLLIN)
+        poll_both = zmq.Poller()
+        poll_both.register(self.backend, zmq.POLLIN)
+        poll_both.register(self.frontend, zmq.POLLIN)
+
+        last_report = time.monotonic()
+        while True:
+            # Only accept frames while some worker has room for them.
+            ready = self.workers if self.sticky else self._pick_worker() is not None
+            poller = poll_both if ready else poll_backend
+            events = dict(poller.poll(100))
+
+            if self.backend in events:
+                self._on_backend(self.backend.recv_multipart(copy=False))
+            if self.frontend in events:
+                self._on_frontend(self.frontend.recv_multipart(copy=False))
+
+            now = time.monotonic()
+            if now - last_report >= self.report_interval:
+                self.report(now - last_report, processes)
+                last_report = now
+
+    def _on_backend(self, message: List[zmq.Frame]):
+        worker = message[0].bytes
+        if len(message) == 2 and message[1].bytes == READY:
+            self.workers[worker] = WorkerStats()
+            print(f"{worker.decode()} ready ({len(self.workers)} worker(s))")
+            return
+
+        _, client, reply = message
+        stats = self.workers.get(worker)
+        if stats is not None:
+            stats.outstanding -= 1
+            stats.frames += 1
+            result = json.loads(reply.bytes)
+            if result.get("status") != "OK":
+                stats.errors += 1
+            elif result.get("gated"):
+                stats.gated += 1
+                stats.saved_ms += result.get("saved_ms", 0.0)
+            elif "keyframe" in result and result["keyframe"] is None:
+                stats.tracked += 1
+            stats.busy_ms += (result.get("stages") or {}).get("server", 0.0)
+        # The empty delimiter frame is what the client's DEALER expects from a REP peer.
+        self.frontend.send_multipart([client, b"", reply], copy=False)
+
+    def _on_frontend(self, message: List[zmq.Frame]):
+        if len(message) != 4:
+            print(f"Dropping malformed request with {len(message)} parts")
+            return
+        client, _, header, payload = message
+        if self.sticky:
+            try:
+                sensor_id = unpack_header(header.buffer).sensor_id
+            except ValueError as e:
+                # Every worker may be over its queue limit here, so reply without one.
+                print(f"Rejecting frame: {e}")
+                reply = {"sensor": None, "frame": None, "status": "ERROR", "error": str(e)}
+                self.frontend.send_multipart([client, b"", json.dumps(reply).encode()])
+                return
+            worker = self._camera_worker(sensor_id)
+        else:
+            worker = self._pick_worker()
+        self.workers[worker].outstanding += 1
+        self.backend.send_multipart([worker, client, header, payload], copy=False)
+
+    def report(self, elapsed_s: float, processes: Optional[List[multiprocessing.Process]] = None):
+        """Prints each worker's frame rate and utilization (busy time / wall time) since the last report."""
+        if processes:
+            for worker_id, process in enumerate(processes):
+                name = f"worker-{worker_id}".encode()
+                if process.exitcode is not None and name in self.workers:
+                    print(f"{name.decode()} exited with code {process.exitcode}; no longer sending it frames")
+                    del self.workers[name]
+        if not self.workers:
+            return
+
+        total_frames = sum(stats.frames for stats in self.workers.values())
+        parts = []
+        for worker, stats in sorted(self.workers.items()):
+            utilization = stats.busy_ms / (elapsed_s * 1000.0)
+            detected = 1 - (stats.tracked + stats.gated) / stats.frames if stats.frames else 0.0
+            parts.append(f"{worker.decode()} {utilization:.0%} ({stats.frames / elapsed_s:.1f} fps"
+                         + (f", detector on {detected:.0%}" if self.sticky else "")
+                         + (f", {stats.gated} gated saving {stats.saved_ms / elapsed_s:.0f} ms/s"
+                            if stats.gated else "")
+                         + (f", {stats.errors} errors" if stats.errors else "") + ")")
+            stats.reset()
+        print(f"{total_frames / elapsed_s:.1f} frames/s | " + ", ".join(parts))
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Serve the detector from a pool of worker processes.")
+    parser.add_argument("--model", default="models/best.onnx", help="ONNX model every worker loads.")
+    parser.add_argument("--bind", default="tcp://*:5555", help="Endpoint clients connect to.")
+    parser.add_argument("--workers", type=int, default=max(1, cpu_count // 2),
+                        help="Number of worker processes, each with its own model session.")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="ONNX Runtime intra-op threads per worker (default: cores / workers).")
+    parser.add_argument("--worker-queue", type=int, default=2,
+                        help="Frames handed to a worker before its previous ones are done; "
+                             "2 hides the hop between broker and worker.")
+    parser.add_argument("--report-interval", type=float, default=5.0,
+                        help="Seconds between worker utilization reports.")
+    parser.add_argument("--detect-every", type=int, default=1,
+                        help="Run the detector at least every N frames per camera and track objects "
+                             "in between; 1 runs it on every frame.")
+    parser.add_argument("--scene-change", type=float, default=12.0,
+                        help="Mean grey-level difference from the last keyframe that forces a detection.")
+    parser.add_argument("--min-track-confidence", type=float, default=0.35,
+                        help="Mean decayed track confidence below which a detection is forced.")
+    parser.add_argument("--gate-threshold", type=float, default=0.0,
+                        help="Skip inference on frames where at most this fraction of thumbnail pixels "
+                             "changed since the camera's last inferred frame; 0 disables gating.")
+    parser.add_argument("--gate-pixel-delta", type=float, default=12.0,
+                        help="Grey-level change for a thumbnail pixel to count as changed.")
+    parser.add_argument("--gate-max-reuse", type=int, default=30,
+                        help="Run inference after this many gated frames in a row regardless.")
+    args = parser.parse_args()
+    threads = args.threads or max(1, cpu_count // args.workers)
+    keyframe_options = None
+    if args.detect_every > 1:
+        keyframe_options = dict(interval=args.detect_every, scene_change=args.scene_change,
+                                min_confidence=args.min_track_confidence)
+    gate_options = None
+    if args.gate_threshold > 0:
+        gate_options = dict(threshold=args.gate_threshold, pixel_delta=args.gate_pixel_delta,
+                            max_reuse=args.gate_max_reuse)
+
+    context = zmq.Context()
+    frontend = context.socket(zmq.ROUTER)
+    frontend.bind(args.bind)
+    backend = context.socket(zmq.ROUTER)
+    backend_port = backend.bind_to_random_port("tcp://127.0.0.1")
+    backend_endpoint = f"tcp://127.0.0.1:{backend_port}"
+
+    # Workers are spawned rather than forked so none inherits the parent's ZMQ context.
+    spawn = multiprocessing.get_context("spawn")
+    processes = [
+        spawn.Process(target=run_worker, args=(worker_id, backend_endpoint, args.model, threads, keyframe_options,
+                                                gate_options),
+                      name=f"worker-{worker_id}", daemon=True)
+        for worker_id in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    print(f"Python ZMQ Server listening on {args.bind} with {args.workers} worker(s) x {threads} thread(s)")
+
+    try:
+        Broker(frontend, backend, args.worker_queue, args.report_interval,
+               sticky=keyframe_options is not None or gate_options is not None).run(processes)
+    except KeyboardInterrupt:
+        print("Shutting down...")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        frontend.close(linger=0)
+        backend.close(linger=0)
+        context.term()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+Python inference engine for the custom YOLOv8 BDD100K detector.
+
+Mirrors the C++ OnnxRuntimeEngine (include/perception/OnnxRuntimeEngine.h)
+on top of ONNX Runtime, with batched sessions for serving several camera
+streams at once.
+"""
+from perception.batching import DynamicBatcher
+from perception.gating import FrameGate
+from perception.keyframes import KeyframeDetector
+from perception.onnx_engine import CLASS_NAMES, Detection, OnnxRuntimeEngine
+from perception.postprocess import batched_nms, decode_batch
+from perception.preprocess import Letterbox, LetterboxTransform, scale_boxes
+from perception.tracker import MultiObjectTracker, iou_matrix
+
+__all__ = [
+    "CLASS_NAMES", "Detection", "DynamicBatcher", "FrameGate", "KeyframeDetector", "Letterbox", "LetterboxTransform",
+    "MultiObjectTracker", "OnnxRuntimeEngine", "batched_nms", "decode_batch", "iou_matrix", "scale_boxes",
+]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+
+import numpy as np
+
+from perception.onnx_engine import Detection, OnnxRuntimeEngine
+
+
+class DynamicBatcher:
+    """
+    Groups frames from many callers into micro-batches for one engine.
+
+    A batch is dispatched as soon as it holds `max_batch_size` frames or the
+    oldest frame in it has waited `max_wait_ms`, whichever comes first. This
+    trades at most `max_wait_ms` of extra latency for running several camera
+    streams through one batched session call.
+    """
+
+    def __init__(self, engine: OnnxRuntimeEngine, max_batch_size: int = 8, max_wait_ms: float = 5.0):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        # Orders submits against the final drain in close(), so no frame is left queued unanswered.
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="dynamic-batcher", daemon=True)
+
+        self.batches = 0
+        self.frames = 0
+        self._thread.start()
+
+    def submit(self, image: np.ndarray) -> "Future[List[Detection]]":
+        """
+        Queues a BGR frame; the returned future resolves to its detections,
+        or fails with RuntimeError if the batcher is closed first.
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._stop.is_set():
+                future.set_exception(RuntimeError("batcher closed"))
+            else:
+                self._queue.put((image, future))
+        return future
+
+    def close(self, timeout: float = 2.0):
+        """Stops the batching thread and fails the futures of frames still queued."""
+        with self._lock:
+            self._stop.set()
+        self._thread.join(timeout)
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(RuntimeError("batcher closed"))
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.frames / self.batches if self.batches else 0.0
+
+    def _collect(self) -> list:
+        """Blocks for the first frame, then gathers more until the batch is full or the wait expires."""
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            images = [image for image, _ in batch]
+            try:
+                results = self.engine.process_batch(images)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), detections in zip(batch, results):
+                future.set_result(detections)
+            self.batches += 1
+            self.frames += len(batch)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from perception.keyframes import thumbnail
+from perception.onnx_engine import Detection
+
+
+def changed_fraction(a: np.ndarray, b: np.ndarray, pixel_delta: float) -> float:
+    """Fraction of thumbnail pixels whose grey level moved by more than `pixel_delta`."""
+    if a.shape != b.shape:
+        return 1.0
+    return float(np.count_nonzero(np.abs(a - b) > pixel_delta)) / a.size
+
+
+class _CameraState:
+    def __init__(self):
+        self.reference = None
+        self.candidate = None
+        self.detections: List[Detection] = []
+        self.reused = 0
+
+
+class FrameGate:
+    """
+    Skips inference on frames that have not changed, reusing the detections
+    of the camera's last inferred frame.
+
+    Each frame is reduced to a greyscale thumbnail (see keyframes.thumbnail)
+    and compared with the thumbnail of the last frame inference ran on; if at
+    most `threshold` of its pixels changed by more than `pixel_delta` grey
+    levels, the frame is gated. Counting changed pixels rather than averaging
+    the difference keeps a small object moving into view from being washed
+    out by an otherwise static scene. Comparing with the last inferred frame
+    rather than the previous frame keeps slow drift from accumulating, and
+    after `max_reuse` gated frames in a row inference runs regardless.
+
+    Use `check` before inference and `store` after it:
+
+        detections = gate.check(sensor_id, image)
+        if detections is None:
+            detections = engine.process_frame(image)
+            gate.store(sensor_id, detections, inference_ms)
+
+    Call `store` only for frames the detector actually ran on.
+
+    `skip_rate` and `saved_ms` report how often inference was skipped and an
+    estimate of the inference time saved, from the recent inference latency
+    (the first, warm-up inference is left out of it).
+    """
+
+    def __init__(self, threshold: float = 0.01, pixel_delta: float = 12.0, max_reuse: int = 30):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.max_reuse = max_reuse
+        self._cameras: Dict[int, _CameraState] = {}
+        # Exponential moving average of the inference latency.
+        self._inference_ms = 0.0
+        self._inferences = 0
+
+        self.frames = 0
+        self.skipped = 0
+        self.saved_ms = 0.0
+
+    @property
+    def skip_rate(self) -> float:
+        return self.skipped / self.frames if self.frames else 0.0
+
+    @property
+    def inference_ms(self) -> float:
+        """Recent inference latency, which each gated frame is counted as saving."""
+        return self._inference_ms
+
+    def check(self, sensor_id: int, image: np.ndarray,
+              timings: Optional[Dict[str, float]] = None) -> Optional[List[Detection]]:
+        """Returns the detections to reuse for a static frame, or None if inference has to run."""
+        start = time.perf_counter()
+        camera = self._cameras.get(sensor_id)
+        if camera is None:
+            camera = self._cameras[sensor_id] = _CameraState()
+        small = thumbnail(image)
+        self.frames += 1
+
+        static = (
+            camera.reference is not None and camera.reused < self.max_reuse
+            and changed_fraction(small, camera.reference, self.pixel_delta) <= self.threshold
+        )
+        if static:
+            camera.reused += 1
+            self.skipped += 1
+            self.saved_ms += self._inference_ms
+        else:
+            camera.candidate = small
+        if timings is not None:
+            timings["gate"] = (time.perf_counter() - start) * 1000.0
+        return camera.detections if static else None
+
+    def store(self, sensor_id: int, detections: List[Detection], inference_ms: float):
+        """Records the result of inference on the frame `check` last let through for the camera."""
+        camera = self._cameras[sensor_id]
+        camera.reference = camera.candidate
+        camera.detections = detections
+        camera.reused = 0
+        self._inferences += 1
+        if self._inferences == 1:
+            # The first run includes session warm-up and would inflate the estimate for a long time.
+            return
+        if self._inferences == 2:
+            self._inference_ms = inference_ms
+        else:
+            self._inference_ms = 0.9 * self._inference_ms + 0.1 * inference_ms
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from perception.onnx_engine import Detection, OnnxRuntimeEngine
+from perception.tracker import MultiObjectTracker
+
+# Size of the greyscale thumbnails frames are compared on.
+THUMBNAIL_SIZE = (36, 64)
+
+
+def thumbnail(image: np.ndarray) -> np.ndarray:
+    """A tiny greyscale copy of a BGR(A) frame, by strided sampling, for cheap frame comparisons."""
+    height, width = image.shape[:2]
+    step_y = max(1, height // THUMBNAIL_SIZE[0])
+    step_x = max(1, width // THUMBNAIL_SIZE[1])
+    return image[::step_y, ::step_x, :3].mean(axis=2, dtype=np.float32)
+
+
+def frame_difference(a: np.ndarray, b: np.ndarray) -> float:
+    """Mean absolute difference of two thumbnails, in 0-255 grey levels."""
+    if a.shape != b.shape:
+        return float("inf")
+    return float(np.abs(a - b).mean())
+
+
+class _CameraState:
+    def __init__(self, tracker: MultiObjectTracker):
+        self.tracker = tracker
+        self.last_frame = None
+        self.keyframe = None
+        self.keyframe_thumbnail = None
+
+
+class KeyframeDetector:
+    """
+    Runs the detector only on keyframes and tracks objects in between.
+
+    Per camera, a frame is a keyframe when any of these holds:
+      - `interval` frames have passed since the last keyframe,
+      - the scene changed: the frame differs from the last keyframe by more
+        than `scene_change` grey levels on average (see `thumbnail`),
+      - tracking confidence dropped: the mean decayed confidence of the
+        tracked objects fell below `min_confidence`,
+      - it is the camera's first frame or frame ids went backwards.
+    Keyframes go through the engine and correct the camera's
+    MultiObjectTracker; other frames only advance the tracker, which costs
+    microseconds instead of a forward pass. Frame ids are used as the time
+    base, so frames dropped upstream are predicted over correctly.
+
+    Frames of one camera must arrive in order at the same KeyframeDetector.
+    """
+
+    def __init__(self, engine: OnnxRuntimeEngine, interval: int = 5, scene_change: float = 12.0,
+                 min_confidence: float = 0.35, **tracker_options):
+        self.engine = engine
+        self.interval = interval
+        self.scene_change = scene_change
+        self.min_confidence = min_confidence
+        self.tracker_options = tracker_options
+        self._cameras: Dict[int, _CameraState] = {}
+
+        self.frames = 0
+        self.triggers = Counter()
+
+    @property
+    def keyframe_ratio(self) -> float:
+        return sum(self.triggers.values()) / self.frames if self.frames else 0.0
+
+    def process_frame(self, sensor_id: int, frame_id: int, image: np.ndarray,
+                      timings: Optional[Dict[str, float]] = None) -> Tuple[List[Detection], Optional[str]]:
+        """
+        Returns the frame's detections, with track ids, and what triggered the
+        detector ('interval', 'scene_change', 'confidence' or 'reset'), or
+        None if the boxes were propagated by the tracker.
+        """
+        start = time.perf_counter()
+        camera = self._cameras.get(sensor_id)
+        if camera is None:
+            camera = self._cameras[sensor_id] = _CameraState(MultiObjectTracker(**self.tracker_options))
+        small = thumbnail(image)
+
+        trigger = None
+        if camera.last_frame is None or frame_id <= camera.last_frame:
+            trigger = "reset"
+            camera.tracker = MultiObjectTracker(**self.tracker_options)
+        else:
+            camera.tracker.predict(frame_id - camera.last_frame)
+            since_keyframe = frame_id - camera.keyframe
+            if since_keyframe >= self.interval:
+                trigger = "interval"
+            elif frame_difference(small, camera.keyframe_thumbnail) > self.scene_change:
+                trigger = "scene_change"
+            else:
+                detections = camera.tracker.current(since_keyframe)
+                if detections and np.mean([d.confidence for d in detections]) < self.min_confidence:
+                    trigger = "confidence"
+        camera.last_frame = frame_id
+        self.frames += 1
+
+        if trigger is None:
+            if timings is not None:
+                timings["track"] = (time.perf_counter() - start) * 1000.0
+            return detections, None
+
+        tracking_ms = (time.perf_counter() - start) * 1000.0
+        detections = self.engine.process_frame(image, timings)
+        update_start = time.perf_counter()
+        detections = camera.tracker.update(detections)
+        camera.keyframe = frame_id
+        camera.keyframe_thumbnail = small
+        self.triggers[trigger] += 1
+        if timings is not None:
+            timings["track"] = tracking_ms + (time.perf_counter() - update_start) * 1000.0
+        return detections, trigger
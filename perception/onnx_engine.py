@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import time
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+import numpy as np
+import onnxruntime as ort
+
+from perception.postprocess import decode_batch
+from perception.preprocess import Letterbox, LetterboxTransform, scale_boxes
+
+# Must match the class order used to train models/best.onnx (see scripts/convert_bdd.py).
+CLASS_NAMES = [
+    "person", "rider", "car", "truck", "bus", "train",
+    "motor", "bike", "traffic light", "traffic sign",
+]
+
+# A detection in original image pixels; the box follows cv::Rect (left, top, width, height).
+# `track_id` is only set when detections are tracked across frames (see perception.tracker).
+Detection = namedtuple("Detection", ["class_id", "confidence", "left", "top", "width", "height", "track_id"],
+                       defaults=(None,))
+
+
+class OnnxRuntimeEngine:
+    """
+    Runs the YOLOv8 detector on micro-batches of BGR or BGRA frames with ONNX Runtime.
+
+    Frames are letterboxed into reusable input buffers (see
+    perception.preprocess), detections below SCORE_THRESHOLD are discarded
+    and overlapping boxes of the same class are removed with NMS, vectorized
+    over the whole batch (see perception.postprocess). Models exported with
+    dynamic image axes get a stride-aligned rectangular input such as
+    1280x736 instead of a padded square.
+
+    An engine is not thread-safe; share it between threads through a
+    DynamicBatcher.
+
+    If the model was exported with a fixed batch size of 1 (the ultralytics
+    default), batches are run frame by frame on the same session; export with
+    `scripts/export_model.py --dynamic` to run whole batches in one call.
+    """
+
+    INPUT_WIDTH = 1280
+    INPUT_HEIGHT = 1280
+    SCORE_THRESHOLD = 0.5
+    NMS_THRESHOLD = 0.45
+
+    def __init__(self, model_path: str, intra_op_threads: int = 0, inter_op_threads: int = 0,
+                 providers: Optional[List[str]] = None, max_batch_size: int = 8):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # 0 lets ONNX Runtime pick its default thread counts.
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        if inter_op_threads > 1:
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=providers or ["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch, _, height, width = model_input.shape
+        # Dynamic axes show up as strings; fall back to the training resolution.
+        self.input_height = height if isinstance(height, int) else self.INPUT_HEIGHT
+        self.input_width = width if isinstance(width, int) else self.INPUT_WIDTH
+        self.max_session_batch = batch if isinstance(batch, int) else None
+        self.letterbox = Letterbox(
+            self.input_width, self.input_height, max_batch_size, rect=not isinstance(height, int)
+        )
+
+        print(f"ONNX model loaded successfully from: {model_path} "
+              f"(input {width}x{height}, batch {batch}, providers {self.session.get_providers()})")
+
+    def process_frame(self, image: np.ndarray, timings: Optional[Dict[str, float]] = None) -> List[Detection]:
+        return self.process_batch([image], timings)[0]
+
+    def process_batch(self, images: List[np.ndarray],
+                      timings: Optional[Dict[str, float]] = None) -> List[List[Detection]]:
+        """
+        Detects objects in a list of BGR(A) frames, returning one detection list per frame.
+
+        If `timings` is given, the milliseconds spent letterboxing (which also
+        builds the blob), in the forward pass and in decoding plus NMS are
+        stored in it under 'letterbox', 'forward' and 'postprocess'.
+        """
+        start = time.perf_counter()
+        blob, transforms = self.letterbox(images)
+        letterboxed = time.perf_counter()
+        outputs = self._run(blob)
+        forwarded = time.perf_counter()
+        decoded = decode_batch(outputs, self.SCORE_THRESHOLD, self.NMS_THRESHOLD)
+        detections = [
+            self._to_detections(boxes, scores, class_ids, transform)
+            for (boxes, scores, class_ids), transform in zip(decoded, transforms)
+        ]
+        if timings is not None:
+            timings["letterbox"] = (letterboxed - start) * 1000.0
+            timings["forward"] = (forwarded - letterboxed) * 1000.0
+            timings["postprocess"] = (time.perf_counter() - forwarded) * 1000.0
+        return detections
+
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        """Runs the session, splitting the batch when the model has a fixed batch size."""
+        step = self.max_session_batch or len(blob)
+        chunks = [
+            self.session.run(None, {self.input_name: blob[start:start + step]})[0]
+            for start in range(0, len(blob), step)
+        ]
+        return np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+
+    @staticmethod
+    def _to_detections(boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray,
+                       transform: LetterboxTransform) -> List[Detection]:
+        """Maps input-space (x1, y1, x2, y2) boxes back to the frame as Detection tuples."""
+        rects = scale_boxes(boxes, transform)
+        rects[:, 2:] -= rects[:, :2]
+        rects = rects.astype(np.int32).tolist()
+
+        return [
+            Detection(class_id, score, *rect)
+            for class_id, score, rect in zip(class_ids.tolist(), scores.tolist(), rects)
+        ]
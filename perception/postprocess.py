@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+
+import numpy as np
+
+
+def decode_batch(outputs: np.ndarray, score_threshold: float, iou_threshold: float,
+                 max_detections: int = 300) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Decodes a batch of raw YOLOv8 outputs into NMS-filtered detections.
+
+    The whole batch is handled with array operations: one transpose, one
+    argmax over the class scores, one threshold mask across every image and
+    anchor, and a single class-aware NMS pass in which boxes of different
+    images or classes can never suppress each other.
+
+    Args:
+        outputs: (batch, 4 + classes, anchors) model output; the first four
+            rows are box centre x, centre y, width and height in input pixels.
+        score_threshold: Minimum class score for a detection to be kept.
+        iou_threshold: IoU above which the lower-scoring of two boxes is suppressed.
+        max_detections: Upper bound on detections kept per image.
+
+    Returns:
+        One (boxes, scores, class_ids) tuple per image, with boxes as
+        (x1, y1, x2, y2) float32 rows in model input coordinates, sorted by
+        descending score.
+    """
+    predictions = outputs.transpose(0, 2, 1)          # (batch, anchors, 4 + classes)
+    class_scores = predictions[..., 4:]
+    class_ids = class_scores.argmax(axis=-1)
+    scores = np.take_along_axis(class_scores, class_ids[..., None], axis=-1)[..., 0]
+
+    image_index, anchor_index = np.nonzero(scores > score_threshold)
+    boxes = xywh_to_xyxy(predictions[image_index, anchor_index, :4])
+    scores = scores[image_index, anchor_index]
+    class_ids = class_ids[image_index, anchor_index]
+
+    num_classes = class_scores.shape[-1]
+    keep = batched_nms(boxes, scores, image_index * num_classes + class_ids, iou_threshold)
+
+    results = []
+    kept_images = image_index[keep]
+    for image in range(len(outputs)):
+        selected = keep[kept_images == image][:max_detections]
+        results.append((boxes[selected], scores[selected], class_ids[selected]))
+    return results
+
+
+def xywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+    """Converts (cx, cy, w, h) rows to (x1, y1, x2, y2) rows."""
+    half = boxes[:, 2:4] * 0.5
+    return np.concatenate([boxes[:, :2] - half, boxes[:, :2] + half], axis=1)
+
+
+def batched_nms(boxes: np.ndarray, scores: np.ndarray, groups: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Greedy NMS that only lets boxes within the same group suppress each other.
+
+    Groups are separated by shifting every group's boxes to its own disjoint
+    region of the plane, so a single NMS pass handles all of them at once.
+
+    Returns:
+        Indices of the kept boxes, sorted by descending score.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    span = boxes.max() - boxes.min() + 1.0
+    offsets = groups.astype(boxes.dtype)[:, None] * span
+    return nms(boxes + offsets, scores, iou_threshold)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Greedy NMS over (x1, y1, x2, y2) boxes. Each iteration keeps the best
+    remaining box and drops every remaining box overlapping it by more than
+    `iou_threshold`, so the loop runs once per kept box, not once per box.
+    """
+    x1, y1, x2, y2 = boxes.T
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+
+        inter_w = np.maximum(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0)
+        inter_h = np.maximum(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0)
+        inter = inter_w * inter_h
+        iou = inter / np.maximum(areas[best] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Maps model input coordinates back to a frame: frame = (input - pad) / scale.
+LetterboxTransform = namedtuple("LetterboxTransform", ["scale", "pad_x", "pad_y", "frame_width", "frame_height"])
+
+PAD_VALUE = 114  # grey padding used by ultralytics during training
+
+
+class Letterbox:
+    """
+    Letterboxes BGR or BGRA frames into a reusable NCHW float32 input blob.
+
+    Frames are resized with their aspect ratio preserved and centred on a
+    grey canvas, matching how the model was trained, instead of being
+    stretched to a square. In `rect` mode (for models exported with dynamic
+    image axes) the canvas is only as large as the resized frame rounded up
+    to the model stride, e.g. 1280x736 for a 1280x720 camera, so no compute
+    is spent on padding rows.
+
+    The blob and resize scratch buffers are allocated once and reused. Per
+    channel, a single NumPy pass reads the resized pixels in RGB order,
+    transposes them to CHW and scales them to [0, 1] directly into the blob,
+    fusing colour conversion, layout change and normalisation.
+    """
+
+    def __init__(self, input_width: int, input_height: int, max_batch_size: int = 8,
+                 rect: bool = False, stride: int = 32):
+        self.input_width = input_width
+        self.input_height = input_height
+        self.rect = rect
+        self.stride = stride
+        self._blob = np.empty((0, 3, 0, 0), dtype=np.float32)
+        self._max_batch_size = max_batch_size
+        self._scratch: Dict[Tuple[int, int, int], np.ndarray] = {}
+        # The transform each blob slot was last filled with; padding only needs
+        # refilling when it changes.
+        self._slot_transforms: List[Optional[LetterboxTransform]] = []
+
+    def input_shape(self, frame_width: int, frame_height: int) -> Tuple[int, int]:
+        """Returns the (height, width) of the model input used for frames of this size."""
+        if not self.rect:
+            return self.input_height, self.input_width
+        scale = min(self.input_width / frame_width, self.input_height / frame_height)
+        height = -(-round(frame_height * scale) // self.stride) * self.stride
+        width = -(-round(frame_width * scale) // self.stride) * self.stride
+        return height, width
+
+    def __call__(self, frames: List[np.ndarray]) -> Tuple[np.ndarray, List[LetterboxTransform]]:
+        """
+        Letterboxes `frames` into the shared blob.
+
+        Returns:
+            A (len(frames), 3, H, W) view of the blob, valid until the next
+            call, and the transform that maps each frame's boxes back.
+        """
+        first_height, first_width = frames[0].shape[:2]
+        height, width = self.input_shape(first_width, first_height)
+        blob = self._reserve(len(frames), height, width)
+
+        transforms = []
+        for slot, frame in enumerate(frames):
+            transforms.append(self._fill(slot, frame, blob[slot]))
+        return blob[:len(frames)], transforms
+
+    def _reserve(self, batch: int, height: int, width: int) -> np.ndarray:
+        _, _, blob_height, blob_width = self._blob.shape
+        if (blob_height, blob_width) != (height, width) or len(self._blob) < batch:
+            capacity = max(batch, self._max_batch_size)
+            self._blob = np.empty((capacity, 3, height, width), dtype=np.float32)
+            self._slot_transforms = [None] * capacity
+        return self._blob
+
+    def _fill(self, slot: int, frame: np.ndarray, target: np.ndarray) -> LetterboxTransform:
+        frame_height, frame_width, channels = frame.shape
+        _, height, width = target.shape
+
+        scale = min(width / frame_width, height / frame_height)
+        new_width, new_height = round(frame_width * scale), round(frame_height * scale)
+        pad_x, pad_y = (width - new_width) // 2, (height - new_height) // 2
+        transform = LetterboxTransform(scale, pad_x, pad_y, frame_width, frame_height)
+
+        if self._slot_transforms[slot] != transform:
+            target.fill(PAD_VALUE / 255.0)
+            self._slot_transforms[slot] = transform
+
+        key = (new_height, new_width, channels)
+        resized = self._scratch.get(key)
+        if resized is None:
+            resized = self._scratch[key] = np.empty(key, dtype=np.uint8)
+        if (new_width, new_height) == (frame_width, frame_height):
+            np.copyto(resized, frame)
+        else:
+            cv2.resize(frame, (new_width, new_height), dst=resized, interpolation=cv2.INTER_LINEAR)
+
+        # BGR(A) -> RGB, HWC -> CHW and /255 in one pass per channel; alpha is never read.
+        window = target[:, pad_y:pad_y + new_height, pad_x:pad_x + new_width]
+        for rgb_channel, bgr_channel in enumerate((2, 1, 0)):
+            np.multiply(resized[:, :, bgr_channel], np.float32(1.0 / 255.0), out=window[rgb_channel])
+        return transform
+
+
+def scale_boxes(boxes: np.ndarray, transform: LetterboxTransform) -> np.ndarray:
+    """Maps (x1, y1, x2, y2) boxes from model input to frame pixels, clipped to the frame."""
+    scaled = np.empty_like(boxes)
+    xs, ys = scaled[:, 0::2], scaled[:, 1::2]
+    np.subtract(boxes[:, 0::2], transform.pad_x, out=xs)
+    np.subtract(boxes[:, 1::2], transform.pad_y, out=ys)
+    scaled /= transform.scale
+    np.clip(xs, 0, transform.frame_width, out=xs)
+    np.clip(ys, 0, transform.frame_height, out=ys)
+    return scaled
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+
+import numpy as np
+
+from perception.onnx_engine import Detection
+
+# Kalman noise as a fraction of the box height, as in SORT/ByteTrack.
+POSITION_NOISE = 1.0 / 20
+VELOCITY_NOISE = 1.0 / 160
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) (x1, y1, x2, y2) boxes as an (N, M) matrix."""
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=-1)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=-1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=-1)
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def greedy_match(scores: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairs rows with columns by repeatedly taking the highest remaining score,
+    ignoring pairs at or below `threshold`. Returns the matched row and column indices.
+    """
+    scores = scores.copy()
+    rows, columns = [], []
+    for _ in range(min(scores.shape)):
+        row, column = np.unravel_index(scores.argmax(), scores.shape)
+        if scores[row, column] <= threshold:
+            break
+        rows.append(row)
+        columns.append(column)
+        scores[row, :] = -1.0
+        scores[:, column] = -1.0
+    return np.asarray(rows, dtype=np.int64), np.asarray(columns, dtype=np.int64)
+
+
+def _xyxy_to_xywh(boxes: np.ndarray) -> np.ndarray:
+    """(x1, y1, x2, y2) -> (cx, cy, w, h)."""
+    return np.concatenate([(boxes[:, :2] + boxes[:, 2:]) / 2, boxes[:, 2:] - boxes[:, :2]], axis=1)
+
+
+def _xywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+    half = boxes[:, 2:4] / 2
+    return np.concatenate([boxes[:, :2] - half, boxes[:, :2] + half], axis=1)
+
+
+class MultiObjectTracker:
+    """
+    Carries detections of one camera forward between detector runs.
+
+    Every track is a constant-velocity Kalman filter over the box centre and
+    size, (cx, cy, w, h, vx, vy, vw, vh), and all tracks are held in stacked
+    arrays so prediction and correction are a few batched matrix operations
+    however many objects are tracked. On frames the detector ran on,
+    detections are associated with the predicted tracks by greedy IoU within
+    each class; unmatched detections start new tracks and tracks missed for
+    more than `max_age` frames are dropped.
+
+    Between detector runs `predict` advances every track by the number of
+    frames elapsed, and the boxes reported are the tracks confirmed at the
+    last detector run, with their confidence decayed by `confidence_decay`
+    per frame to reflect growing uncertainty.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: int = 30, confidence_decay: float = 0.97):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.confidence_decay = confidence_decay
+
+        self.mean = np.empty((0, 8))
+        self.covariance = np.empty((0, 8, 8))
+        self.track_ids = np.empty(0, dtype=np.int64)
+        self.class_ids = np.empty(0, dtype=np.int64)
+        self.scores = np.empty(0)
+        # Frames since each track was last matched to a detection.
+        self.age = np.empty(0, dtype=np.int64)
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self.track_ids)
+
+    def predict(self, frames: int = 1):
+        """Advances every track by `frames` frames of constant-velocity motion."""
+        if not len(self) or frames <= 0:
+            return
+        transition = np.eye(8)
+        transition[:4, 4:] = np.eye(4) * frames
+
+        self.mean = self.mean @ transition.T
+        self.covariance = transition @ self.covariance @ transition.T + self._process_noise(frames)
+        self.age += frames
+
+    def update(self, detections: List[Detection]) -> List[Detection]:
+        """
+        Corrects the tracks with a detector result and returns the detections
+        tagged with the id of the track each one belongs to.
+        """
+        boxes = np.array([[d.left, d.top, d.left + d.width, d.top + d.height] for d in detections],
+                         dtype=np.float64).reshape(-1, 4)
+        class_ids = np.array([d.class_id for d in detections], dtype=np.int64)
+        scores = np.array([d.confidence for d in detections], dtype=np.float64)
+
+        similarity = iou_matrix(_xywh_to_xyxy(self.mean[:, :4]), boxes)
+        similarity[self.class_ids[:, None] != class_ids[None, :]] = 0.0
+        tracks, matched = greedy_match(similarity, self.iou_threshold)
+        detection_track_ids = np.empty(len(detections), dtype=np.int64)
+        detection_track_ids[matched] = self.track_ids[tracks]
+
+        measurements = _xyxy_to_xywh(boxes)
+        if len(tracks):
+            self._correct(tracks, measurements[matched])
+            self.scores[tracks] = scores[matched]
+            self.age[tracks] = 0
+
+        unmatched = np.setdiff1d(np.arange(len(detections)), matched)
+        new_ids = np.arange(self._next_id, self._next_id + len(unmatched))
+        self._next_id += len(unmatched)
+        detection_track_ids[unmatched] = new_ids
+        self._add_tracks(measurements[unmatched], class_ids[unmatched], scores[unmatched], new_ids)
+
+        keep = self.age <= self.max_age
+        for field in ("mean", "covariance", "track_ids", "class_ids", "scores", "age"):
+            setattr(self, field, getattr(self, field)[keep])
+        return [d._replace(track_id=int(track_id)) for d, track_id in zip(detections, detection_track_ids)]
+
+    def current(self, frames_since_detection: int) -> List[Detection]:
+        """Returns the predicted boxes of the tracks matched at the last detector run."""
+        active = self.age == frames_since_detection
+        rects = _xywh_to_xyxy(self.mean[active, :4])
+        rects[:, 2:] -= rects[:, :2]
+        confidences = self.scores[active] * self.confidence_decay ** frames_since_detection
+        return [
+            Detection(class_id, confidence, *rect, track_id=track_id)
+            for class_id, confidence, rect, track_id in zip(
+                self.class_ids[active].tolist(), confidences.tolist(),
+                rects.astype(np.int32).tolist(), self.track_ids[active].tolist())
+        ]
+
+    def _process_noise(self, frames: int) -> np.ndarray:
+        height = self.mean[:, 3]
+        std = np.concatenate([
+            np.repeat((POSITION_NOISE * height)[:, None], 4, axis=1),
+            np.repeat((VELOCITY_NOISE * height)[:, None], 4, axis=1),
+        ], axis=1) * np.sqrt(frames)
+        return np.einsum("ni,ij->nij", std ** 2, np.eye(8))
+
+    def _correct(self, tracks: np.ndarray, measurements: np.ndarray):
+        """Batched Kalman update of `tracks` with (cx, cy, w, h) measurements."""
+        mean = self.mean[tracks]
+        covariance = self.covariance[tracks]
+        measurement_noise = np.einsum(
+            "ni,ij->nij", np.repeat(((POSITION_NOISE * mean[:, 3]) ** 2)[:, None], 4, axis=1), np.eye(4)
+        )
+        projected = covariance[:, :4, :4] + measurement_noise
+        # K = P H^T S^-1, with H selecting the first four state components.
+        gain = np.linalg.solve(projected, covariance[:, :4, :]).transpose(0, 2, 1)
+        innovation = measurements - mean[:, :4]
+
+        self.mean[tracks] = mean + np.einsum("nij,nj->ni", gain, innovation)
+        self.covariance[tracks] = covariance - gain @ covariance[:, :4, :]
+
+    def _add_tracks(self, measurements: np.ndarray, class_ids: np.ndarray, scores: np.ndarray,
+                    track_ids: np.ndarray):
+        mean = np.concatenate([measurements, np.zeros_like(measurements)], axis=1)
+        height = measurements[:, 3]
+        std = np.concatenate([
+            np.repeat((2 * POSITION_NOISE * height)[:, None], 4, axis=1),
+            np.repeat((10 * VELOCITY_NOISE * height)[:, None], 4, axis=1),
+        ], axis=1)
+        self.mean = np.concatenate([self.mean, mean])
+        self.covariance = np.concatenate([self.covariance, np.einsum("ni,ij->nij", std ** 2, np.eye(8))])
+        self.track_ids = np.concatenate([self.track_ids, track_ids])
+        self.class_ids = np.concatenate([self.class_ids, class_ids])
+        self.scores = np.concatenate([self.scores, scores])
+        self.age = np.concatenate([self.age, np.zeros(len(track_ids), dtype=np.int64)])
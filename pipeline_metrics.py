@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Upper bounds (ms) of the histogram buckets, Prometheus-style; a final +Inf
+# bucket is implied.
+DEFAULT_BUCKETS_MS = (0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+METRICS_FORMATS = ("prometheus", "jsonl")
+PERCENTILES = (50, 95, 99)
+
+
+class StageHistogram:
+    """
+    Durations of one pipeline stage.
+
+    Bucket counts, sum and count are cumulative since start, as Prometheus
+    expects; the most recent `window` samples are kept as well so that
+    percentiles describe current behaviour rather than the whole run.
+    """
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS, window=1024):
+        self.buckets_ms = tuple(buckets_ms)
+        self.bucket_counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, duration_ms):
+        index = next((i for i, bound in enumerate(self.buckets_ms) if duration_ms <= bound), len(self.buckets_ms))
+        self.bucket_counts[index] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.recent.append(duration_ms)
+
+    def summary(self):
+        """Returns count, mean, max and percentiles over the rolling window."""
+        if not self.recent:
+            return dict(count=self.count)
+        values = sorted(self.recent)
+        summary = dict(count=self.count, mean=sum(values) / len(values), max=values[-1])
+        for p in PERCENTILES:
+            summary[f"p{p}"] = values[min(len(values) - 1, int(len(values) * p / 100))]
+        return summary
+
+
+class PipelineMetrics:
+    """
+    Thread-safe per-stage timing histograms for the frame pipeline.
+
+    FrameStreamer records its own stages (fill, queue wait, encode, send and
+    the full round trip) and `observe_reply` adds the stages the server
+    reports in each reply, so one object describes where a frame's time goes
+    from camera callback to detections.
+    """
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS, window=1024):
+        self.buckets_ms = buckets_ms
+        self.window = window
+        self.started = time.time()
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, duration_ms):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = StageHistogram(self.buckets_ms, self.window)
+            histogram.observe(duration_ms)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe_reply(self, reply, latency_ms):
+        """Records a server reply: its round trip, server stages, detection count and whether it was gated."""
+        self.observe("round_trip", latency_ms)
+        self.increment("replies_" + str(reply.get("status", "unknown")).lower())
+        for stage, duration_ms in (reply.get("stages") or {}).items():
+            self.observe(stage, duration_ms)
+        self.increment("detections", len(reply.get("detections") or ()))
+        if reply.get("gated"):
+            # The server reused an earlier frame's detections instead of running inference.
+            self.increment("replies_gated")
+            self.increment("inference_saved_ms", reply.get("saved_ms", 0.0))
+
+    def snapshot(self):
+        """Returns the current summaries as a JSON-serializable dict."""
+        with self._lock:
+            return dict(
+                time=time.time(),
+                uptime_s=time.time() - self.started,
+                counters=dict(self._counters),
+                stages_ms={stage: histogram.summary() for stage, histogram in sorted(self._stages.items())},
+            )
+
+    def to_prometheus(self, prefix="perception"):
+        """Renders the histograms and counters in the Prometheus text exposition format."""
+        name = f"{prefix}_stage_duration_ms"
+        lines = [f"# HELP {name} Duration of each frame pipeline stage in milliseconds.",
+                 f"# TYPE {name} histogram"]
+        with self._lock:
+            for stage, histogram in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets_ms + ("+Inf",), histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total_ms}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+            for counter, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {prefix}_{counter}_total counter")
+                lines.append(f"{prefix}_{counter}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """
+    Periodically writes PipelineMetrics from a background thread.
+
+    'prometheus' rewrites `path` atomically in the text exposition format, for
+    the node_exporter textfile collector; 'jsonl' appends one snapshot per
+    interval so a run can be analysed afterwards.
+    """
+
+    def __init__(self, metrics, path, fmt="prometheus", interval_s=5.0):
+        if fmt not in METRICS_FORMATS:
+            raise ValueError(f"Unknown metrics format '{fmt}', expected one of {METRICS_FORMATS}")
+        self.metrics = metrics
+        self.path = path
+        self.fmt = fmt
+        self.interval = interval_s
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Stops the exporter after writing one final export."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def export(self):
+        if self.fmt == "jsonl":
+            with open(self.path, "a") as f:
+                f.write(json.dumps(self.metrics.snapshot()) + "\n")
+            return
+
+        # Written under a temporary name and moved into place so scrapers never see a partial file.
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.metrics.to_prometheus())
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._export_logged()
+        self._export_logged()
+
+    def _export_logged(self):
+        try:
+            self.export()
+        except OSError as e:
+            print(f"Error exporting metrics to '{self.path}': {e}")
@@ -0,0 +1,114 @@
+"""
+Replays a recording made with `run_simulation.py --record` to the inference
+server, so the server can be load-tested without a CARLA simulator or network.
+
+Rates:
+  native  reproduce the original capture timing
+  fixed   send at --fps frames per second
+  max     send as fast as the server acknowledges frames, without dropping any
+"""
+import argparse
+import time
+
+import zmq
+
+from frame_codec import FrameEncoder
+from frame_protocol import ENCODINGS
+from frame_recorder import FrameRecording
+from frame_streamer import BACKPRESSURE_POLICIES, FrameStreamer
+
+REPLAY_RATES = ("native", "fixed", "max")
+
+
+def replay(recording, streamer, rate="native", fps=None, loops=1):
+    """
+    Submits every recorded frame to `streamer`, paced according to `rate`.
+    Frame ids are offset on every loop so replies stay distinguishable.
+
+    Returns:
+        The number of frames submitted.
+    """
+    frame_offset = 0
+    submitted = 0
+    start = time.perf_counter()
+
+    for _ in range(loops):
+        first_capture_ns = None
+        last_frame = 0
+        for captured_ns, header, payload in recording:
+            if rate == "native":
+                if first_capture_ns is None:
+                    first_capture_ns = captured_ns
+                    loop_start = time.perf_counter()
+                due = loop_start + (captured_ns - first_capture_ns) / 1e9
+            elif rate == "fixed":
+                due = start + submitted / fps
+            else:
+                due = None
+                # Keep the window full but never let frames pile up and get dropped.
+                streamer.wait_for_backlog(streamer.max_in_flight - 1)
+
+            if due is not None:
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            streamer.submit(header._replace(frame=header.frame + frame_offset), payload)
+            submitted += 1
+            last_frame = max(last_frame, header.frame)
+        frame_offset += last_frame + 1
+
+    return submitted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a frame recording to the inference server.")
+    parser.add_argument("recording", help="Path of a recording made with run_simulation.py --record.")
+    parser.add_argument("--endpoint", default="tcp://localhost:5555", help="ZMQ endpoint of the inference server.")
+    parser.add_argument("--rate", choices=REPLAY_RATES, default="native", help="How to pace the replay.")
+    parser.add_argument("--fps", type=float, default=20.0, help="Frame rate for --rate fixed.")
+    parser.add_argument("--loops", type=int, default=1, help="How many times to replay the recording.")
+    parser.add_argument("--max-in-flight", type=int, default=4,
+                        help="Maximum number of frames awaiting a reply.")
+    parser.add_argument("--policy", choices=BACKPRESSURE_POLICIES, default="latest",
+                        help="Which frames to drop when the server falls behind (ignored for --rate max).")
+    parser.add_argument("--encoding", choices=tuple(ENCODINGS), default="raw",
+                        help="On-the-wire frame encoding.")
+    parser.add_argument("--jpeg-quality", type=int, default=90,
+                        help="JPEG quality used by the 'jpeg' encoding.")
+    parser.add_argument("--shared-memory", action="store_true",
+                        help="Pass frames through shared memory instead of the socket (same host, "
+                             "inference_server.py, Python 3.8+, 'raw' or 'bgr' encoding).")
+    args = parser.parse_args()
+
+    with FrameRecording(args.recording) as recording:
+        sensors = {header.sensor_id for _, header, _ in recording}
+        frame_size = max(header.payload_size for _, header, _ in recording)
+        print(f"Replaying {len(recording)} frame(s) from {len(sensors)} sensor(s) at '{args.rate}' rate.")
+
+        streamer = FrameStreamer(
+            zmq.Context.instance(), args.endpoint,
+            max_in_flight=args.max_in_flight,
+            policy="queue" if args.rate == "max" else args.policy,
+            frame_size=frame_size,
+            encoder=FrameEncoder(args.encoding, quality=args.jpeg_quality),
+            sensor_count=len(sensors),
+            shared_memory=args.shared_memory
+        ).start()
+
+        start = time.perf_counter()
+        try:
+            submitted = replay(recording, streamer, args.rate, args.fps, args.loops)
+            streamer.wait_for_backlog(0, timeout=streamer.reply_timeout)
+        finally:
+            streamer.close()
+        elapsed = time.perf_counter() - start
+
+    stats = streamer.stats()
+    print(f"Submitted {submitted} frame(s) in {elapsed:.1f} s, "
+          f"{stats['acknowledged'] / elapsed:.1f} acknowledged frames/s.")
+    print(f"Stream stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
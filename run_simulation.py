@@ -1,3 +1,4 @@
+import argparse
 import sys
 import os
 import random
@@ -25,73 +26,220 @@ except (IndexError, FileNotFoundError, ImportError) as e:
     print(f"Error importing CARLA: {e}")
     sys.exit()
 
-from carla_actor_factory import CarlaActorFactory
+from carla_actor_factory import CAMERA_MOUNTS, CameraSpec, CarlaActorFactory
+from frame_codec import FrameEncoder
+from frame_protocol import ENCODINGS, FrameHeader
+from frame_recorder import FrameRecorder
+from frame_router import SHARDING_STRATEGIES, ShardedStreamer
+from frame_streamer import BACKPRESSURE_POLICIES
+from pipeline_metrics import METRICS_FORMATS, MetricsExporter, PipelineMetrics
+from simulation_driver import SynchronousDriver
 
-def camera_callback(image, socket):
+def camera_callback(image, streamer, sensor_id=0, recorder=None):
     """
-    This function is called every time the camera sensor gets a new image.
-    It sends the image data to the C++ server via ZMQ.
+    This function is called every time a camera sensor gets a new image.
+    It hands the image data to the background streamer, which sends it to the
+    C++ server via ZMQ without blocking the CARLA sensor thread, and to the
+    recorder when the run is being recorded for offline replay.
     """
 
     try:
-        metadata = dict(
-            height=image.height,
+        raw_data = image.raw_data
+        header = FrameHeader(
+            frame=image.frame,
             width=image.width,
+            height=image.height,
             channels=4,
-            frame=image.frame
+            payload_size=len(raw_data),
+            sensor_id=sensor_id
         )
 
-        socket.send_json(metadata, flags=zmq.SNDMORE)
-
-        socket.send(image.raw_data)
-
-        reply_message = socket.recv_string()
-
-        print(f"Received reply form C++: [{reply_message}] for frame {metadata['frame']}")
+        if recorder is not None:
+            recorder.record(header, raw_data)
+        streamer.submit(header, raw_data)
 
     except Exception as e:
         print(f"Error in camers callback: {e}")
 
+def print_reply(reply, latency_ms):
+    print(f"Received reply form C++: [{reply['status']}] for frame {reply['frame']} "
+          f"of sensor {reply.get('sensor', 0)} ({latency_ms:.1f} ms, "
+          f"{len(reply.get('detections') or ())} detections)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stream CARLA camera frames to the inference server.")
+    parser.add_argument("--carla-host", default="34.148.135.236", help="CARLA server host.")
+    parser.add_argument("--carla-port", type=int, default=2000, help="CARLA server port.")
+    parser.add_argument("--endpoints", "--endpoint", nargs="+", default=["tcp://host.docker.internal:5555"],
+                        help="ZMQ endpoints of the inference servers frames are spread over.")
+    parser.add_argument("--sharding", choices=SHARDING_STRATEGIES, default="sticky",
+                        help="How frames are spread over the endpoints' connections.")
+    parser.add_argument("--sync", action="store_true",
+                        help="Run CARLA in synchronous mode, ticking only as fast as frames are consumed.")
+    parser.add_argument("--fixed-delta", type=float, default=0.05,
+                        help="Simulated seconds per tick in synchronous mode.")
+    parser.add_argument("--ticks", type=int, default=None,
+                        help="Stop after this many ticks in synchronous mode (default: run forever).")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for spawn point selection and traffic manager behaviour.")
+    parser.add_argument("--record", default=None, metavar="PATH",
+                        help="Also record every camera frame to this file for replay_stream.py.")
+    parser.add_argument("--vehicles", type=int, default=1, help="Number of autopilot vehicles to spawn.")
+    parser.add_argument("--cameras", nargs="+", choices=tuple(CAMERA_MOUNTS), default=["front"],
+                        help="Camera positions mounted on every vehicle.")
+    parser.add_argument("--camera-width", type=int, default=1280)
+    parser.add_argument("--camera-height", type=int, default=720)
+    parser.add_argument("--camera-fps", type=float, default=None,
+                        help="Capture rate of each camera (default: every simulation tick).")
+    parser.add_argument("--streams", type=int, default=1,
+                        help="Number of sockets opened to each endpoint.")
+    parser.add_argument("--max-in-flight", type=int, default=4,
+                        help="Maximum number of frames awaiting a reply per stream.")
+    parser.add_argument("--policy", choices=BACKPRESSURE_POLICIES, default=None,
+                        help="Which frames to drop when the server falls behind (default: 'latest', "
+                             "or 'queue' with --sync).")
+    parser.add_argument("--max-queue-depth", type=int, default=4,
+                        help="Unsent frames kept per camera by the 'queue' and 'subsample' policies.")
+    parser.add_argument("--max-fps", type=float, default=None,
+                        help="Frame rate admitted per camera by the 'subsample' policy.")
+    parser.add_argument("--max-age-ms", type=float, default=None,
+                        help="Drop queued frames older than this instead of sending them.")
+    parser.add_argument("--encoding", choices=tuple(ENCODINGS), default="raw",
+                        help="On-the-wire frame encoding.")
+    parser.add_argument("--jpeg-quality", type=int, default=90,
+                        help="JPEG quality used by the 'jpeg' encoding.")
+    parser.add_argument("--shared-memory", action="store_true",
+                        help="Pass frames through shared memory instead of the socket (same host, "
+                             "inference_server.py, Python 3.8+, 'raw' or 'bgr' encoding).")
+    parser.add_argument("--metrics-file", default=None, metavar="PATH",
+                        help="Periodically export per-stage timing histograms to this file.")
+    parser.add_argument("--metrics-format", choices=METRICS_FORMATS, default="prometheus",
+                        help="'prometheus' rewrites a textfile-collector file, 'jsonl' appends snapshots.")
+    parser.add_argument("--metrics-interval", type=float, default=5.0,
+                        help="Seconds between metrics exports.")
+    args = parser.parse_args()
+
+    if args.sync:
+        if args.camera_fps is not None:
+            parser.error("--camera-fps cannot be used with --sync; every tick produces one frame per camera")
+        # Ticks wait for the pipeline instead of dropping frames.
+        if args.policy not in (None, "queue"):
+            parser.error(f"--policy {args.policy} cannot be used with --sync; frames are queued, never dropped")
+        if args.max_age_ms is not None:
+            parser.error("--max-age-ms cannot be used with --sync; frames are queued, never dropped")
+        args.policy = "queue"
+    elif args.policy is None:
+        args.policy = "latest"
+    return args
+
 def main():
+    args = parse_args()
     actors_list = []
-    socket = None
+    streamer = None
+    driver = None
+    recorder = None
+    exporter = None
 
     try:
-        context = zmq.Context()
-        socket = context.socket(zmq.REQ)
-        socket.connect("tcp://host.docker.internal:5555")
+        camera_specs = [
+            CameraSpec(mount, args.camera_width, args.camera_height, args.camera_fps) for mount in args.cameras
+        ]
+        # Failover can move any camera to any connection, so every ring has room for all of them.
+        sensor_count = args.vehicles * len(camera_specs)
+
+        if args.record:
+            recorder = FrameRecorder(args.record)
+
+        metrics = None
+        if args.metrics_file:
+            metrics = PipelineMetrics()
+            exporter = MetricsExporter(metrics, args.metrics_file, args.metrics_format,
+                                       args.metrics_interval).start()
 
-        client = carla.Client('34.148.135.236', 2000)
+        context = zmq.Context()
+        streamer = ShardedStreamer(
+            context, args.endpoints,
+            strategy=args.sharding,
+            connections=args.streams,
+            max_in_flight=args.max_in_flight,
+            policy=args.policy,
+            max_queue_depth=args.max_queue_depth,
+            max_fps=args.max_fps,
+            max_age_ms=args.max_age_ms,
+            on_reply=print_reply,
+            frame_size=args.camera_width * args.camera_height * 4,
+            encoder=FrameEncoder(args.encoding, quality=args.jpeg_quality),
+            sensor_count=sensor_count,
+            metrics=metrics,
+            shared_memory=args.shared_memory
+        ).start()
+
+        client = carla.Client(args.carla_host, args.carla_port)
         client.set_timeout(10.0)
         world = client.get_world()
 
-        factory = CarlaActorFactory(world, world.get_blueprint_library())
-        spawn_point = random.choice(world.get_map().get_spawn_points())
+        if args.sync:
+            driver = SynchronousDriver(client, world, args.fixed_delta, args.seed).enable()
+            spawn_points = driver.select_spawn_points(args.vehicles)
+        else:
+            spawn_points = random.Random(args.seed).sample(world.get_map().get_spawn_points(), args.vehicles)
+
+        factory = CarlaActorFactory(world, world.get_blueprint_library(), client)
+
+        vehicles = factory.create_vehicles('vehicle.tesla.model3', spawn_points)
+        actors_list.extend(vehicles)
 
-        vehicle = factory.create_vehicle('vehicle.tesla.model3', spawn_point)
-        actors_list.append(vehicle)
-        vehicle.set_autopilot(True)
+        rig = factory.create_camera_rig(vehicles, camera_specs)
+        actors_list.extend(camera.actor for camera in rig)
 
-        camera = factory.create_camera(vehicle)
-        actors_list.append(camera)
+        for camera in rig:
+            camera.actor.listen(
+                lambda image, sensor_id=camera.sensor_id:
+                    camera_callback(image, streamer, sensor_id, recorder)
+            )
 
-        camera.listen(lambda image: camera_callback(image, socket))
+        print(f"\n Simulation running. Streaming {len(rig)} camera(s) on {len(vehicles)} vehicle(s) "
+              f"to {len(args.endpoints)} inference server(s).")
 
-        print("\n Simulation running. Streaming camera data to C++ server.")
+        if driver:
+            try:
+                driver.run([(streamer, len(rig))], args.ticks)
+            finally:
+                print(f"Ran {driver.ticks} ticks in {driver.elapsed:.1f} s "
+                      f"({driver.ticks_per_second:.1f} ticks/s, "
+                      f"{driver.ticks_per_second * len(rig):.1f} frames/s)")
+            return
 
         while True:
             time.sleep(1)
+            for index, stats in enumerate(streamer.shard_stats()):
+                if stats["dropped"] or not stats["healthy"]:
+                    print(f"Stream {index} stats: {stats}")
 
     except Exception as e:
         print(f"\nAn error occured in main: {e}")
 
     finally:
-        if socket:
-            socket.close()
+        # Stop and destroy the cameras first so no callback writes into a closed streamer or recorder.
         if actors_list:
+            for actor in actors_list:
+                if actor.type_id.startswith('sensor.'):
+                    actor.stop()
             print("Destroying actors...")
             client.apply_batch([carla.command.DestroyActor(x) for x in actors_list])
             print("Done")
+        if streamer:
+            streamer.close()
+            for index, stats in enumerate(streamer.shard_stats()):
+                print(f"Final stream {index} stats: {stats}")
+        if exporter:
+            exporter.close()
+            print(f"Pipeline metrics written to '{args.metrics_file}'")
+        if recorder:
+            recorder.close()
+            print(f"Recorded {recorder.recorded} frame(s) to '{args.record}'")
+        if driver:
+            driver.restore()
 
 if __name__ == '__main__':
     main()
@@ -1,9 +1,14 @@
+from __future__ import annotations
+
 import argparse
-import random
-import shutil
-from collections import defaultdict
 from pathlib import Path
-from tqdm import tqdm
+from typing import Dict, Optional, Set
+
+import numpy as np
+
+from balanced_sampler import SAMPLING_STRATEGIES, BalancedSampler, class_targets
+from label_index import LabelIndex, load_label_index
+from materialize import MATERIALIZE_MODES, materialize_files, write_manifest
 
 # --- Configuration Constants ---
 # This map defines the meaning of the class IDs in the YOLO .txt files.
@@ -28,104 +33,111 @@ SAMPLING_TARGETS = {
 }
 
 
-def catalog_dataset(label_dir: Path) -> dict[str, set[str]]:
+def catalog_dataset(label_dir: Path) -> Dict[str, Set[str]]:
     """
-    Scans a directory of YOLO .txt files and catalogs which classes appear in each image.
+    Catalogs which classes appear in each image of a directory of YOLO .txt files.
 
-    Args:
-        label_dir: The path to the directory containing YOLO label files.
+    Kept for scripts written against the original API; it is now a view of
+    the cached label index (see label_index.load_label_index).
 
     Returns:
         A dictionary mapping each image basename (e.g., 'image01.jpg') to a set
         of class names present in that image.
     """
-    print("Cataloging all YOLO label data...")
-    image_to_classes = defaultdict(set)
-    label_files = list(label_dir.glob('*.txt'))
-
-    for label_file in tqdm(label_files, desc="Parsing labels"):
-        image_basename = label_file.with_suffix('.jpg').name
-        with open(label_file, 'r') as f:
-            for line in f:
-                try:
-                    class_id = int(line.split()[0])
-                    class_name = CLASS_MAP.get(class_id)
-                    if class_name:
-                        image_to_classes[image_basename].add(class_name)
-                except (ValueError, IndexError):
-                    print(f"Warning: Skipping malformed line in {label_file.name}")
-    
-    print(f"Catalog complete. Found {len(image_to_classes)} images with labels.")
-    return image_to_classes
-
-
-def select_balanced_subset(image_catalog: dict[str, set[str]]) -> set[str]:
+    return load_label_index(label_dir).image_classes(CLASS_MAP)
+
+
+def select_balanced_subset(image_catalog: Dict[str, Set[str]]) -> Set[str]:
+    """
+    Selects a balanced subset of images from a `catalog_dataset` catalog,
+    sampling every class independently as the original script did.
+
+    Kept for scripts written against the original API; new code should use
+    select_balanced_images, which works on the label index directly.
+    """
+    image_names = list(image_catalog)
+    class_ids = {class_name: class_id for class_id, class_name in CLASS_MAP.items()}
+    present = np.zeros((len(image_names), len(CLASS_MAP)), dtype=bool)
+    for image_id, classes in enumerate(image_catalog.values()):
+        present[image_id, [class_ids[class_name] for class_name in classes if class_name in class_ids]] = True
+
+    sampler = BalancedSampler(present)
+    selected = sampler.select(class_targets(CLASS_MAP, SAMPLING_TARGETS), 'random')
+    return {image_names[image_id] for image_id in selected}
+
+
+def select_balanced_images(index: LabelIndex, strategy: str = 'greedy', seed: Optional[int] = None) -> Set[str]:
     """
     Selects a balanced subset of images based on the sampling targets.
 
     Args:
-        image_catalog: A dictionary mapping image names to the classes they contain.
+        index: The label index of the dataset.
+        strategy: One of SAMPLING_STRATEGIES (see BalancedSampler).
+        seed: Seed for reproducible sampling, or None for a different subset every run.
 
     Returns:
         A set of unique image basenames that form the balanced dataset.
     """
-    print("Selecting a balanced set of images...")
-    final_image_set = set()
-
-    for class_name, target_count in SAMPLING_TARGETS.items():
-        # Find all images that contain the current class
-        images_with_class = [
-            img for img, classes in image_catalog.items() if class_name in classes
-        ]
-        
-        # Sample from the list to meet the target count
-        if len(images_with_class) > target_count:
-            selected = random.sample(images_with_class, target_count)
-        else:
-            selected = images_with_class  # Take all if not enough are available
-            
-        final_image_set.update(selected)
-        print(f"  - Class '{class_name}': Found {len(images_with_class)} images, using {len(selected)}.")
-        
-    print(f"Image selection complete. Total unique images selected: {len(final_image_set)}")
-    return final_image_set
+    print(f"Selecting a balanced set of images ({strategy} strategy)...")
+    sampler = BalancedSampler.from_index(index, len(CLASS_MAP), seed)
+    targets = class_targets(CLASS_MAP, SAMPLING_TARGETS)
+    selected = sampler.select(targets, strategy)
+
+    available, covered = sampler.available, sampler.coverage(selected)
+    for class_id, class_name in CLASS_MAP.items():
+        if class_name in SAMPLING_TARGETS:
+            print(f"  - Class '{class_name}': Found {available[class_id]} images, "
+                  f"target {targets[class_id]}, selected subset has {covered[class_id]}.")
+
+    print(f"Image selection complete. Total unique images selected: {len(selected)}")
+    return {str(name) + '.jpg' for name in index.image_names[selected]}
 
 
 def create_balanced_dataset(
-    image_files_to_copy: set[str],
+    image_files_to_copy: Set[str],
     src_img_dir: Path,
     src_lbl_dir: Path,
-    output_dir: Path
+    output_dir: Path,
+    mode: str = 'hardlink'
 ):
     """
-    Copies the selected image and label files to a new directory structure.
-    
+    Materializes the selected image and label files in a new directory structure.
+
     Args:
         image_files_to_copy: A set of image basenames to include in the new dataset.
         src_img_dir: The original directory of images.
         src_lbl_dir: The original directory of labels.
         output_dir: The root directory for the new balanced dataset.
+        mode: One of MATERIALIZE_MODES. 'manifest' only writes
+            `output_dir/train.txt`, a list of the original image paths.
     """
-    print("Copying files to the new balanced directory...")
+    pairs = []
+    for image_name in image_files_to_copy:
+        label_name = Path(image_name).with_suffix('.txt').name
+        src_img = src_img_dir / image_name
+        src_lbl = src_lbl_dir / label_name
+        if src_img.exists() and src_lbl.exists():
+            pairs.append((src_img, src_lbl))
+
+    if mode == 'manifest':
+        manifest_path = output_dir / 'train.txt'
+        write_manifest([src_img for src_img, _ in pairs], manifest_path)
+        print(f"Success! Your balanced image list is ready at '{manifest_path}'.")
+        return
+
+    print(f"Materializing files in the new balanced directory ({mode})...")
     balanced_img_dir = output_dir / 'images' / 'train'
     balanced_lbl_dir = output_dir / 'labels' / 'train'
 
     balanced_img_dir.mkdir(parents=True, exist_ok=True)
     balanced_lbl_dir.mkdir(parents=True, exist_ok=True)
 
-    for image_name in tqdm(image_files_to_copy, desc="Copying files"):
-        label_name = Path(image_name).with_suffix('.txt').name
-
-        src_img = src_img_dir / image_name
-        src_lbl = src_lbl_dir / label_name
-        
-        dest_img = balanced_img_dir / image_name
-        dest_lbl = balanced_lbl_dir / label_name
-        
-        if src_img.exists() and src_lbl.exists():
-            shutil.copyfile(src_img, dest_img)
-            shutil.copyfile(src_lbl, dest_lbl)
-
+    methods = materialize_files(
+        [(src_img, balanced_img_dir / src_img.name) for src_img, _ in pairs]
+        + [(src_lbl, balanced_lbl_dir / src_lbl.name) for _, src_lbl in pairs],
+        mode
+    )
+    print(f"Files created by method: {dict(methods)}")
     print(f"Success! Your new balanced dataset is ready at '{output_dir}'.")
 
 
@@ -146,17 +158,33 @@ def main():
         "--output_dir", type=Path, required=True,
         help="Path to the directory where the balanced dataset will be saved."
     )
+    parser.add_argument(
+        "--strategy", choices=SAMPLING_STRATEGIES, default='greedy',
+        help="'greedy' meets the targets with as few images as possible; 'random' samples each class independently."
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None,
+        help="Seed for reproducible sampling."
+    )
+    parser.add_argument(
+        "--mode", choices=MATERIALIZE_MODES, default='hardlink',
+        help="How files reach the output directory. Links and reflinks fall back to copies where unsupported; "
+             "'manifest' writes an image list for the trainer instead (labels must sit in a sibling 'labels' "
+             "directory of the images)."
+    )
     args = parser.parse_args()
 
     # Step 1: Understand the content of the dataset
-    image_catalog = catalog_dataset(args.label_dir)
+    print("Cataloging all YOLO label data...")
+    index = load_label_index(args.label_dir)
+    print(f"Catalog complete. Found {index.image_count} label files.")
 
     # Step 2: Choose which images to use for the balanced set
-    selected_images = select_balanced_subset(image_catalog)
+    selected_images = select_balanced_images(index, args.strategy, args.seed)
 
-    # Step 3: Copy the chosen files to the new location
+    # Step 3: Materialize the chosen files in the new location
     create_balanced_dataset(
-        selected_images, args.image_dir, args.label_dir, args.output_dir
+        selected_images, args.image_dir, args.label_dir, args.output_dir, args.mode
     )
 
 
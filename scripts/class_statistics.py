@@ -0,0 +1,167 @@
+"""
+Streaming class-distribution statistics for a directory of YOLO label files.
+
+Worker processes parse chunks of label files and fold them into fixed-size
+accumulators (counts, image co-occurrence, box size and aspect histograms and
+per-class spatial heatmaps), which the parent merges. Memory therefore stays
+bounded by the accumulator size rather than growing with the number of boxes.
+The result is cached next to the labels so charts can be regenerated without
+rescanning, and is recomputed automatically when the labels change.
+"""
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from tqdm import tqdm
+
+from label_index import list_label_files, parse_label_files
+
+STATISTICS_NAME = '.class_statistics.npz'
+
+# Bump when the accumulators or their bins change.
+STATISTICS_VERSION = 1
+
+# Box size is sqrt(width * height) as a fraction of the image, on a log scale.
+SIZE_BINS = np.geomspace(1e-3, 1.0, 31)
+# Aspect ratio is log2(width / height) in pixels, so 0 is square.
+ASPECT_BINS = np.linspace(-4.0, 4.0, 33)
+# (rows, columns) of the box-center heatmaps; 16:9 like the BDD100K frames.
+HEATMAP_SHAPE = (18, 32)
+IMG_WIDTH, IMG_HEIGHT = 1280, 720
+
+
+class ClassStatistics:
+    """
+    Fixed-size per-class accumulators over any number of label files.
+
+    Attributes:
+        images: Number of label files seen.
+        counts: Boxes per class.
+        cooccurrence: (C, C) number of images containing both classes; the
+            diagonal is the number of images containing each class.
+        size_hist: (C, len(SIZE_BINS) - 1) box size histogram per class.
+        aspect_hist: (C, len(ASPECT_BINS) - 1) aspect ratio histogram per class.
+        heatmaps: (C, *HEATMAP_SHAPE) box-center histogram per class.
+    """
+
+    FIELDS = ('counts', 'cooccurrence', 'size_hist', 'aspect_hist', 'heatmaps')
+
+    def __init__(self, num_classes: int):
+        self.num_classes = num_classes
+        self.images = 0
+        self.counts = np.zeros(num_classes, dtype=np.int64)
+        self.cooccurrence = np.zeros((num_classes, num_classes), dtype=np.int64)
+        self.size_hist = np.zeros((num_classes, len(SIZE_BINS) - 1), dtype=np.int64)
+        self.aspect_hist = np.zeros((num_classes, len(ASPECT_BINS) - 1), dtype=np.int64)
+        self.heatmaps = np.zeros((num_classes,) + HEATMAP_SHAPE, dtype=np.int64)
+
+    def update(self, image_count: int, image_ids: np.ndarray, class_ids: np.ndarray, boxes: np.ndarray):
+        """Adds the boxes of `image_count` images; `image_ids` index into those images."""
+        num_classes = self.num_classes
+        known = class_ids < num_classes
+        image_ids, class_ids, boxes = image_ids[known], class_ids[known], boxes[known]
+
+        self.images += image_count
+        self.counts += np.bincount(class_ids, minlength=num_classes)
+
+        present = np.zeros((image_count, num_classes), dtype=np.int64)
+        present[image_ids, class_ids] = 1
+        self.cooccurrence += present.T @ present
+
+        # Geometry histograms only use lines with a complete, non-degenerate box.
+        valid = np.isfinite(boxes).all(axis=1) & (boxes[:, 2] > 0) & (boxes[:, 3] > 0)
+        class_ids = class_ids[valid]
+        center_x, center_y, width, height = boxes[valid].T
+
+        size = np.clip(np.sqrt(width * height), SIZE_BINS[0], SIZE_BINS[-1])
+        self.size_hist += self._class_histogram(class_ids, size, SIZE_BINS)
+        aspect = np.clip(np.log2((width * IMG_WIDTH) / (height * IMG_HEIGHT)), ASPECT_BINS[0], ASPECT_BINS[-1])
+        self.aspect_hist += self._class_histogram(class_ids, aspect, ASPECT_BINS)
+
+        rows, columns = HEATMAP_SHAPE
+        row = np.clip((center_y * rows).astype(np.int64), 0, rows - 1)
+        column = np.clip((center_x * columns).astype(np.int64), 0, columns - 1)
+        cells = (class_ids.astype(np.int64) * rows + row) * columns + column
+        self.heatmaps += np.bincount(cells, minlength=self.heatmaps.size).reshape(self.heatmaps.shape)
+
+    def merge(self, other: 'ClassStatistics') -> 'ClassStatistics':
+        self.images += other.images
+        for field in self.FIELDS:
+            total = getattr(self, field)
+            np.add(total, getattr(other, field), out=total)
+        return self
+
+    def save(self, path: Path, signature: np.ndarray):
+        # Written under a temporary name and moved into place so readers never see a partial file.
+        tmp_path = path.with_name(path.name + '.tmp.npz')
+        np.savez(tmp_path, version=np.int64(STATISTICS_VERSION), signature=signature, images=np.int64(self.images),
+                 **{field: getattr(self, field) for field in self.FIELDS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional[Tuple['ClassStatistics', np.ndarray]]:
+        """Returns the statistics cached at `path` and their label signature, or None if unusable."""
+        with np.load(path) as cached:
+            if cached['version'] != STATISTICS_VERSION:
+                return None
+            stats = cls(len(cached['counts']))
+            stats.images = int(cached['images'])
+            for field in cls.FIELDS:
+                setattr(stats, field, cached[field])
+            return stats, cached['signature']
+
+    def _class_histogram(self, class_ids: np.ndarray, values: np.ndarray, bins: np.ndarray) -> np.ndarray:
+        bin_ids = np.clip(np.searchsorted(bins, values, side='right') - 1, 0, len(bins) - 2)
+        flat = class_ids.astype(np.int64) * (len(bins) - 1) + bin_ids
+        return np.bincount(flat, minlength=self.num_classes * (len(bins) - 1)).reshape(self.num_classes, -1)
+
+
+def _chunk_statistics(label_dir: Path, filenames: List[str], num_classes: int) -> ClassStatistics:
+    image_ids, class_ids, boxes, _ = parse_label_files(label_dir, filenames)
+    stats = ClassStatistics(num_classes)
+    stats.update(len(filenames), image_ids, class_ids, boxes)
+    return stats
+
+
+def compute_class_statistics(label_dir: Path, num_classes: int, filenames: Optional[List[str]] = None,
+                             workers: Optional[int] = None, chunk_size: int = 1024) -> ClassStatistics:
+    """Scans every label file of `label_dir` in a pool of `workers` processes."""
+    label_dir = Path(label_dir)
+    if filenames is None:
+        filenames, _ = list_label_files(label_dir)
+    chunks = [filenames[i:i + chunk_size] for i in range(0, len(filenames), chunk_size)]
+
+    stats = ClassStatistics(num_classes)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partials = pool.map(_chunk_statistics, [label_dir] * len(chunks), chunks, [num_classes] * len(chunks))
+        with tqdm(total=len(filenames), desc=f"Analyzing {label_dir.name} labels", unit="file") as progress:
+            for chunk, partial in zip(chunks, partials):
+                stats.merge(partial)
+                progress.update(len(chunk))
+    return stats
+
+
+def load_class_statistics(label_dir: Path, num_classes: int, rebuild: bool = False,
+                          workers: Optional[int] = None) -> ClassStatistics:
+    """
+    Returns the statistics of `label_dir`, loading the cached copy when it is
+    still up to date and recomputing and caching them otherwise.
+    """
+    label_dir = Path(label_dir)
+    cache_path = label_dir / STATISTICS_NAME
+    filenames, signature = list_label_files(label_dir)
+
+    if not rebuild and cache_path.exists():
+        cached = ClassStatistics.load(cache_path)
+        if cached is not None:
+            stats, cached_signature = cached
+            if stats.num_classes == num_classes and np.array_equal(cached_signature, signature):
+                return stats
+
+    stats = compute_class_statistics(label_dir, num_classes, filenames, workers)
+    stats.save(cache_path, signature)
+    return stats
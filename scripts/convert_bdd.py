@@ -1,74 +1,228 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
 import json
 import os
 import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
+from typing import Dict, List, Optional, Tuple
+
+# orjson parses the BDD100K label files several times faster than the json
+# module; fall back to the standard library when it is not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CLASS_MAP = {
+    'person': 0, 'rider': 1, 'car': 2, 'truck': 3,
+    'bus': 4, 'train': 5, 'motor': 6, 'bike': 7,
+    'traffic light': 8, 'traffic sign': 9
+}
+
+IMG_WIDTH, IMG_HEIGHT = 1280, 720
+
+# Bump whenever yolo_labels() would produce different output for the same
+# input, so incremental runs reconvert everything once.
+CONVERTER_VERSION = 1
+
+# Kept in each output split directory; records what every JSON file was last
+# converted from and into.
+MANIFEST_NAME = '.convert_manifest.json'
+
+
+def parse_label_json(raw: bytes) -> dict:
+    """Parses the contents of one BDD100K JSON label file, using orjson when it is available."""
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def load_label_file(json_path: str) -> dict:
+    """Reads one BDD100K JSON label file."""
+    with open(json_path, 'rb') as f:
+        return parse_label_json(f.read())
 
-def convert_to_yolo(source_dir, output_dir):
+
+def yolo_labels(data: dict) -> List[str]:
     """
-    Converts BDD100K JSON files to YOLOv8 TXT format using the
-    correct class names discovered from forensic analysis.
+    Converts the objects of one BDD100K video label into sorted, de-duplicated
+    YOLO lines using the class names discovered from forensic analysis.
     """
+    labels = set()
+    for frame in data.get('frames', ()):
+        for label in frame.get('objects', ()):
+            class_id = CLASS_MAP.get(label.get('category'))
+            box = label.get('box2d')
+            if class_id is None or box is None:
+                continue
 
-    class_map = {
-        'person': 0, 'rider': 1, 'car': 2, 'truck': 3,
-        'bus': 4, 'train': 5, 'motor': 6, 'bike': 7,
-        'traffic light': 8, 'traffic sign': 9
-    }
-
-    json_files = [f for f in os.listdir(source_dir) if f.endswith('.json')]
-    print(f"\nFound {len(json_files)} json files. Converting to YOLO format...")
-
-    for json_file in tqdm(json_files, desc=f"Converting {os.path.basename(source_dir)}"):
-        json_path = os.path.join(source_dir, json_file)
-        with open(json_path) as f:
-            data = json.load(f)
-
-        txt_filename = data['name'] + '.txt'
-        txt_filepath = os.path.join(output_dir, txt_filename)
-
-        all_yolo_labels = []
-        if 'frames' in data:
-            for frame in data['frames']:
-                if 'objects' in frame:
-                    for label in frame['objects']:
-                        category = label.get('category')
-                        if category in class_map and 'box2d' in label:
-                            class_id = class_map[category]
-                            x1, y1, x2, y2 = label['box2d'].values()
-
-                            img_width, img_height = 1280, 720
-                            box_width = x2 - x1
-                            box_height = y2 - y1
-                            center_x = x1 + box_width / 2
-                            center_y = y1 + box_height / 2
-
-                            norm_center_x = center_x / img_width
-                            norm_center_y = center_y / img_height
-                            norm_width = box_width / img_width
-                            norm_height = box_height / img_height
-
-                            all_yolo_labels.append(f"{class_id} {norm_center_x:.6f} {norm_center_y:.6f} {norm_width:.6f} {norm_height:.6f}")
-
-        unique_labels = sorted(list(set(all_yolo_labels)))
-        if unique_labels:
-            with open(txt_filepath, 'w') as f_out:
-                f_out.write('\n'.join(unique_labels))
+            x1, y1, x2, y2 = box['x1'], box['y1'], box['x2'], box['y2']
+            box_width = x2 - x1
+            box_height = y2 - y1
+            labels.add(
+                f"{class_id} {(x1 + box_width / 2) / IMG_WIDTH:.6f} {(y1 + box_height / 2) / IMG_HEIGHT:.6f} "
+                f"{box_width / IMG_WIDTH:.6f} {box_height / IMG_HEIGHT:.6f}"
+            )
+    return sorted(labels)
 
-if __name__ == '__main__':
-    source_root = './datasets/bdd100k/labels_json/100k'
-    output_root = './datasets/bdd100k/labels/100k'
 
-    if os.path.exists(output_root):
-        print(f"Deleting old incorrect labels in '{output_root}'...")
-        shutil.rmtree(output_root)
+def convert_chunk(jobs: List[Tuple[str, int, int, Optional[dict]]], output_dir: str) -> List[Tuple[str, dict, bool]]:
+    """
+    Converts a chunk of JSON files in a worker process. Each job is
+    (json path, mtime_ns, size, previous manifest record or None); a file
+    whose content hash matches its previous record is not reconverted. The
+    chunk's TXT files are only written once all of them have been converted,
+    so parsing is not interleaved with many small writes.
+
+    Returns:
+        (json filename, manifest record, whether it was converted) per job.
+    """
+    results = []
+    outputs = []
+    for json_path, mtime_ns, size, previous in jobs:
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+        source_hash = hashlib.sha1(raw).hexdigest()
+        json_name = os.path.basename(json_path)
+
+        if previous is not None and previous['source_hash'] == source_hash:
+            # Touched but not modified; only the recorded stat changes.
+            results.append((json_name, dict(previous, mtime_ns=mtime_ns, size=size), False))
+            continue
+
+        data = parse_label_json(raw)
+        labels = yolo_labels(data)
+        record = {'mtime_ns': mtime_ns, 'size': size, 'source_hash': source_hash,
+                  'output': None, 'output_hash': None, 'labels': len(labels)}
+        if labels:
+            text = '\n'.join(labels)
+            record['output'] = data['name'] + '.txt'
+            record['output_hash'] = hashlib.sha1(text.encode()).hexdigest()
+            outputs.append((record['output'], text))
+        results.append((json_name, record, True))
+
+    for txt_filename, text in outputs:
+        with open(os.path.join(output_dir, txt_filename), 'w') as f_out:
+            f_out.write(text)
+    return results
+
+
+def load_manifest(output_dir: str) -> Optional[Dict[str, dict]]:
+    """Returns the per-file records of a split's manifest, or None if it is missing or outdated."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'rb') as f:
+            manifest = parse_label_json(f.read())
+    except (OSError, ValueError):
+        return None
+    if manifest.get('converter_version') != CONVERTER_VERSION:
+        return None
+    return manifest['files']
+
+
+def save_manifest(output_dir: str, files: Dict[str, dict]):
+    """Writes a split's manifest atomically, so an interrupted run never leaves a partial one."""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'converter_version': CONVERTER_VERSION, 'files': files}, f)
+    os.replace(path + '.tmp', path)
+
+
+def convert_to_yolo(source_dir, output_dir, workers=None, chunk_size=256, incremental=True):
+    """
+    Converts BDD100K JSON files to YOLOv8 TXT format, spreading chunks of
+    `chunk_size` files over a pool of `workers` processes (default: one per core).
+
+    In incremental mode only JSON files that are new or whose size, mtime and
+    content hash differ from the split's manifest are reconverted, and the
+    labels of deleted JSON files are removed. Without a usable manifest (first
+    run, older converter version, or `incremental=False`) the output
+    directory is rebuilt from scratch.
+    """
+    previous = load_manifest(output_dir) if incremental else None
+    if previous is None:
+        if os.path.exists(output_dir):
+            print(f"Deleting old labels in '{output_dir}'...")
+            shutil.rmtree(output_dir)
+        previous = {}
+    os.makedirs(output_dir, exist_ok=True)
+    with os.scandir(output_dir) as entries:
+        existing_outputs = {entry.name for entry in entries}
+
+    files = {}
+    jobs = []
+    with os.scandir(source_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.json'):
+                continue
+            stat = entry.stat()
+            record = previous.get(entry.name)
+            if record is not None and record['output'] is not None and record['output'] not in existing_outputs:
+                record = None  # its label file was deleted, so rewrite it whatever the hash says
+            if record is not None and record['mtime_ns'] == stat.st_mtime_ns and record['size'] == stat.st_size:
+                files[entry.name] = record
+            else:
+                jobs.append((entry.path, stat.st_mtime_ns, stat.st_size, record))
+    jobs.sort()
+
+    stale_outputs = {record['output'] for name, record in previous.items() if name not in files}
+    print(f"\nFound {len(files) + len(jobs)} json files, {len(jobs)} new or changed. Converting to YOLO format "
+          f"({'orjson' if orjson is not None else 'json'} parser)...")
+
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    start = time.perf_counter()
+    converted = 0
+
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(convert_chunk, chunks, [output_dir] * len(chunks))
+            with tqdm(total=len(jobs), desc=f"Converting {os.path.basename(source_dir)}", unit="file") as progress:
+                for chunk_results in results:
+                    for json_name, record, was_converted in chunk_results:
+                        files[json_name] = record
+                        converted += was_converted
+                    progress.update(len(chunk_results))
+
+    # Labels whose JSON file was deleted, renamed its video or lost all its objects.
+    stale_outputs -= {record['output'] for record in files.values()}
+    for txt_filename in stale_outputs:
+        if txt_filename is not None and txt_filename in existing_outputs:
+            os.remove(os.path.join(output_dir, txt_filename))
+    save_manifest(output_dir, files)
+
+    elapsed = time.perf_counter() - start
+    rate = len(jobs) / elapsed if elapsed else 0.0
+    label_files = sum(1 for record in files.values() if record['output'] is not None)
+    label_lines = sum(record['labels'] for record in files.values())
+    print(f"Reconverted {converted} of {len(files)} files in {elapsed:.1f} s ({rate:.0f} files/s); "
+          f"{label_lines} labels in {label_files} files, {len(stale_outputs - {None})} stale label files removed.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert BDD100K JSON labels to YOLO TXT labels.")
+    parser.add_argument("--source-root", default='./datasets/bdd100k/labels_json/100k',
+                        help="Directory holding the train/val JSON label folders.")
+    parser.add_argument("--output-root", default='./datasets/bdd100k/labels/100k',
+                        help="Directory the train/val YOLO label folders are written to.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of converter processes (default: one per CPU core).")
+    parser.add_argument("--chunk-size", type=int, default=256,
+                        help="JSON files handed to a worker at a time.")
+    parser.add_argument("--full", action="store_true",
+                        help="Delete the existing labels and reconvert everything instead of only changed files.")
+    args = parser.parse_args()
 
     for split in ['train', 'val']:
-        source_dir = os.path.join(source_root, split)
-        output_dir = os.path.join(output_root, split)
+        source_dir = os.path.join(args.source_root, split)
+        output_dir = os.path.join(args.output_root, split)
         if os.path.exists(source_dir):
-            os.makedirs(output_dir, exist_ok=True)
-            convert_to_yolo(source_dir, output_dir)
+            convert_to_yolo(source_dir, output_dir, args.workers, args.chunk_size, incremental=not args.full)
         else:
             print(f"Source directory for '{split}' not found, skipping: {source_dir}")
 
     print("\nConversion complete!")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,13 @@
+from __future__ import annotations
+
+import argparse
 import os
-from collections import defaultdict
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-from tqdm import tqdm
+from typing import List
+
+from class_statistics import ASPECT_BINS, SIZE_BINS, ClassStatistics, load_class_statistics
 
 CLASS_MAP = {
     0: 'person', 1: 'rider', 2: 'car', 3: 'truck',
@@ -10,33 +15,26 @@ CLASS_MAP = {
     8: 'traffic light', 9: 'traffic sign'
 }
 
-def analyze_dataset_balance(label_dir, dataset_name):
+def analyze_dataset_balance(label_dir, dataset_name, rebuild=False, workers=None):
     """
     Analyzes the class distribution of a dataset in YOLO format.
+
+    The statistics are computed by a streaming pass over the labels (see
+    class_statistics.py) and cached next to them, so re-running only redraws
+    the charts unless the labels changed or `rebuild` is set.
     """
     print(f"\nAnalyzing '{dataset_name}' in directory: {label_dir}")
-    
+
     if not os.path.exists(label_dir):
         print(f"Error: Directory not found -> {label_dir}")
         return
 
-    class_counts = defaultdict(int)
-    all_label_files = [f for f in os.listdir(label_dir) if f.endswith('.txt')]
-
-    if not all_label_files:
+    stats = load_class_statistics(label_dir, len(CLASS_MAP), rebuild, workers)
+    if not stats.images:
         print(f"Error: No .txt files found in '{label_dir}'.")
         return
 
-    for filename in tqdm(all_label_files, desc=f"Processing {dataset_name}"):
-        with open(os.path.join(label_dir, filename), 'r') as f:
-            for line in f.readlines():
-                try:
-                    class_id = int(line.split()[0])
-                    class_name = CLASS_MAP.get(class_id)
-                    if class_name:
-                        class_counts[class_name] += 1
-                except (ValueError, IndexError):
-                    continue
+    class_counts = {name: int(stats.counts[class_id]) for class_id, name in CLASS_MAP.items() if stats.counts[class_id]}
 
     print(f"Analysis complete for '{dataset_name}'.")
 
@@ -45,9 +43,11 @@ def analyze_dataset_balance(label_dir, dataset_name):
         return
 
     df = pd.DataFrame(list(class_counts.items()), columns=['Class', 'Instance Count'])
+    df['Images'] = [int(stats.cooccurrence[class_id, class_id]) for class_id, name in CLASS_MAP.items()
+                    if name in class_counts]
     df = df.sort_values(by='Instance Count', ascending=False).reset_index(drop=True)
-    
-    print(f"\n--- {dataset_name} Class Distribution ---")
+
+    print(f"\n--- {dataset_name} Class Distribution ({stats.images} images) ---")
     print(df.to_string())
 
     plt.figure(figsize=(12, 8))
@@ -57,21 +57,87 @@ def analyze_dataset_balance(label_dir, dataset_name):
     plt.title(f'Class Distribution in {dataset_name}', fontsize=16)
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
-    
+
     for bar in bars:
         yval = bar.get_height()
         plt.text(bar.get_x() + bar.get_width()/2.0, yval, int(yval), va='bottom')
 
-    chart_filename = f"{dataset_name.lower().replace(' ', '_')}_distribution.png"
+    chart_prefix = dataset_name.lower().replace(' ', '_')
+    chart_filename = f"{chart_prefix}_distribution.png"
     plt.savefig(chart_filename)
     print(f"\nA bar chart has been saved to '{chart_filename}'")
     plt.close()
 
+    for chart_filename in plot_statistics(stats, dataset_name, chart_prefix):
+        print(f"A chart has been saved to '{chart_filename}'")
+
+
+def plot_statistics(stats: ClassStatistics, dataset_name: str, chart_prefix: str) -> List[str]:
+    """Draws the co-occurrence, box geometry and spatial charts, returning their filenames."""
+    names = [CLASS_MAP[class_id] for class_id in range(len(CLASS_MAP))]
+    filenames = []
+
+    # Share of the images containing the row class that also contain the column class.
+    images_with_class = np.maximum(np.diag(stats.cooccurrence), 1)
+    cooccurrence = stats.cooccurrence / images_with_class[:, None]
+    fig, ax = plt.subplots(figsize=(10, 9))
+    image = ax.imshow(cooccurrence, cmap='viridis', vmin=0, vmax=1)
+    ax.set_xticks(range(len(names)), names, rotation=45, ha='right')
+    ax.set_yticks(range(len(names)), names)
+    for row in range(len(names)):
+        for column in range(len(names)):
+            ax.text(column, row, f"{cooccurrence[row, column]:.2f}", ha='center', va='center', fontsize=7, color='w')
+    ax.set_title(f'P(column class in image | row class in image) in {dataset_name}')
+    fig.colorbar(image, ax=ax)
+    fig.tight_layout()
+    filenames.append(f"{chart_prefix}_cooccurrence.png")
+    fig.savefig(filenames[-1])
+    plt.close(fig)
+
+    for hist, bins, label, suffix, log_x in (
+        (stats.size_hist, SIZE_BINS, 'Box size (sqrt of area, fraction of image)', 'box_sizes', True),
+        (stats.aspect_hist, ASPECT_BINS, 'Aspect ratio (log2 width / height)', 'aspect_ratios', False),
+    ):
+        fig, ax = plt.subplots(figsize=(12, 7))
+        centers = np.sqrt(bins[:-1] * bins[1:]) if log_x else (bins[:-1] + bins[1:]) / 2
+        for class_id, name in enumerate(names):
+            if stats.counts[class_id]:
+                ax.plot(centers, hist[class_id] / hist[class_id].sum(), label=name)
+        if log_x:
+            ax.set_xscale('log')
+        ax.set_xlabel(label, fontsize=12)
+        ax.set_ylabel('Fraction of boxes', fontsize=12)
+        ax.set_title(f'{label.split(" (")[0]} distribution in {dataset_name}', fontsize=16)
+        ax.legend()
+        fig.tight_layout()
+        filenames.append(f"{chart_prefix}_{suffix}.png")
+        fig.savefig(filenames[-1])
+        plt.close(fig)
+
+    fig, axes = plt.subplots(2, (len(names) + 1) // 2, figsize=(20, 6))
+    for class_id, (ax, name) in enumerate(zip(axes.flat, names)):
+        ax.imshow(stats.heatmaps[class_id], cmap='inferno', extent=(0, 1, 1, 0), aspect=9 / 16)
+        ax.set_title(f"{name} ({stats.counts[class_id]})")
+        ax.set_xticks([])
+        ax.set_yticks([])
+    fig.suptitle(f'Box center heatmaps in {dataset_name}', fontsize=16)
+    fig.tight_layout()
+    filenames.append(f"{chart_prefix}_heatmaps.png")
+    fig.savefig(filenames[-1])
+    plt.close(fig)
+    return filenames
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Analyze the class distribution of the balanced dataset.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Rescan the labels even if the cached statistics are up to date.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of scanner processes (default: one per CPU core).")
+    args = parser.parse_args()
 
     balanced_train_labels = './datasets/bdd100k_balanced/labels/train'
     balanced_val_labels = './datasets/bdd100k_balanced/labels/val'
 
-    analyze_dataset_balance(balanced_train_labels, "Balanced Training Set")
-    analyze_dataset_balance(balanced_val_labels, "Balanced Validation Set")
+    analyze_dataset_balance(balanced_train_labels, "Balanced Training Set", args.rebuild, args.workers)
+    analyze_dataset_balance(balanced_val_labels, "Balanced Validation Set", args.rebuild, args.workers)
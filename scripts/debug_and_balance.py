@@ -9,11 +9,12 @@ preventing a model from becoming biased towards over-represented classes like 'c
 The script processes both 'train' and 'val' splits independently.
 """
 import os
-import random
 import shutil
-from collections import defaultdict
+from pathlib import Path
 
-from tqdm import tqdm
+from balanced_sampler import BalancedSampler, class_targets
+from label_index import load_label_index
+from materialize import materialize_files, write_manifest
 
 # --- Dataset Configuration ---
 # This dictionary maps the integer class IDs from the YOLO .txt files to their
@@ -39,6 +40,16 @@ VAL_TARGETS = {
     'traffic light': 1200, 'traffic sign': 1200
 }
 
+# 'greedy' meets the targets with as few images as possible, so there is less to
+# copy; 'random' samples every class independently. Set SEED for reproducible subsets.
+SAMPLING_STRATEGY = 'greedy'
+SEED = None
+
+# How the selected files reach the balanced dataset folder: 'hardlink', 'reflink'
+# or 'symlink' (each falling back to a copy where unsupported), 'copy', or
+# 'manifest' to only write <split>.txt image lists for the trainer.
+MATERIALIZE_MODE = 'hardlink'
+
 def balance_dataset(split_name: str, sampling_targets: dict):
     """
     Scans, samples, and copies files for a given data split ('train' or 'val').
@@ -60,53 +71,41 @@ def balance_dataset(split_name: str, sampling_targets: dict):
     yolo_label_dir = f'./datasets/bdd100k/labels/100k/{split_name}'
     output_dir = './datasets/bdd100k_balanced'
 
-    # First, build a catalog of which classes appear in each image.
-    print(f"Scanning all .txt files in: {yolo_label_dir}")
-    image_to_classes = defaultdict(set)
-    all_label_files = [f for f in os.listdir(yolo_label_dir) if f.endswith('.txt')]
-
-    for filename in tqdm(all_label_files, desc=f"Cataloging {split_name} labels"):
-        with open(os.path.join(yolo_label_dir, filename), 'r') as f:
-            for line in f.readlines():
-                # This try-except block handles potentially empty or malformed
-                # lines in the label files, preventing the script from crashing.
-                try:
-                    class_id = int(line.split()[0])
-                    class_name = CLASS_NAMES.get(class_id)
-                    if class_name:
-                        image_name = filename.replace('.txt', '.jpg')
-                        image_to_classes[image_name].add(class_name)
-                except (ValueError, IndexError):
-                    continue  # Ignore malformed lines and proceed
+    # First, load the catalog of which classes appear in each image from the label index.
+    print(f"Loading the label index of: {yolo_label_dir}")
+    index = load_label_index(yolo_label_dir)
 
     # Next, select a unique set of images that satisfies the sampling targets.
-    print("Selecting a balanced set of images...")
-    final_image_set = set()
-    for class_name, target_count in sampling_targets.items():
-        images_with_class = [img for img, classes in image_to_classes.items() if class_name in classes]
-        if not images_with_class:
+    print(f"Selecting a balanced set of images ({SAMPLING_STRATEGY} strategy)...")
+    sampler = BalancedSampler.from_index(index, len(CLASS_NAMES), SEED)
+    for class_id, class_name in CLASS_NAMES.items():
+        if class_name in sampling_targets and not sampler.available[class_id]:
             print(f"Warning: No images found for class '{class_name}' in the {split_name} set.")
-            continue
-        
-        # Take the smaller of the two values to avoid errors if a class has
-        # fewer images available than the desired target.
-        num_to_sample = min(len(images_with_class), target_count)
-        selected = random.sample(images_with_class, num_to_sample)
-        final_image_set.update(selected)
+    selected = sampler.select(class_targets(CLASS_NAMES, sampling_targets), SAMPLING_STRATEGY)
+    final_image_set = {str(name) + '.jpg' for name in index.image_names[selected]}
 
     print(f"Image selection complete. Total unique images for balanced {split_name} set: {len(final_image_set)}")
 
-    # Finally, copy the selected image and label files to the new directory.
-    print("Copying files to new balanced directory...")
+    # Finally, materialize the selected image and label files in the new directory.
+    if MATERIALIZE_MODE == 'manifest':
+        manifest_path = Path(output_dir) / f'{split_name}.txt'
+        write_manifest([Path(image_dir) / image_name for image_name in final_image_set], manifest_path)
+        print(f"Wrote the balanced {split_name} image list to '{manifest_path}'.")
+        return
+
+    print(f"Materializing files in the new balanced directory ({MATERIALIZE_MODE})...")
     balanced_img_dir = os.path.join(output_dir, f'images/{split_name}')
     balanced_lbl_dir = os.path.join(output_dir, f'labels/{split_name}')
     os.makedirs(balanced_img_dir, exist_ok=True)
     os.makedirs(balanced_lbl_dir, exist_ok=True)
 
-    for image_name in tqdm(final_image_set, desc=f"Copying {split_name} files"):
+    pairs = []
+    for image_name in final_image_set:
         label_name = image_name.replace('.jpg', '.txt')
-        shutil.copyfile(os.path.join(image_dir, image_name), os.path.join(balanced_img_dir, image_name))
-        shutil.copyfile(os.path.join(yolo_label_dir, label_name), os.path.join(balanced_lbl_dir, label_name))
+        pairs.append((os.path.join(image_dir, image_name), os.path.join(balanced_img_dir, image_name)))
+        pairs.append((os.path.join(yolo_label_dir, label_name), os.path.join(balanced_lbl_dir, label_name)))
+    methods = materialize_files(pairs, MATERIALIZE_MODE, desc=f"Materializing {split_name} files")
+    print(f"Files created by method: {dict(methods)}")
 
 if __name__ == '__main__':
     # For a consistent result, it's best to start with a clean slate.
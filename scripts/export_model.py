@@ -9,10 +9,18 @@ The script is designed to be run from anywhere within the project by dynamically
 calculating the absolute paths to the model and output files.
 """
 
-from pathlib import Paths
+import argparse
+from pathlib import Path
 from ultralytics import YOLO
 
 def main():
+    parser = argparse.ArgumentParser(description="Export the trained YOLOv8 model to ONNX.")
+    parser.add_argument(
+        "--dynamic", action="store_true",
+        help="Export with dynamic batch and image size axes so ONNX Runtime can run whole batches."
+    )
+    args = parser.parse_args()
+
     # Use pathlib to dynamically construct absolute paths. This is the modern,
     # preferred way to handle file paths in Python.
     script_dir = Path(__file__).resolve().parent
@@ -27,7 +35,8 @@ def main():
 
     # Export the model to ONNX format for deployment.
     # This creates a portable model for various inference engines.
-    model.export(format='onnx')
+    # A dynamic export lets the Python engine (perception/) batch frames from several cameras.
+    model.export(format='onnx', dynamic=args.dynamic)
 
     print(f"Model successfully exported to: {output_model_path}")
 
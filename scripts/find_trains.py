@@ -1,11 +1,19 @@
 """
 Scans a directory of BDD100K JSON label files to find and list all video
-files that contain a specific object category. This is useful for creating
-a targeted subset of a larger dataset for analysis or training.
+files that contain specific object categories. Several categories can be
+looked up in the same parallel pass. This is useful for creating a targeted
+subset of a larger dataset for analysis or training.
 """
+from __future__ import annotations
+
+import argparse
+import operator
 import os
-import json
-from tqdm import tqdm
+from functools import partial
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from json_scan import list_json_files, scan_json_files
+from label_db import LabelDatabase
 
 # --- Script Configuration ---
 # Define the object category to search for within the label files.
@@ -15,72 +23,107 @@ TARGET_CATEGORY = 'train'
 TEST_LABEL_DIR = './datasets/bdd100k/labels_json/100k/test'
 
 
-def find_videos_with_category(label_dir: str, target_category: str) -> list[str]:
+def _matching_categories(data: dict, target_categories: FrozenSet[str]) -> List[Tuple[str, str]]:
     """
-    Scans a directory of BDD100K JSON files and identifies all videos
-    containing at least one instance of a specific object category.
+    Returns a (category, video name) pair for every target category present in
+    one label file, stopping as soon as all of them have been seen.
+    """
+    video_name = data.get('name')
+    if not video_name:
+        return []
+
+    found = set()
+    for frame in data.get('frames', ()):
+        for label in frame.get('objects', ()):
+            # Use .get() to safely access the 'category' key, preventing KeyErrors.
+            category = label.get('category')
+            if category in target_categories and category not in found:
+                found.add(category)
+                if len(found) == len(target_categories):
+                    # Every category is accounted for; the rest of the file cannot add anything.
+                    return [(category, video_name) for category in found]
+    return [(category, video_name) for category in found]
+
+
+def find_videos_with_categories(label_dir: str, target_categories: List[str],
+                                workers: Optional[int] = None) -> Dict[str, List[str]]:
+    """
+    Scans a directory of BDD100K JSON files once, in parallel, and identifies
+    the videos containing at least one instance of each target category.
 
     Args:
         label_dir: The path to the directory containing the .json label files.
-        target_category: The name of the category to search for (e.g., 'train').
+        target_categories: The names of the categories to search for (e.g., ['train', 'bus']).
+        workers: Number of scanner processes (default: one per CPU core).
 
     Returns:
-        A list of video names (e.g., 'b1c66a42-6f7d68ca.mov') that contain the
-        target category. The list may contain duplicates if a video is processed
-        multiple times, which should be handled by the caller.
+        A dictionary mapping every target category to the sorted, unique list
+        of video names (e.g., 'b1c66a42-6f7d68ca.mov') that contain it.
     """
-    print(f"\nScanning for category '{target_category}' in directory: {label_dir}")
+    print(f"\nScanning for categories {target_categories} in directory: {label_dir}")
+    videos = {category: [] for category in target_categories}
 
     if not os.path.exists(label_dir):
         print(f"Error: Directory not found -> {label_dir}")
-        return []
-
-    files_with_target = []
-    all_json_files = [f for f in os.listdir(label_dir) if f.endswith('.json')]
+        return videos
 
+    all_json_files = list_json_files(label_dir)
     if not all_json_files:
         print(f"Error: No .json files found in '{label_dir}'.")
-        return []
+        return videos
 
-    # Iterate through each JSON file with a progress bar.
-    for filename in tqdm(all_json_files, desc="Scanning JSON labels"):
-        json_path = os.path.join(label_dir, filename)
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-
-        found_in_file = False
-        if 'frames' in data:
-            for frame in data['frames']:
-                if 'objects' in frame:
-                    for label in frame['objects']:
-                        # Use .get() to safely access the 'category' key, preventing KeyErrors.
-                        if label.get('category') == target_category:
-                            # Once the category is found, record the video name and
-                            # break out of the inner loops to improve efficiency.
-                            video_name = data.get('name')
-                            if video_name:
-                                files_with_target.append(video_name)
-                            found_in_file = True
-                            break  # Exit the 'objects' loop
-                if found_in_file:
-                    break  # Exit the 'frames' loop
-
-    return files_with_target
+    matches = scan_json_files(
+        all_json_files,
+        partial(_matching_categories, target_categories=frozenset(target_categories)),
+        operator.add, [], workers
+    )
+    for category, video_name in matches:
+        videos[category].append(video_name)
+    return {category: sorted(set(names)) for category, names in videos.items()}
+
+
+def find_videos_with_category(label_dir: str, target_category: str) -> List[str]:
+    """
+    Scans a directory of BDD100K JSON files and identifies all videos
+    containing at least one instance of a specific object category.
+
+    Args:
+        label_dir: The path to the directory containing the .json label files.
+        target_category: The name of the category to search for (e.g., 'train').
+
+    Returns:
+        A sorted list of the unique video names that contain the target category.
+    """
+    return find_videos_with_categories(label_dir, [target_category])[target_category]
 
 
 # --- Main execution block ---
 if __name__ == '__main__':
-    # Find all videos that match the target category.
-    videos_containing_trains = find_videos_with_category(TEST_LABEL_DIR, TARGET_CATEGORY)
-
-    if videos_containing_trains:
-        # Use a set to get unique video names, then sort for a clean, deterministic output.
-        unique_videos = sorted(list(set(videos_containing_trains)))
-        
-        print(f"\nFound {len(unique_videos)} test videos containing at least one '{TARGET_CATEGORY}'.")
-        print("Here is the list:")
-        for video_name in unique_videos:
-            print(f"  - {video_name}")
+    parser = argparse.ArgumentParser(description="List the videos containing given object categories.")
+    parser.add_argument("categories", nargs="*", default=[TARGET_CATEGORY],
+                        help=f"Categories to search for in a single pass (default: '{TARGET_CATEGORY}').")
+    parser.add_argument("--label-dir", default=TEST_LABEL_DIR, help="Directory of BDD100K JSON label files.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of scanner processes (default: one per CPU core).")
+    parser.add_argument("--db", default=None,
+                        help="Query this label database (see label_db.py) instead of scanning --label-dir.")
+    parser.add_argument("--split", default="test", help="Split to query when using --db.")
+    args = parser.parse_args()
+
+    # Find all videos that match each target category.
+    if args.db:
+        with LabelDatabase(args.db) as db:
+            videos_by_category = {
+                category: db.videos_with_category(category, args.split) for category in args.categories
+            }
     else:
-        print(f"\nNo videos containing a '{TARGET_CATEGORY}' were found in the specified directory.")
-
+        videos_by_category = find_videos_with_categories(args.label_dir, args.categories, args.workers)
+
+    for category, unique_videos in videos_by_category.items():
+        if unique_videos:
+            print(f"\nFound {len(unique_videos)} videos containing at least one '{category}'.")
+            print("Here is the list:")
+            for video_name in unique_videos:
+                print(f"  - {video_name}")
+        else:
+            print(f"\nNo videos containing a '{category}' were found in the specified directory.")
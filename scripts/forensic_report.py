@@ -1,10 +1,30 @@
-import json
+from __future__ import annotations
+
+import argparse
 import os
-from collections import defaultdict
-from tqdm import tqdm
+from collections import Counter
+from typing import Optional
+
+from json_scan import list_json_files, merge_counters, scan_json_files
+
+
+def _file_structures(data: dict) -> Counter:
+    """Counts the (category, key-tuple) structures of the objects in one label file."""
+    structures = Counter()
+
+    # Each file is a list of video frames; every frame contains objects/labels
+    for frame in data.get("frames", ()):
+        # BDD100K sometimes uses the key 'objects', sometimes 'labels'
+        object_list = frame.get("objects", frame.get("labels", []))
 
+        for obj in object_list:
+            # We’ll group by category so we know which structures belong to what;
+            # a sorted tuple of keys uniquely identifies the object’s schema
+            structures[(obj.get("category", "N/A"), tuple(sorted(obj.keys())))] += 1
+    return structures
 
-def run_forensic_analysis(label_dir: str) -> None:
+
+def run_forensic_analysis(label_dir: str, limit: Optional[int] = None, workers: Optional[int] = None) -> None:
     """
     Look through a folder of BDD100K-style JSON label files and report every
     *different* object/label dictionary structure we encounter.
@@ -16,40 +36,19 @@ def run_forensic_analysis(label_dir: str) -> None:
     Before you write a parser, it helps to know exactly which permutations
     of keys exist in the wild.  This little “forensic” pass gives you that
     inventory.
+
+    The files are scanned in parallel, so the whole split is covered by
+    default; pass `limit` to only look at the first few files.
     """
     print(f"Starting forensic pass in: {label_dir}")
 
-    # (category, key-tuple) → how many times we’ve seen it
-    found_structures = defaultdict(int)
-
     # Limit ourselves to .json files only
-    json_files = [f for f in os.listdir(label_dir) if f.endswith(".json")]
+    json_files = list_json_files(label_dir, limit)
+    print(f"Scanning {len(json_files)} file(s) for object structures…")
 
-    # A quick scan of the first 5 000 files is usually plenty to get coverage
-    sample_files = json_files[:5000]
-    print(f"Scanning {len(sample_files)} file(s) for object structures…")
-
-    for json_file in tqdm(sample_files, desc="Parsing JSON"):
-        json_path = os.path.join(label_dir, json_file)
-
-        # Load a single JSON label file
-        with open(json_path, "r") as f:
-            data = json.load(f)
-
-        # Each file is a list of video frames; every frame contains objects/labels
-        if "frames" in data:
-            for frame in data["frames"]:
-                # BDD100K sometimes uses the key 'objects', sometimes 'labels'
-                object_list = frame.get("objects", frame.get("labels", []))
-
-                for obj in object_list:
-                    # We’ll group by category so we know which structures belong to what
-                    category = obj.get("category", "N/A")
-
-                    # A sorted tuple of keys uniquely identifies the object’s schema
-                    structure_signature = tuple(sorted(obj.keys()))
-
-                    found_structures[(category, structure_signature)] += 1
+    # (category, key-tuple) → how many times we’ve seen it
+    found_structures = scan_json_files(json_files, _file_structures, merge_counters, Counter(), workers,
+                                       desc="Parsing JSON")
 
     # ---------- Report ---------- #
     print("\nForensic Report")
@@ -64,11 +63,18 @@ def run_forensic_analysis(label_dir: str) -> None:
         print(f"  Seen: {count} time(s)\n")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inventory the object structures in BDD100K JSON labels.")
     # Path to the *original* BDD100K JSON labels (NOT the YOLO-style .txt files)
-    source_label_dir = "./datasets/bdd100k/labels_json/100k/train"
-
-    if not os.path.exists(source_label_dir):
-        print(f"ERROR: Cannot find directory: {source_label_dir}")
+    parser.add_argument("--label-dir", default="./datasets/bdd100k/labels_json/100k/train",
+                        help="Directory of BDD100K JSON label files.")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Only scan the first N files (default: the whole directory).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of scanner processes (default: one per CPU core).")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.label_dir):
+        print(f"ERROR: Cannot find directory: {args.label_dir}")
         print("Double-check that the path points to the unmodified JSON labels.")
     else:
-        run_forensic_analysis(source_label_dir)
+        run_forensic_analysis(args.label_dir, args.limit, args.workers)
@@ -0,0 +1,113 @@
+"""
+Map/reduce over a directory of BDD100K JSON label files with a process pool.
+
+A scan supplies two picklable functions: `map_file`, which turns one parsed
+label file into a partial result, and `merge`, which combines two partial
+results. Each worker folds the partial results of a chunk of files before
+sending them back, so only one result per chunk crosses process boundaries,
+and the parent folds the chunk results in file order. Only a few chunks per
+worker are submitted ahead of the one being consumed, so a slow consumer
+holds back the workers instead of letting finished chunks pile up in memory.
+"""
+from __future__ import annotations
+
+import os
+from collections import Counter, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterator, List, Optional
+
+from tqdm import tqdm
+
+from convert_bdd import load_label_file
+
+
+def list_json_files(label_dir: str, limit: Optional[int] = None) -> List[str]:
+    """Returns the sorted paths of the .json files in `label_dir`, optionally only the first `limit`."""
+    with os.scandir(label_dir) as entries:
+        paths = sorted(entry.path for entry in entries if entry.name.endswith('.json'))
+    return paths[:limit] if limit is not None else paths
+
+
+def _chunked(paths: List[str], chunk_size: int) -> List[List[str]]:
+    return [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+
+
+def _bounded_map(pool: Executor, fn: Callable, chunks: List[List[str]], max_in_flight: int,
+                 *args) -> Iterator[Any]:
+    """
+    Like `pool.map(partial(fn, *args), chunks)`, but keeps at most
+    `max_in_flight` chunks submitted and not yet yielded.
+    """
+    pending = deque()
+    remaining = iter(chunks)
+    for chunk in islice(remaining, max_in_flight):
+        pending.append(pool.submit(fn, *args, chunk))
+    while pending:
+        result = pending.popleft().result()
+        chunk = next(remaining, None)
+        if chunk is not None:
+            pending.append(pool.submit(fn, *args, chunk))
+        yield result
+
+
+def _in_flight(workers: Optional[int]) -> int:
+    return 2 * (workers or os.cpu_count() or 1)
+
+
+def _scan_chunk(map_file: Callable[[dict], Any], merge: Callable[[Any, Any], Any], paths: List[str]) -> Any:
+    result = None
+    for path in paths:
+        partial = map_file(load_label_file(path))
+        result = partial if result is None else merge(result, partial)
+    return result
+
+
+def scan_json_files(paths: List[str], map_file: Callable[[dict], Any], merge: Callable[[Any, Any], Any],
+                    initial: Any, workers: Optional[int] = None, chunk_size: int = 256,
+                    desc: str = "Scanning JSON labels") -> Any:
+    """
+    Applies `map_file` to every parsed JSON file in `paths` and folds the
+    results into `initial` with `merge`.
+
+    `map_file` and `merge` run in worker processes, so they must be
+    module-level functions (or functools.partial objects wrapping them).
+    `merge` may update and return its first argument.
+    """
+    chunks = _chunked(paths, chunk_size)
+    result = initial
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partials = _bounded_map(pool, _scan_chunk, chunks, _in_flight(workers), map_file, merge)
+        with tqdm(total=len(paths), desc=desc, unit="file") as progress:
+            for chunk, partial in zip(chunks, partials):
+                result = merge(result, partial)
+                progress.update(len(chunk))
+    return result
+
+
+def _map_chunk(map_file: Callable[[dict], Any], paths: List[str]) -> List[Any]:
+    return [map_file(load_label_file(path)) for path in paths]
+
+
+def iter_json_files(paths: List[str], map_file: Callable[[dict], Any], workers: Optional[int] = None,
+                    chunk_size: int = 256, desc: str = "Scanning JSON labels") -> Iterator[List[Any]]:
+    """
+    Applies `map_file` to every parsed JSON file in `paths` in worker
+    processes, yielding the results chunk by chunk in file order. Use this
+    instead of scan_json_files when the results are consumed as a stream
+    (e.g. written to a database) rather than reduced. The workers run at
+    most a few chunks ahead of the consumer.
+    """
+    chunks = _chunked(paths, chunk_size)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = _bounded_map(pool, _map_chunk, chunks, _in_flight(workers), map_file)
+        with tqdm(total=len(paths), desc=desc, unit="file") as progress:
+            for chunk, chunk_results in zip(chunks, results):
+                yield chunk_results
+                progress.update(len(chunk))
+
+
+def merge_counters(total: Counter, partial: Counter) -> Counter:
+    """Merge function for scans whose partial results are Counters."""
+    total.update(partial)
+    return total
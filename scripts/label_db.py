@@ -0,0 +1,244 @@
+"""
+Builds and queries an SQLite index of the objects in BDD100K JSON labels.
+
+Questions like "which videos contain a train" or "how many riders are there
+at night" otherwise need a scan of every JSON file. The index is built once,
+in parallel, into two tables:
+
+    videos(id, name, split, weather, scene, timeofday)
+    objects(video_id, frame, timestamp, category, object_id,
+            x1, y1, x2, y2, occluded, truncated, attributes)
+
+`attributes` holds each object's full attribute dictionary as JSON, so
+attributes without a dedicated column can still be filtered on with
+SQLite's json_extract(). Typical lookups then take milliseconds:
+
+    python scripts/label_db.py build
+    python scripts/label_db.py videos train --split test
+    python scripts/label_db.py count --category rider --timeofday night
+    python scripts/label_db.py sql "SELECT weather, COUNT(*) FROM videos GROUP BY weather"
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+from json_scan import iter_json_files, list_json_files
+
+DEFAULT_LABEL_ROOT = './datasets/bdd100k/labels_json/100k'
+DEFAULT_DB_PATH = os.path.join(DEFAULT_LABEL_ROOT, 'labels.sqlite')
+
+# Video-level attributes that can be used as query filters.
+VIDEO_ATTRIBUTES = ('weather', 'scene', 'timeofday')
+
+SCHEMA = """
+CREATE TABLE videos (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    split TEXT NOT NULL,
+    weather TEXT,
+    scene TEXT,
+    timeofday TEXT
+);
+CREATE TABLE objects (
+    video_id INTEGER NOT NULL REFERENCES videos(id),
+    frame INTEGER NOT NULL,
+    timestamp INTEGER,
+    category TEXT,
+    object_id INTEGER,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+    occluded INTEGER,
+    truncated INTEGER,
+    attributes TEXT
+);
+"""
+
+# Created after the bulk insert, which is much faster than maintaining them row by row.
+INDEXES = """
+CREATE INDEX objects_category ON objects(category, video_id);
+CREATE INDEX objects_video ON objects(video_id);
+CREATE INDEX videos_split ON videos(split);
+"""
+
+
+def _video_rows(data: dict) -> Tuple[tuple, List[tuple]]:
+    """Flattens one label file into a video row and its object rows (without the video id)."""
+    attributes = data.get('attributes') or {}
+    video = (data.get('name'),) + tuple(attributes.get(key) for key in VIDEO_ATTRIBUTES)
+
+    objects = []
+    for frame_index, frame in enumerate(data.get('frames', ())):
+        timestamp = frame.get('timestamp')
+        for obj in frame.get('objects', frame.get('labels', ())):
+            box = obj.get('box2d') or {}
+            object_attributes = obj.get('attributes')
+            objects.append((
+                frame_index, timestamp, obj.get('category'), obj.get('id'),
+                box.get('x1'), box.get('y1'), box.get('x2'), box.get('y2'),
+                (object_attributes or {}).get('occluded'), (object_attributes or {}).get('truncated'),
+                json.dumps(object_attributes) if object_attributes else None,
+            ))
+    return video, objects
+
+
+def build_label_db(label_root: str, db_path: str, splits: List[str], workers: Optional[int] = None):
+    """Indexes the JSON labels of every split under `label_root` into a new database at `db_path`."""
+    tmp_path = db_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    connection = sqlite3.connect(tmp_path)
+    connection.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;" + SCHEMA)
+    video_id = 0
+    object_count = 0
+    start = time.perf_counter()
+
+    for split in splits:
+        label_dir = os.path.join(label_root, split)
+        if not os.path.exists(label_dir):
+            print(f"Label directory for '{split}' not found, skipping: {label_dir}")
+            continue
+
+        for chunk in iter_json_files(list_json_files(label_dir), _video_rows, workers, desc=f"Indexing {split}"):
+            video_rows = []
+            object_rows = []
+            for video, objects in chunk:
+                video_id += 1
+                video_rows.append((video_id, video[0], split) + video[1:])
+                object_rows.extend((video_id,) + row for row in objects)
+            connection.executemany("INSERT INTO videos VALUES (?, ?, ?, ?, ?, ?)", video_rows)
+            connection.executemany("INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", object_rows)
+            object_count += len(object_rows)
+
+    connection.executescript(INDEXES + "ANALYZE;")
+    connection.commit()
+    connection.close()
+    os.replace(tmp_path, db_path)
+    print(f"Indexed {object_count} objects in {video_id} videos into '{db_path}' "
+          f"in {time.perf_counter() - start:.1f} s.")
+
+
+class LabelDatabase:
+    """Read-only queries over a database written by build_label_db."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"No label database at '{db_path}'; build it with 'label_db.py build'")
+        self.connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def videos_with_category(self, category: str, split: Optional[str] = None, **video_filters) -> List[str]:
+        """Returns the sorted names of the videos containing at least one object of `category`."""
+        where, params = self._filters(split, video_filters)
+        rows = self.connection.execute(
+            "SELECT name FROM videos WHERE id IN (SELECT video_id FROM objects WHERE category = ?)"
+            + "".join(f" AND {clause}" for clause in where) + " ORDER BY name",
+            [category] + params
+        )
+        return [name for (name,) in rows]
+
+    def count_objects(self, category: Optional[str] = None, split: Optional[str] = None, **video_filters) -> int:
+        """Counts the objects of `category` (or all objects) in the videos matching the filters."""
+        where, params = self._filters(split, video_filters)
+        if category is not None:
+            where.insert(0, "objects.category = ?")
+            params.insert(0, category)
+        (count,) = self.connection.execute(
+            "SELECT COUNT(*) FROM objects JOIN videos ON videos.id = objects.video_id"
+            + (" WHERE " + " AND ".join(where) if where else ""), params
+        ).fetchone()
+        return count
+
+    def category_counts(self, split: Optional[str] = None, **video_filters) -> Dict[str, int]:
+        """Returns the number of objects of every category, most frequent first."""
+        where, params = self._filters(split, video_filters)
+        rows = self.connection.execute(
+            "SELECT category, COUNT(*) AS n FROM objects JOIN videos ON videos.id = objects.video_id"
+            + (" WHERE " + " AND ".join(where) if where else "") + " GROUP BY category ORDER BY n DESC",
+            params
+        )
+        return dict(rows.fetchall())
+
+    def sql(self, query: str, params: tuple = ()) -> Tuple[List[str], List[tuple]]:
+        """Runs an arbitrary read-only query, returning its column names and rows."""
+        cursor = self.connection.execute(query, params)
+        return [column[0] for column in cursor.description or ()], cursor.fetchall()
+
+    @staticmethod
+    def _filters(split: Optional[str], video_filters: Dict[str, Optional[str]]) -> Tuple[List[str], List[str]]:
+        where, params = [], []
+        if split is not None:
+            where.append("videos.split = ?")
+            params.append(split)
+        for key, value in video_filters.items():
+            if key not in VIDEO_ATTRIBUTES:
+                raise ValueError(f"Unknown video attribute '{key}', expected one of {VIDEO_ATTRIBUTES}")
+            if value is not None:
+                where.append(f"videos.{key} = ?")
+                params.append(value)
+        return where, params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the SQLite index of BDD100K JSON labels.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Path of the label database.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="(Re)build the database from the JSON labels.")
+    build.add_argument("--label-root", default=DEFAULT_LABEL_ROOT, help="Directory holding one folder per split.")
+    build.add_argument("--splits", nargs="+", default=["train", "val", "test"])
+    build.add_argument("--workers", type=int, default=None,
+                       help="Number of parser processes (default: one per CPU core).")
+
+    videos = commands.add_parser("videos", help="List the videos containing a category.")
+    videos.add_argument("category")
+    count = commands.add_parser("count", help="Count objects, optionally of one category.")
+    count.add_argument("--category", default=None)
+    commands.add_parser("counts", help="Count objects per category.")
+    for command in (videos, count, commands.choices["counts"]):
+        command.add_argument("--split", default=None)
+        for key in VIDEO_ATTRIBUTES:
+            command.add_argument(f"--{key}", default=None)
+
+    sql = commands.add_parser("sql", help="Run a read-only SQL query.")
+    sql.add_argument("query")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_label_db(args.label_root, args.db, args.splits, args.workers)
+        return
+
+    filters = {key: getattr(args, key, None) for key in VIDEO_ATTRIBUTES}
+    with LabelDatabase(args.db) as db:
+        if args.command == "videos":
+            names = db.videos_with_category(args.category, args.split, **filters)
+            print(f"Found {len(names)} videos containing at least one '{args.category}'.")
+            for name in names:
+                print(f"  - {name}")
+        elif args.command == "count":
+            print(db.count_objects(args.category, args.split, **filters))
+        elif args.command == "counts":
+            for category, n in db.category_counts(args.split, **filters).items():
+                print(f"{category!s:<15} {n}")
+        else:
+            columns, rows = db.sql(args.query)
+            print("\t".join(columns))
+            for row in rows:
+                print("\t".join(str(value) for value in row))
+
+
+if __name__ == '__main__':
+    main()
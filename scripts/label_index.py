@@ -0,0 +1,200 @@
+"""
+Builds and loads a columnar index of a directory of YOLO .txt label files.
+
+Every dataset script needs the same information: which image each box
+belongs to, its class and its coordinates. Rather than each of them opening
+and parsing tens of thousands of small files, the index parses them once in
+parallel into flat NumPy arrays and caches them next to the labels as an
+.npz file, which loads in milliseconds. The cache is rebuilt automatically
+when label files are added, removed or rewritten.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from tqdm import tqdm
+
+INDEX_NAME = '.label_index.npz'
+
+# Bump when the layout of the cached arrays changes.
+INDEX_VERSION = 1
+
+
+class LabelIndex:
+    """
+    Every box of a YOLO label directory as parallel arrays.
+
+    Attributes:
+        image_names: Label file stems (e.g. 'b1c66a42-6f7d68ca'), one per label file.
+        image_ids: Index into `image_names` of each box.
+        class_ids: Class id of each box.
+        boxes: (N, 4) normalized center-x, center-y, width, height of each box;
+            NaN for lines that only carry a class id.
+    """
+
+    def __init__(self, image_names: np.ndarray, image_ids: np.ndarray, class_ids: np.ndarray, boxes: np.ndarray):
+        self.image_names = image_names
+        self.image_ids = image_ids
+        self.class_ids = class_ids
+        self.boxes = boxes
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    @property
+    def image_count(self) -> int:
+        return len(self.image_names)
+
+    def class_counts(self, num_classes: int = 0) -> np.ndarray:
+        """Returns the number of boxes of every class id."""
+        return np.bincount(self.class_ids, minlength=num_classes)
+
+    def image_class_matrix(self, num_classes: int) -> np.ndarray:
+        """Returns an (images, num_classes) bool matrix of which classes appear in which image."""
+        present = np.zeros((self.image_count, num_classes), dtype=bool)
+        known = self.class_ids < num_classes
+        present[self.image_ids[known], self.class_ids[known]] = True
+        return present
+
+    def images_with_class(self, class_id: int) -> np.ndarray:
+        """Returns the sorted ids of the images containing at least one box of `class_id`."""
+        return np.unique(self.image_ids[self.class_ids == class_id])
+
+    def image_classes(self, class_names: Dict[int, str], suffix: str = '.jpg') -> Dict[str, Set[str]]:
+        """
+        Maps every image (named with `suffix`) to the set of class names it
+        contains, considering only the class ids in `class_names`.
+        """
+        known = np.isin(self.class_ids, [class_id for class_id, name in class_names.items() if name])
+        pairs = np.unique(self.image_ids[known].astype(np.int64) << 32 | self.class_ids[known])
+        image_classes = {}
+        for image_id, class_id in zip((pairs >> 32).tolist(), (pairs & 0xFFFFFFFF).tolist()):
+            image_classes.setdefault(str(self.image_names[image_id]) + suffix, set()).add(class_names[class_id])
+        return image_classes
+
+    def save(self, path: Path, signature: np.ndarray):
+        # Written under a temporary name and moved into place so readers never see a partial index.
+        tmp_path = path.with_name(path.name + '.tmp.npz')
+        np.savez(tmp_path, version=np.int64(INDEX_VERSION), signature=signature, image_names=self.image_names,
+                 image_ids=self.image_ids, class_ids=self.class_ids, boxes=self.boxes)
+        os.replace(tmp_path, path)
+
+
+def list_label_files(label_dir: Path) -> Tuple[List[str], np.ndarray]:
+    """Returns the sorted label file names of `label_dir` and a signature that changes whenever any of them do."""
+    names = []
+    total_size = newest = 0
+    with os.scandir(label_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.txt'):
+                stat = entry.stat()
+                names.append(entry.name)
+                total_size += stat.st_size
+                newest = max(newest, stat.st_mtime_ns)
+    names.sort()
+    return names, np.array([len(names), total_size, newest], dtype=np.int64)
+
+
+def parse_label_files(label_dir: Path, filenames: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    Parses a chunk of label files, returning (image ids, class ids, boxes,
+    malformed line count); image ids index into `filenames`.
+    """
+    image_ids = []
+    class_ids = []
+    boxes = []
+    malformed = 0
+    nan_box = [np.nan] * 4
+    for image_id, filename in enumerate(filenames):
+        with open(label_dir / filename, 'r') as f:
+            for line in f:
+                fields = line.split()
+                try:
+                    class_id = int(fields[0])
+                    if class_id < 0:
+                        raise ValueError(class_id)
+                    box = [float(value) for value in fields[1:5]] if len(fields) >= 5 else nan_box
+                except (ValueError, IndexError):
+                    malformed += 1
+                    continue
+                image_ids.append(image_id)
+                class_ids.append(class_id)
+                boxes.append(box)
+
+    return (np.array(image_ids, dtype=np.int32), np.array(class_ids, dtype=np.int32),
+            np.array(boxes, dtype=np.float32).reshape(-1, 4), malformed)
+
+
+def build_label_index(label_dir: Path, filenames: Optional[List[str]] = None, workers: Optional[int] = None,
+                      chunk_size: int = 1024) -> LabelIndex:
+    """Parses every label file of `label_dir` in a pool of `workers` processes."""
+    label_dir = Path(label_dir)
+    if filenames is None:
+        filenames, _ = list_label_files(label_dir)
+    chunks = [filenames[i:i + chunk_size] for i in range(0, len(filenames), chunk_size)]
+
+    image_ids, class_ids, boxes = [], [], []
+    malformed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(parse_label_files, [label_dir] * len(chunks), chunks)
+        with tqdm(total=len(filenames), desc=f"Indexing {label_dir.name} labels", unit="file") as progress:
+            for chunk_index, (chunk_images, chunk_classes, chunk_boxes, chunk_malformed) in enumerate(results):
+                image_ids.append(chunk_images + chunk_index * chunk_size)
+                class_ids.append(chunk_classes)
+                boxes.append(chunk_boxes)
+                malformed += chunk_malformed
+                progress.update(len(chunks[chunk_index]))
+
+    if malformed:
+        print(f"Warning: Skipped {malformed} malformed line(s) in {label_dir}")
+    image_names = np.array([name[:-len('.txt')] for name in filenames], dtype=str)
+    return LabelIndex(
+        image_names,
+        np.concatenate(image_ids) if image_ids else np.empty(0, dtype=np.int32),
+        np.concatenate(class_ids) if class_ids else np.empty(0, dtype=np.int32),
+        np.concatenate(boxes) if boxes else np.empty((0, 4), dtype=np.float32),
+    )
+
+
+def load_label_index(label_dir: Path, rebuild: bool = False, workers: Optional[int] = None) -> LabelIndex:
+    """
+    Returns the index of `label_dir`, loading the cached copy when it is still
+    up to date and (re)building and caching it otherwise.
+    """
+    label_dir = Path(label_dir)
+    index_path = label_dir / INDEX_NAME
+    filenames, signature = list_label_files(label_dir)
+
+    if not rebuild and index_path.exists():
+        with np.load(index_path) as cached:
+            if cached['version'] == INDEX_VERSION and np.array_equal(cached['signature'], signature):
+                return LabelIndex(cached['image_names'], cached['image_ids'], cached['class_ids'], cached['boxes'])
+
+    index = build_label_index(label_dir, filenames, workers)
+    index.save(index_path, signature)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the label index of YOLO label directories.")
+    parser.add_argument("label_dirs", nargs="+", type=Path, help="Directories of YOLO .txt label files.")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild even if the cached index is up to date.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of parser processes (default: one per CPU core).")
+    args = parser.parse_args()
+
+    for label_dir in args.label_dirs:
+        start = time.perf_counter()
+        index = load_label_index(label_dir, args.rebuild, args.workers)
+        print(f"{label_dir}: {len(index)} boxes in {index.image_count} label files "
+              f"({time.perf_counter() - start:.2f} s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Materializes a selected subset of dataset files into a new directory.
+
+Balanced subsets usually live on the same filesystem as the full dataset, so
+duplicating gigabytes of JPEGs is rarely necessary. Files can instead be
+hardlinked, reflinked (copy-on-write clones, on filesystems such as Btrfs or
+XFS), symlinked, or not materialized at all: a manifest of image paths can be
+handed straight to the YOLO trainer, which finds each label by swapping
+'images' for 'labels' in the image path.
+"""
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+from tqdm import tqdm
+
+# Reflinks use a Linux ioctl; elsewhere they fall back to copies.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MATERIALIZE_MODES = ('copy', 'hardlink', 'reflink', 'symlink', 'manifest')
+
+# ioctl request that clones one file's extents into another (linux/fs.h).
+FICLONE = 0x40049409
+
+# Errors meaning a link or clone is not possible here, so the file is copied instead.
+_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EMLINK}
+
+
+def _reflink(src: Path, dst: Path):
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported on this platform")
+    with open(src, 'rb') as f_src, open(dst, 'wb') as f_dst:
+        fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+
+
+def _materialize(src: Path, dst: Path, mode: str) -> str:
+    """Creates `dst` from `src`, returning how it was done ('copy' if the requested mode was unsupported)."""
+    if os.path.lexists(dst):
+        os.unlink(dst)
+    try:
+        if mode == 'hardlink':
+            os.link(src, dst)
+            return mode
+        if mode == 'reflink':
+            _reflink(src, dst)
+            return mode
+        if mode == 'symlink':
+            os.symlink(os.path.abspath(src), dst)
+            return mode
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED:
+            raise
+    shutil.copyfile(src, dst)
+    return 'copy'
+
+
+def materialize_files(pairs: List[Tuple[Path, Path]], mode: str = 'hardlink', workers: int = 16,
+                      desc: str = "Materializing files") -> Counter:
+    """
+    Creates every destination of the (source, destination) `pairs` with a pool
+    of `workers` threads, falling back to a copy wherever `mode` is not
+    supported (e.g. hardlinks across filesystems).
+
+    Returns:
+        A Counter of how many files were created with each method.
+    """
+    if mode not in MATERIALIZE_MODES or mode == 'manifest':
+        raise ValueError(f"Cannot materialize files with mode '{mode}'")
+
+    methods = Counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda pair: _materialize(pair[0], pair[1], mode), pairs)
+        for method in tqdm(results, total=len(pairs), desc=desc):
+            methods[method] += 1
+    return methods
+
+
+def write_manifest(image_paths: List[Path], manifest_path: Path):
+    """Writes the absolute paths of `image_paths`, one per line, as a YOLO image list file."""
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        f.writelines(f"{os.path.abspath(path)}\n" for path in sorted(image_paths))
@@ -1,8 +1,12 @@
+from __future__ import annotations
+
 import os
-import random
-import shutil
-from collections import defaultdict
-from tqdm import tqdm
+from pathlib import Path
+from typing import Set
+
+from balanced_sampler import BalancedSampler, class_targets
+from label_index import load_label_index
+from materialize import materialize_files, write_manifest
 
 # Path to the original BDD100K *validation* JPEG images
 image_dir = "./datasets/bdd100k/images/100k/val"
@@ -44,51 +48,38 @@ sampling_targets = {
     "traffic sign": 1400,
 }
 
-print("Scanning validation labels and building an image→classes map...")
-
-image_to_classes = defaultdict(set)
-all_label_files = [f for f in os.listdir(yolo_label_dir) if f.endswith(".txt")]
+# 'greedy' meets the targets with as few images as possible, so there is less to
+# copy; 'random' samples every class independently. Set a seed for a
+# reproducible subset.
+sampling_strategy = "greedy"
+seed = None
 
-for filename in tqdm(all_label_files, desc="Reading *.txt files"):
-    image_name = filename.replace(".txt", ".jpg")
+# How the chosen files reach the balanced folder: "hardlink", "reflink" or
+# "symlink" (each falling back to a copy where unsupported), "copy", or
+# "manifest" to only write a val.txt image list for the trainer.
+materialize_mode = "hardlink"
 
-    # Each line in a YOLO label file looks like:
-    # <class_id> <x_center> <y_center> <width> <height>
-    with open(os.path.join(yolo_label_dir, filename), "r") as f:
-        for line in f:
-            try:
-                class_id = int(line.split()[0])
-                class_name = class_map_reverse.get(class_id)
-                if class_name:
-                    image_to_classes[image_name].add(class_name)
-            except (ValueError, IndexError):
-                # Ignore malformed lines instead of crashing
-                continue
+print("Loading the validation label index...")
 
-print(f"Found labels for {len(image_to_classes):,} validation images.")
+# The index parses every YOLO label file once and caches the result, so
+# re-running this script does not re-read the *.txt* files.
+index = load_label_index(yolo_label_dir)
 
-print("Selecting a balanced set of validation images...")
+print(f"Found labels for {index.image_count:,} validation images.")
 
-final_image_set: set[str] = set()
+print(f"Selecting a balanced set of validation images ({sampling_strategy})...")
 
-for class_name, target_count in sampling_targets.items():
-    # Grab every image containing *at least one* instance of this class
-    images_with_class = [
-        img for img, classes in image_to_classes.items()
-        if class_name in classes
-    ]
+sampler = BalancedSampler.from_index(index, len(class_map_reverse), seed)
+selected = sampler.select(class_targets(class_map_reverse, sampling_targets), sampling_strategy)
+final_image_set: Set[str] = {str(name) + ".jpg" for name in index.image_names[selected]}
 
-    # If we have more than we need, sample; otherwise keep them all
-    if len(images_with_class) > target_count:
-        selected = random.sample(images_with_class, target_count)
-    else:
-        selected = images_with_class
-
-    final_image_set.update(selected)
+available, covered = sampler.available, sampler.coverage(selected)
+for class_id, class_name in class_map_reverse.items():
+    target_count = sampling_targets.get(class_name, 0)
     print(
         f"  • {class_name:<13} "
-        f"(need ≤{target_count}, found {len(images_with_class)}) → "
-        f"using {len(selected)}"
+        f"(need ≥{min(target_count, available[class_id])}, found {available[class_id]}) → "
+        f"using {covered[class_id]}"
     )
 
 print(
@@ -96,7 +87,20 @@ print(
     f"{len(final_image_set):,}"
 )
 
-print("Copying the chosen images and labels...")
+# Only materialize images whose label exists too.
+chosen = [
+    image_name for image_name in sorted(final_image_set)
+    if os.path.exists(os.path.join(image_dir, image_name))
+    and os.path.exists(os.path.join(yolo_label_dir, image_name.replace(".jpg", ".txt")))
+]
+
+if materialize_mode == "manifest":
+    manifest_path = Path(output_dir) / "val.txt"
+    write_manifest([Path(image_dir) / image_name for image_name in chosen], manifest_path)
+    print(f"Wrote the balanced validation image list to '{manifest_path}'.")
+    raise SystemExit
+
+print(f"Materializing the chosen images and labels ({materialize_mode})...")
 
 # Destination directories:
 balanced_img_dir = os.path.join(output_dir, "images/val")
@@ -104,23 +108,14 @@ balanced_lbl_dir = os.path.join(output_dir, "labels/val")
 os.makedirs(balanced_img_dir, exist_ok=True)
 os.makedirs(balanced_lbl_dir, exist_ok=True)
 
-for image_name in tqdm(final_image_set, desc="Copying"):
-    # Source paths
-    src_img_path = os.path.join(image_dir, image_name)
-    src_lbl_path = os.path.join(
-        yolo_label_dir, image_name.replace(".jpg", ".txt")
-    )
-
-    # Destination paths
-    dst_img_path = os.path.join(balanced_img_dir, image_name)
-    dst_lbl_path = os.path.join(
-        balanced_lbl_dir, image_name.replace(".jpg", ".txt")
-    )
+pairs = []
+for image_name in chosen:
+    label_name = image_name.replace(".jpg", ".txt")
+    pairs.append((os.path.join(image_dir, image_name), os.path.join(balanced_img_dir, image_name)))
+    pairs.append((os.path.join(yolo_label_dir, label_name), os.path.join(balanced_lbl_dir, label_name)))
 
-    # Only copy if both image *and* its label exist
-    if os.path.exists(src_img_path) and os.path.exists(src_lbl_path):
-        shutil.copyfile(src_img_path, dst_img_path)
-        shutil.copyfile(src_lbl_path, dst_lbl_path)
+methods = materialize_files(pairs, materialize_mode)
+print(f"Files created by method: {dict(methods)}")
 
 print(
     f"All done! Your balanced validation split lives in "
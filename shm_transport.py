@@ -0,0 +1,245 @@
+"""
+Same-host frame transport over a shared-memory ring buffer.
+
+The client copies each frame once into a slot of a shared-memory segment it
+owns and sends the server only a small slot descriptor over ZMQ, in place of
+the pixel payload (the frame header carries FLAG_SHARED_MEMORY). The server
+reads the pixels straight out of the segment, so a 3.7 MB frame is never
+copied through a socket.
+
+Segment layout (little-endian, every block 64-byte aligned):
+
+    segment header  magic, version, slot_count, slot_capacity
+    slot 0          sequence, size, then slot_capacity bytes of pixels
+    slot 1          ...
+
+Slots are owned by the client from `acquire` until the server's reply for
+the frame arrives (or the reply times out). Each slot's sequence number
+works as a seqlock: it turns odd as soon as the client acquires the slot,
+before any pixel is overwritten, and even again when the frame is
+published, which the descriptor repeats. The server rejects odd sequences
+and checks the sequence again after reading, so a slot that was reused for
+a newer frame while the server still held it is detected instead of read
+torn.
+
+Requires Python 3.8+ (multiprocessing.shared_memory) on both ends, and both
+processes must share an IPC namespace (e.g. `docker run --ipc=host`).
+"""
+import struct
+import threading
+import uuid
+
+SEGMENT_MAGIC = b"PSHM"
+SEGMENT_VERSION = 1
+ALIGNMENT = 64
+
+# magic, version, slot_count, slot_capacity
+SEGMENT_HEADER = struct.Struct("<4sIIQ")
+# sequence (odd while the client is writing), size
+SLOT_HEADER = struct.Struct("<QQ")
+# slot index, sequence; followed by the UTF-8 segment name
+DESCRIPTOR = struct.Struct("<IQ")
+
+
+def _aligned(size):
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def _shared_memory():
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        raise RuntimeError("The shared-memory transport requires Python 3.8 or newer") from None
+    return shared_memory
+
+
+def _attach(name):
+    """Opens an existing segment without letting this process's resource tracker unlink it on exit."""
+    shared_memory = _shared_memory()
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching always registers the segment with the
+        # resource tracker, which would destroy the owner's segment on exit.
+        from multiprocessing import resource_tracker
+        segment = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+
+class SharedFrameSlot:
+    """One slot of a SharedFrameRing, with the same fill interface as frame_protocol.FrameSlot."""
+
+    def __init__(self, ring, index, offset, capacity):
+        self.ring = ring
+        self.index = index
+        self.offset = offset
+        self.capacity = capacity
+        self.size = 0
+        self.sequence = 0
+
+    @property
+    def view(self):
+        start = self.offset + SLOT_HEADER.size
+        return self.ring.buffer[start:start + self.size]
+
+    def begin_write(self):
+        """Makes the sequence odd, invalidating the published frame before its pixels are overwritten."""
+        if self.sequence % 2 == 0:
+            self.sequence += 1
+            SLOT_HEADER.pack_into(self.ring.buffer, self.offset, self.sequence, self.size)
+
+    def reserve(self, size):
+        """Sizes the slot for `size` bytes and returns a writable view of them."""
+        if size > self.capacity:
+            raise ValueError(f"Frame of {size} bytes does not fit a {self.capacity}-byte shared-memory slot")
+        self.begin_write()
+        self.size = size
+        return self.view
+
+    def fill(self, data):
+        self.reserve(len(data))[:] = data
+
+    def publish(self):
+        """Marks the slot's contents as a new frame and returns the descriptor to send for it."""
+        self.begin_write()
+        self.sequence += 1
+        SLOT_HEADER.pack_into(self.ring.buffer, self.offset, self.sequence, self.size)
+        return DESCRIPTOR.pack(self.index, self.sequence) + self.ring.name.encode()
+
+
+class SharedFrameRing:
+    """
+    A fixed ring of frame slots in a shared-memory segment created by the client.
+
+    Has the same acquire/release interface as frame_protocol.FrameBufferRing,
+    but slots are never handed to ZMQ: the caller releases a slot once the
+    server has replied for the frame in it.
+    """
+
+    def __init__(self, slot_count, slot_capacity):
+        self.slot_capacity = _aligned(slot_capacity)
+        stride = _aligned(SLOT_HEADER.size + self.slot_capacity)
+        header_size = _aligned(SEGMENT_HEADER.size)
+
+        self._segment = _shared_memory().SharedMemory(
+            name=f"perception-{uuid.uuid4().hex[:16]}", create=True, size=header_size + slot_count * stride
+        )
+        self.name = self._segment.name
+        self.buffer = self._segment.buf
+        SEGMENT_HEADER.pack_into(self.buffer, 0, SEGMENT_MAGIC, SEGMENT_VERSION, slot_count, self.slot_capacity)
+
+        self._slots = [
+            SharedFrameSlot(self, index, header_size + index * stride, self.slot_capacity)
+            for index in range(slot_count)
+        ]
+        self._owned = [False] * slot_count
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Returns a free SharedFrameSlot, or None if every slot is still in use."""
+        with self._lock:
+            for _ in range(len(self._slots)):
+                index = self._next
+                self._next = (index + 1) % len(self._slots)
+                if not self._owned[index]:
+                    self._owned[index] = True
+                    slot = self._slots[index]
+                    break
+            else:
+                return None
+        slot.begin_write()
+        return slot
+
+    def release(self, slot):
+        with self._lock:
+            self._owned[slot.index] = False
+
+    @property
+    def in_use(self):
+        with self._lock:
+            return sum(self._owned)
+
+    def close(self):
+        """Detaches from and destroys the segment; the server keeps its mapping until it closes it."""
+        self.buffer = None
+        try:
+            self._segment.close()
+        except BufferError:
+            # A frame view is still referenced somewhere; the mapping goes away with it.
+            pass
+        self._segment.unlink()
+
+
+class SharedFrame:
+    """A frame in a client's segment, as seen by the server."""
+
+    def __init__(self, segment, offset, sequence, size):
+        self._segment = segment
+        self._offset = offset
+        self.sequence = sequence
+        self.view = segment.buf[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + size]
+
+    def intact(self):
+        """True if the client has not started reusing the slot since the frame was published."""
+        sequence, _ = SLOT_HEADER.unpack_from(self._segment.buf, self._offset)
+        return sequence == self.sequence
+
+
+class SharedFrameReader:
+    """
+    Server side of the transport: resolves slot descriptors to frame views,
+    attaching to each client's segment on first use.
+    """
+
+    def __init__(self, max_segments=32):
+        self.max_segments = max_segments
+        self._segments = {}
+
+    def read(self, descriptor):
+        """Returns the SharedFrame a descriptor refers to. Raises ValueError if it is stale or invalid."""
+        if len(descriptor) <= DESCRIPTOR.size:
+            raise ValueError("Shared-memory descriptor is too short")
+        index, sequence = DESCRIPTOR.unpack_from(descriptor)
+        name = bytes(descriptor[DESCRIPTOR.size:]).decode()
+        if sequence % 2:
+            raise ValueError("Shared-memory descriptor refers to a frame that was never published")
+
+        segment, slot_count, stride, header_size = self._segment(name)
+        if index >= slot_count:
+            raise ValueError(f"Shared-memory slot {index} out of range")
+        offset = header_size + index * stride
+        current, size = SLOT_HEADER.unpack_from(segment.buf, offset)
+        if current != sequence:
+            raise ValueError(f"Shared-memory slot {index} was reused before the frame was read")
+        return SharedFrame(segment, offset, sequence, size)
+
+    def close(self):
+        for segment, *_ in self._segments.values():
+            segment.close()
+        self._segments.clear()
+
+    def _segment(self, name):
+        cached = self._segments.get(name)
+        if cached is not None:
+            return cached
+
+        try:
+            segment = _attach(name)
+        except FileNotFoundError:
+            raise ValueError(f"Shared-memory segment '{name}' does not exist") from None
+        magic, version, slot_count, slot_capacity = SEGMENT_HEADER.unpack_from(segment.buf, 0)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            segment.close()
+            raise ValueError(f"'{name}' is not a version {SEGMENT_VERSION} frame segment")
+
+        # Clients that have gone away leave their segments mapped; drop the oldest.
+        if len(self._segments) >= self.max_segments:
+            oldest = next(iter(self._segments))
+            self._segments.pop(oldest)[0].close()
+
+        cached = self._segments[name] = (
+            segment, slot_count, _aligned(SLOT_HEADER.size + slot_capacity), _aligned(SEGMENT_HEADER.size)
+        )
+        return cached
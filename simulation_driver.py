@@ -0,0 +1,97 @@
+import random
+import time
+
+
+class SynchronousDriver:
+    """
+    Runs CARLA in synchronous mode with a fixed timestep, advancing the world
+    only as fast as the inference pipeline consumes frames.
+
+    Every `world.tick()` produces exactly one frame per camera. Before the
+    next tick the driver waits until those frames have reached the streamers
+    and until each streamer's backlog leaves room for another tick's worth of
+    frames, so no frame is ever dropped and the simulated time between frames
+    is always `fixed_delta_seconds`. Together with the seeded spawn selection
+    this makes throughput measurements reproducible between runs.
+
+    Use as a context manager, or pair `enable` with `restore`, so the world's
+    original settings come back; a server left in synchronous mode freezes as
+    soon as this client exits.
+    """
+
+    def __init__(self, client, world, fixed_delta_seconds=0.05, seed=None, tick_timeout=10.0):
+        self.client = client
+        self.world = world
+        self.fixed_delta_seconds = fixed_delta_seconds
+        self.seed = seed
+        self.tick_timeout = tick_timeout
+        self.rng = random.Random(seed)
+        self._original_settings = None
+
+        self.ticks = 0
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.restore()
+        return False
+
+    def enable(self):
+        """Switches the world and traffic manager to synchronous, fixed-step mode."""
+        self._original_settings = self.world.get_settings()
+        settings = self.world.get_settings()
+        settings.synchronous_mode = True
+        settings.fixed_delta_seconds = self.fixed_delta_seconds
+        self.world.apply_settings(settings)
+
+        traffic_manager = self.client.get_trafficmanager()
+        traffic_manager.set_synchronous_mode(True)
+        if self.seed is not None:
+            traffic_manager.set_random_device_seed(self.seed)
+        return self
+
+    def restore(self):
+        """Puts back the world settings that were active before `enable`."""
+        if self._original_settings is None:
+            return
+        self.client.get_trafficmanager().set_synchronous_mode(False)
+        self.world.apply_settings(self._original_settings)
+        self._original_settings = None
+
+    def select_spawn_points(self, count):
+        """Picks `count` spawn points reproducibly from the driver's seed."""
+        spawn_points = self.world.get_map().get_spawn_points()
+        return self.rng.sample(spawn_points, count)
+
+    def run(self, streamer_loads, max_ticks=None):
+        """
+        Ticks the world until `max_ticks` is reached (or forever).
+
+        Args:
+            streamer_loads: (streamer, cameras) pairs giving how many camera
+                frames each streamer receives per tick.
+            max_ticks: Number of ticks to run, or None to run until interrupted.
+        """
+        start = time.perf_counter()
+        try:
+            while max_ticks is None or self.ticks < max_ticks:
+                targets = [streamer.submitted + cameras for streamer, cameras in streamer_loads]
+                frame = self.world.tick(self.tick_timeout)
+
+                for (streamer, _), target in zip(streamer_loads, targets):
+                    if not streamer.wait_for_submitted(target, self.tick_timeout):
+                        raise RuntimeError(f"Camera frames for world frame {frame} never arrived")
+
+                for streamer, cameras in streamer_loads:
+                    if not streamer.wait_for_backlog(max(streamer.max_in_flight - cameras, 0), self.tick_timeout):
+                        raise RuntimeError(f"Inference server stalled at world frame {frame}")
+
+                self.ticks += 1
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    @property
+    def ticks_per_second(self):
+        return self.ticks / self.elapsed if self.elapsed else 0.0
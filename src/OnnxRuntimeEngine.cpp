@@ -1,5 +1,19 @@
 #include "perception/OnnxRuntimeEngine.h"
+#include <algorithm>
+#include <chrono>
+#include <cmath>
 #include <iostream>
+#include <opencv2/imgproc.hpp>
+
+using Clock = std::chrono::steady_clock;
+
+// Milliseconds since `start`, advancing `start` to now so consecutive stages can be timed.
+static double lap_ms(Clock::time_point& start) {
+    Clock::time_point now = Clock::now();
+    double elapsed = std::chrono::duration<double, std::milli>(now - start).count();
+    start = now;
+    return elapsed;
+}
 
 OnnxRuntimeEngine::OnnxRuntimeEngine(const std::string& model_path) {
     try {
@@ -11,24 +25,51 @@ OnnxRuntimeEngine::OnnxRuntimeEngine(const std::string& model_path) {
     }
 }
 
-void OnnxRuntimeEngine::process_frame(cv::Mat& image) {
-    cv::Mat blob;
+float OnnxRuntimeEngine::letterbox(const cv::Mat& image, cv::Point2f& pad) {
+    float scale = std::min(INPUT_WIDTH / image.cols, INPUT_HEIGHT / image.rows);
+    cv::Size new_size(std::round(image.cols * scale), std::round(image.rows * scale));
+    pad = cv::Point2f((int(INPUT_WIDTH) - new_size.width) / 2, (int(INPUT_HEIGHT) - new_size.height) / 2);
+
+    // Grey (114) padding, as used by ultralytics during training. The window is
+    // overwritten every frame, so the padding only needs repainting when it moves.
+    cv::Rect window_rect(int(pad.x), int(pad.y), new_size.width, new_size.height);
+    if (this->canvas.empty() || window_rect != this->window_rect) {
+        this->canvas.create(int(INPUT_HEIGHT), int(INPUT_WIDTH), CV_8UC3);
+        this->canvas.setTo(cv::Scalar(114, 114, 114));
+        this->window_rect = window_rect;
+    }
+    cv::Mat window = this->canvas(window_rect);
+    if (new_size == image.size()) {
+        image.copyTo(window);
+    } else {
+        cv::resize(image, this->resized, new_size, 0, 0, cv::INTER_LINEAR);
+        this->resized.copyTo(window);
+    }
+    return scale;
+}
+
+std::vector<Detection> OnnxRuntimeEngine::process_frame(cv::Mat& image, StageTimings& timings) {
     std::vector<cv::Mat> outputs;
+    Clock::time_point stage_start = Clock::now();
 
-    cv::dnn::blobFromImage(image, blob, 1./255.,
-        cv::Size(INPUT_WIDTH, INPUT_HEIGHT), cv::Scalar(), true, false);
+    // Letterbox instead of stretching so objects keep the proportions the model was trained on.
+    cv::Point2f pad;
+    float scale = letterbox(image, pad);
+    timings.letterbox_ms = lap_ms(stage_start);
+    // Writes into the member blob, whose buffer is reused as long as the input size stays the same.
+    cv::dnn::blobFromImage(this->canvas, this->blob, 1./255., cv::Size(), cv::Scalar(), true, false);
+    timings.blob_ms = lap_ms(stage_start);
 
-    this->net.setInput(blob);
+    this->net.setInput(this->blob);
     this->net.forward(outputs, this->net.getUnconnectedOutLayersNames());
-
-    // Calculate scaling factors
-    float x_factor = image.cols / INPUT_WIDTH;
-    float y_factor = image.rows / INPUT_HEIGHT;
+    timings.forward_ms = lap_ms(stage_start);
 
     // Storage for detections
     std::vector<int> class_ids;
     std::vector<float> confidences;
     std::vector<cv::Rect> boxes;
+    // The same boxes as (x1, y1, x2, y2) in frame pixels, before rounding.
+    std::vector<cv::Vec4f> corners;
 
     // Reshape and transpose the output for easier parsing
     const int dimensions = CLASS_NAMES.size() + 4;
@@ -48,22 +89,31 @@ void OnnxRuntimeEngine::process_frame(cv::Mat& image) {
             confidences.push_back(max_score);
             class_ids.push_back(class_id_point.x);
             float cx = data[0], cy = data[1], w = data[2], h = data[3];
-            int left = int((cx - 0.5 * w) * x_factor);
-            int top = int((cy - 0.5 * h) * y_factor);
-            int width = int(w * x_factor);
-            int height = int(h * y_factor);
-            boxes.push_back(cv::Rect(left, top, width, height));
+            float x1 = (cx - 0.5f * w - pad.x) / scale;
+            float y1 = (cy - 0.5f * h - pad.y) / scale;
+            boxes.push_back(cv::Rect(int(x1), int(y1), int(w / scale), int(h / scale)));
+            corners.push_back(cv::Vec4f(x1, y1, x1 + w / scale, y1 + h / scale));
         }
         data += dimensions;
     }
+    timings.decode_ms = lap_ms(stage_start);
 
     // Apply Non-Maximum Suppression (NMS)
     std::vector<int> indices;
     cv::dnn::NMSBoxes(boxes, confidences, SCORE_THRESHOLD, NMS_THRESHOLD, indices);
+    timings.nms_ms = lap_ms(stage_start);
 
     // Draw the final, filtered bounding boxes
+    std::vector<Detection> detections;
+    detections.reserve(indices.size());
+    const float frame_width = float(image.cols);
+    const float frame_height = float(image.rows);
     for (int idx : indices) {
-        const cv::Rect& box = boxes[idx];
+        // Clip to the frame, as perception.preprocess.scale_boxes does, so both engines agree.
+        const cv::Vec4f& c = corners[idx];
+        float x1 = std::clamp(c[0], 0.0f, frame_width), y1 = std::clamp(c[1], 0.0f, frame_height);
+        float x2 = std::clamp(c[2], 0.0f, frame_width), y2 = std::clamp(c[3], 0.0f, frame_height);
+        cv::Rect box(int(x1), int(y1), int(x2 - x1), int(y2 - y1));
         int class_id = class_ids[idx];
         const std::string& class_name = CLASS_NAMES[class_id];
         cv::Scalar color = (class_name == "person") ? cv::Scalar(0, 0, 255) : cv::Scalar(0, 255, 0);
@@ -71,6 +121,7 @@ void OnnxRuntimeEngine::process_frame(cv::Mat& image) {
         cv::rectangle(image, box, color, 2);
         std::string label = class_name + ": " + cv::format("%.2f", confidences[idx]);
         cv::putText(image, label, cv::Point(box.x, box.y - 5), cv::FONT_HERSHEY_SIMPLEX, 0.5, color, 2);
+        detections.push_back({class_id, class_name, confidences[idx], box});
     }
-
+    return detections;
 }
\ No newline at end of file
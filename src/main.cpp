@@ -1,15 +1,101 @@
 // src/main.cpp
 
+#include <chrono>
+#include <cstdint>
 #include <iostream>
 #include <string>
 #include <vector>
 #include <opencv2/opencv.hpp>
 #include <zmq.hpp>
+#include <zlib.h>
+#include <lz4.h>
 #include "json.hpp"
 
+#include "perception/FrameProtocol.h"
 #include "perception/OnnxRuntimeEngine.h"
 
 using json = nlohmann::json;
+using Clock = std::chrono::steady_clock;
+
+static double elapsed_ms(Clock::time_point start) {
+    return std::chrono::duration<double, std::milli>(Clock::now() - start).count();
+}
+
+// Unix-epoch nanoseconds, the clock the client uses for the header timestamps.
+static uint64_t unix_time_ns() {
+    return std::chrono::duration_cast<std::chrono::nanoseconds>(
+        std::chrono::system_clock::now().time_since_epoch()).count();
+}
+
+static json detections_to_json(const std::vector<Detection>& detections) {
+    json result = json::array();
+    for (const Detection& detection : detections) {
+        result.push_back({
+            {"class_id", detection.class_id},
+            {"class", detection.class_name},
+            {"confidence", detection.confidence},
+            {"box", {detection.box.x, detection.box.y, detection.box.width, detection.box.height}}
+        });
+    }
+    return result;
+}
+
+// Turns a frame payload into a BGR image according to the header's encoding.
+static cv::Mat decode_frame(const frame_protocol::FrameHeader& header, zmq::message_t& payload) {
+    const int rows = header.height;
+    const int cols = header.width;
+    const size_t bgr_size = size_t(rows) * cols * 3;
+    cv::Mat bgr_image;
+
+    switch (header.encoding) {
+    case frame_protocol::ENCODING_RAW: {
+        if (payload.size() != size_t(rows) * cols * 4) {
+            throw std::runtime_error("BGRA payload size does not match frame dimensions");
+        }
+        cv::Mat bgra_image(rows, cols, CV_8UC4, payload.data());
+        cv::cvtColor(bgra_image, bgr_image, cv::COLOR_BGRA2BGR);
+        break;
+    }
+    case frame_protocol::ENCODING_BGR:
+        if (payload.size() != bgr_size) {
+            throw std::runtime_error("BGR payload size does not match frame dimensions");
+        }
+        // Wraps the message buffer directly; the message outlives the image.
+        bgr_image = cv::Mat(rows, cols, CV_8UC3, payload.data());
+        break;
+    case frame_protocol::ENCODING_ZLIB: {
+        bgr_image.create(rows, cols, CV_8UC3);
+        uLongf dest_len = bgr_size;
+        int status = uncompress(bgr_image.data, &dest_len,
+                                static_cast<const Bytef*>(payload.data()), payload.size());
+        if (status != Z_OK || dest_len != bgr_size) {
+            throw std::runtime_error("zlib decompression failed");
+        }
+        break;
+    }
+    case frame_protocol::ENCODING_LZ4: {
+        bgr_image.create(rows, cols, CV_8UC3);
+        int decoded = LZ4_decompress_safe(static_cast<const char*>(payload.data()),
+                                          reinterpret_cast<char*>(bgr_image.data),
+                                          int(payload.size()), int(bgr_size));
+        if (decoded != int(bgr_size)) {
+            throw std::runtime_error("LZ4 decompression failed");
+        }
+        break;
+    }
+    case frame_protocol::ENCODING_JPEG: {
+        cv::Mat encoded(1, int(payload.size()), CV_8UC1, payload.data());
+        bgr_image = cv::imdecode(encoded, cv::IMREAD_COLOR);
+        if (bgr_image.empty() || bgr_image.rows != rows || bgr_image.cols != cols) {
+            throw std::runtime_error("JPEG decoding failed");
+        }
+        break;
+    }
+    default:
+        throw std::runtime_error("Unknown frame encoding: " + std::to_string(header.encoding));
+    }
+    return bgr_image;
+}
 
 int main() {
     OnnxRuntimeEngine engine("models/best.onnx");
@@ -20,26 +106,62 @@ int main() {
     std::cout << "C++ ZMQ Server listening on tcp://*:5555" << std::endl;
 
     while (true) {
-        zmq::message_t metadata_msg;
-        socket.recv(metadata_msg, zmq::recv_flags::none);
-        json metadata = json::parse(static_cast<char*>(metadata_msg.data()), static_cast<char*>(metadata_msg.data()) + metadata_msg.size());
-        
-        int height = metadata["height"];
-        int width = metadata["width"];
+        zmq::message_t header_msg;
+        socket.recv(header_msg, zmq::recv_flags::none);
 
         zmq::message_t image_data_msg;
         socket.recv(image_data_msg, zmq::recv_flags::none);
+        const uint64_t received_ns = unix_time_ns();
+        const Clock::time_point received_at = Clock::now();
 
-        cv::Mat bgra_image(height, width, CV_8UC4, image_data_msg.data());
+        json frame_id = nullptr;
+        json sensor_id = nullptr;
+        // Per-stage durations in milliseconds, returned with the reply.
+        json stages = json::object();
+        std::vector<Detection> detections;
+        // A bad frame (or an OpenCV/ONNX Runtime error on it) is answered with an ERROR
+        // reply; it must never take the server down.
+        try {
+            frame_protocol::FrameHeader header = frame_protocol::parse_header(header_msg.data(), header_msg.size());
+            frame_id = header.frame;
+            sensor_id = header.sensor_id;
+            if (header.flags & frame_protocol::FLAG_SHARED_MEMORY) {
+                throw std::runtime_error("Shared-memory frames are only supported by inference_server.py");
+            }
+            if (image_data_msg.size() != header.payload_size) {
+                throw std::runtime_error("Payload size does not match frame header");
+            }
+            // Only meaningful when the client and server clocks are synchronised (e.g. NTP).
+            if (header.send_ns != 0) {
+                stages["transport"] = (double(received_ns) - double(header.send_ns)) / 1e6;
+            }
+            Clock::time_point decode_start = Clock::now();
+            // For raw frames this is the BGRA -> BGR cvtColor.
+            cv::Mat bgr_image = decode_frame(header, image_data_msg);
+            stages["frame_decode"] = elapsed_ms(decode_start);
 
-        cv::Mat bgr_image;
-        cv::cvtColor(bgra_image, bgr_image, cv::COLOR_BGRA2BGR);
-        
-        std::cout << "Received frame " << metadata["frame"] << ". Processing..." << std::endl;
+            std::cout << "Received frame " << frame_id << " from sensor " << sensor_id << ". Processing..." << std::endl;
 
-        engine.process_frame(bgr_image);
+            StageTimings timings;
+            detections = engine.process_frame(bgr_image, timings);
+            stages["letterbox"] = timings.letterbox_ms;
+            stages["blob"] = timings.blob_ms;
+            stages["forward"] = timings.forward_ms;
+            stages["output_decode"] = timings.decode_ms;
+            stages["nms"] = timings.nms_ms;
+        } catch (const std::exception& e) {
+            std::cerr << "Rejecting frame: " << e.what() << std::endl;
+            json reply = {{"sensor", sensor_id}, {"frame", frame_id}, {"status", "ERROR"}, {"error", e.what()}};
+            std::string reply_str = reply.dump();
+            socket.send(zmq::buffer(reply_str), zmq::send_flags::none);
+            continue;
+        }
+        stages["server"] = elapsed_ms(received_at);
 
-        std::string reply_str = "OK";
+        // Echo the sensor and frame ids so pipelined clients can match replies to frames.
+        json reply = {{"sensor", sensor_id}, {"frame", frame_id}, {"status", "OK"},
+                      {"stages", stages}, {"detections", detections_to_json(detections)}};
+        std::string reply_str = reply.dump();
         socket.send(zmq::buffer(reply_str), zmq::send_flags::none);
     }
 
@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+# The client modules live at the repository root and the dataset scripts
+# import each other as top-level modules from scripts/.
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT, ROOT / 'scripts'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from balanced_sampler import SAMPLING_STRATEGIES, BalancedSampler, class_targets
+
+
+@pytest.fixture
+def present():
+    """5000 images x 10 classes, with some classes far rarer than others."""
+    rng = np.random.default_rng(0)
+    frequencies = np.array([0.6, 0.1, 0.9, 0.3, 0.05, 0.002, 0.05, 0.04, 0.4, 0.5])
+    return rng.random((5000, len(frequencies))) < frequencies
+
+
+TARGETS = np.array([500, 300, 500, 400, 200, 50, 200, 150, 400, 400])
+
+
+@pytest.mark.parametrize("strategy", SAMPLING_STRATEGIES)
+def test_same_seed_gives_same_subset(present, strategy):
+    first = BalancedSampler(present, seed=42).select(TARGETS, strategy)
+    second = BalancedSampler(present, seed=42).select(TARGETS, strategy)
+
+    np.testing.assert_array_equal(first, second)
+    assert not np.array_equal(first, BalancedSampler(present, seed=7).select(TARGETS, strategy))
+
+
+@pytest.mark.parametrize("strategy", SAMPLING_STRATEGIES)
+def test_subset_meets_per_class_targets(present, strategy):
+    sampler = BalancedSampler(present, seed=42)
+
+    selected = sampler.select(TARGETS, strategy)
+
+    assert np.all(np.diff(selected) > 0)
+    # Classes with fewer images than their target contribute all of them.
+    assert np.all(sampler.coverage(selected) >= np.minimum(TARGETS, sampler.available))
+    assert sampler.available[5] < TARGETS[5] and sampler.coverage(selected)[5] == sampler.available[5]
+
+
+def test_greedy_needs_fewer_images_than_random(present):
+    greedy = BalancedSampler(present, seed=42).select(TARGETS, 'greedy')
+    random = BalancedSampler(present, seed=42).select(TARGETS, 'random')
+
+    assert len(greedy) < len(random)
+
+
+def test_zero_targets_select_nothing(present):
+    assert len(BalancedSampler(present, seed=0).select(np.zeros(10, dtype=np.int64), 'random')) == 0
+    assert len(BalancedSampler(present, seed=0).select(np.zeros(10, dtype=np.int64), 'greedy')) == 0
+
+
+def test_unknown_strategy_is_rejected(present):
+    with pytest.raises(ValueError):
+        BalancedSampler(present).select(TARGETS, 'optimal')
+
+
+def test_class_targets_by_name():
+    targets = class_targets({0: 'person', 2: 'car', 3: 'truck'}, {'car': 100, 'person': 50})
+
+    np.testing.assert_array_equal(targets, [50, 0, 100, 0])
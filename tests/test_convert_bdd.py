@@ -0,0 +1,102 @@
+import json
+import os
+import re
+
+import pytest
+
+from convert_bdd import MANIFEST_NAME, convert_to_yolo
+
+CAR = {'category': 'car', 'box2d': {'x1': 100, 'y1': 100, 'x2': 228, 'y2': 172}}
+PERSON = {'category': 'person', 'box2d': {'x1': 640, 'y1': 360, 'x2': 704, 'y2': 488}}
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    source, output = tmp_path / 'json', tmp_path / 'labels'
+    source.mkdir()
+    return source, output
+
+
+def write_json(source, name, objects):
+    path = source / f'{name}.json'
+    path.write_text(json.dumps({'name': name, 'frames': [{'objects': objects}]}))
+    return path
+
+
+def convert(dirs, capsys):
+    """Runs an incremental conversion and returns how many JSON files were reconverted."""
+    convert_to_yolo(*dirs, workers=1)
+    return int(re.search(r'Reconverted (\d+) of', capsys.readouterr().out).group(1))
+
+
+def test_first_run_converts_every_file(dirs, capsys):
+    source, output = dirs
+    write_json(source, 'a', [CAR])
+    write_json(source, 'b', [CAR, PERSON])
+
+    assert convert(dirs, capsys) == 2
+    assert (output / 'a.txt').read_text() == '2 0.128125 0.188889 0.100000 0.100000'
+    assert len((output / 'b.txt').read_text().splitlines()) == 2
+    assert (output / MANIFEST_NAME).exists()
+
+
+def test_unchanged_files_are_skipped(dirs, capsys):
+    source, output = dirs
+    write_json(source, 'a', [CAR])
+    convert(dirs, capsys)
+    converted_at = (output / 'a.txt').stat().st_mtime_ns
+
+    assert convert(dirs, capsys) == 0
+    assert (output / 'a.txt').stat().st_mtime_ns == converted_at
+
+
+def test_touched_but_identical_file_is_not_rewritten(dirs, capsys):
+    source, output = dirs
+    path = write_json(source, 'a', [CAR])
+    convert(dirs, capsys)
+    converted_at = (output / 'a.txt').stat().st_mtime_ns
+
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert convert(dirs, capsys) == 0
+    assert (output / 'a.txt').stat().st_mtime_ns == converted_at
+    # The new mtime is recorded, so the next run skips the file without hashing it.
+    manifest = json.loads((output / MANIFEST_NAME).read_text())
+    assert manifest['files']['a.json']['mtime_ns'] == stat.st_mtime_ns + 10 ** 9
+
+
+def test_modified_file_is_reconverted(dirs, capsys):
+    source, output = dirs
+    write_json(source, 'a', [CAR])
+    write_json(source, 'b', [CAR])
+    convert(dirs, capsys)
+
+    write_json(source, 'a', [CAR, PERSON])
+    assert convert(dirs, capsys) == 1
+    assert len((output / 'a.txt').read_text().splitlines()) == 2
+
+
+def test_deleted_or_emptied_file_drops_its_labels(dirs, capsys):
+    source, output = dirs
+    write_json(source, 'a', [CAR])
+    path = write_json(source, 'b', [PERSON])
+    write_json(source, 'c', [CAR])
+    convert(dirs, capsys)
+
+    path.unlink()
+    write_json(source, 'c', [])
+    convert(dirs, capsys)
+
+    assert sorted(p.name for p in output.glob('*.txt')) == ['a.txt']
+    assert set(json.loads((output / MANIFEST_NAME).read_text())['files']) == {'a.json', 'c.json'}
+
+
+def test_deleted_label_file_is_rewritten(dirs, capsys):
+    source, output = dirs
+    write_json(source, 'a', [CAR])
+    convert(dirs, capsys)
+    expected = (output / 'a.txt').read_text()
+
+    (output / 'a.txt').unlink()
+    assert convert(dirs, capsys) == 1
+    assert (output / 'a.txt').read_text() == expected
@@ -0,0 +1,72 @@
+import pytest
+import zmq
+
+from frame_router import ShardedStreamer
+
+
+class FakeStreamer:
+    """Stands in for a shard's FrameStreamer with a settable stall and reply count."""
+
+    def __init__(self):
+        self.stalled = 0.0
+        self.acknowledged = 0
+        self.dropped_pending = 0
+
+    def stalled_for(self):
+        return self.stalled
+
+    def drop_pending(self, reason):
+        self.dropped_pending += 1
+
+
+@pytest.fixture
+def router():
+    context = zmq.Context()
+    router = ShardedStreamer(context, ["tcp://127.0.0.1:1", "tcp://127.0.0.1:2"], health_timeout_s=3.0,
+                             retry_interval_s=5.0, max_retry_interval_s=20.0)
+    for shard in router.shards:
+        shard.streamer = FakeStreamer()
+    yield router
+    context.term()
+
+
+def test_failed_shard_is_readmitted_on_a_timer(router):
+    shard = router.shards[0]
+    shard.streamer.stalled = 4.0
+    router._check_health(100.0)
+    assert not shard.healthy
+    assert shard.streamer.dropped_pending == 1
+    assert router.healthy_shards == [router.shards[1]]
+
+    # Frames still outstanding from before the failure do not keep it out of rotation.
+    router._check_health(104.9)
+    assert not shard.healthy
+    router._check_health(105.0)
+    assert shard.healthy
+
+    # It is judged only on the time since it was re-admitted.
+    router._check_health(107.0)
+    assert shard.healthy
+
+
+def test_retry_back_off_doubles_and_resets_on_a_reply(router):
+    shard = router.shards[0]
+    shard.streamer.stalled = 100.0
+    now = 0.0
+    retry_delays = []
+    for _ in range(4):
+        router._check_health(now)
+        assert not shard.healthy
+        retry_delays.append(shard.retry_at - now)
+        now = shard.retry_at
+        router._check_health(now)
+        assert shard.healthy
+        now += 3.5
+    assert retry_delays == [5.0, 10.0, 20.0, 20.0]
+
+    shard.streamer.stalled = 0.0
+    shard.streamer.acknowledged += 1
+    router._check_health(now)
+    assert shard.healthy
+    assert shard.retry_interval == 5.0
+    assert router.shards[1].healthy
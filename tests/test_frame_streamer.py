@@ -0,0 +1,95 @@
+import json
+import threading
+
+import pytest
+import zmq
+
+from frame_codec import FrameEncoder
+from frame_protocol import FrameHeader, unpack_header
+from frame_streamer import FrameStreamer
+
+
+@pytest.fixture
+def server():
+    """A REP server on a background thread that acknowledges every frame."""
+    context = zmq.Context()
+    socket = context.socket(zmq.REP)
+    port = socket.bind_to_random_port("tcp://127.0.0.1")
+    stop = threading.Event()
+
+    def serve():
+        while not stop.is_set():
+            if socket.poll(20):
+                header_bytes, _ = socket.recv_multipart()
+                header = unpack_header(header_bytes)
+                socket.send(json.dumps({"sensor": header.sensor_id, "frame": header.frame, "status": "OK"}).encode())
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield context, f"tcp://127.0.0.1:{port}"
+    stop.set()
+    thread.join()
+    socket.close(linger=0)
+    context.term()
+
+
+class FlakyEncoder(FrameEncoder):
+    """Fails to compress every second frame."""
+
+    def __init__(self):
+        super().__init__("zlib")
+        self.calls = 0
+
+    def compress(self, view, width, height):
+        self.calls += 1
+        if self.calls % 2 == 0:
+            raise RuntimeError("encoder failure")
+        return super().compress(view, width, height)
+
+
+def send_frames(streamer, count):
+    for frame in range(count):
+        header = FrameHeader(frame=frame, width=2, height=2, channels=4, payload_size=16)
+        assert streamer.submit(header, bytes(16))
+        assert streamer.wait_for_backlog(0, timeout=5.0)
+
+
+def test_encoder_errors_drop_the_frame_and_keep_sending(server):
+    context, endpoint = server
+    streamer = FrameStreamer(context, endpoint, policy="queue", frame_size=16, encoder=FlakyEncoder()).start()
+    try:
+        send_frames(streamer, 6)
+    finally:
+        streamer.close()
+    stats = streamer.stats()
+
+    assert stats["acknowledged"] == 3
+    assert stats["dropped_encode_error"] == 3
+
+
+def test_reply_callback_errors_are_counted_and_keep_receiving(server):
+    context, endpoint = server
+
+    def on_reply(reply, latency_ms):
+        raise ValueError("callback failure")
+
+    streamer = FrameStreamer(context, endpoint, policy="queue", frame_size=16, on_reply=on_reply).start()
+    try:
+        send_frames(streamer, 4)
+    finally:
+        streamer.close()
+    stats = streamer.stats()
+
+    assert stats["acknowledged"] == 4
+    assert stats["reply_errors"] == 4
+
+
+def test_submit_raises_once_the_sender_thread_has_stopped(server):
+    context, endpoint = server
+    streamer = FrameStreamer(context, endpoint, frame_size=16).start()
+    streamer._error = zmq.ZMQError(zmq.ETERM)
+    try:
+        with pytest.raises(RuntimeError):
+            streamer.submit(FrameHeader(frame=0, width=2, height=2, channels=4, payload_size=16), bytes(16))
+    finally:
+        streamer.close()
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+import zmq
+
+from frame_protocol import FrameHeader, pack_header
+from inference_server import Broker, WorkerStats
+
+
+@pytest.fixture
+def sockets():
+    context = zmq.Context()
+    frontend = context.socket(zmq.ROUTER)
+    port = frontend.bind_to_random_port("tcp://127.0.0.1")
+    backend = context.socket(zmq.ROUTER)
+    backend.bind_to_random_port("tcp://127.0.0.1")
+    client = context.socket(zmq.DEALER)
+    client.connect(f"tcp://127.0.0.1:{port}")
+    yield frontend, backend, client
+    for socket in (client, frontend, backend):
+        socket.close(linger=0)
+    context.term()
+
+
+def full_sticky_broker(frontend, backend):
+    broker = Broker(frontend, backend, worker_queue=2, sticky=True)
+    for worker in (b"worker-0", b"worker-1"):
+        broker.workers[worker] = WorkerStats()
+        broker.workers[worker].outstanding = broker.worker_queue
+    return broker
+
+
+def test_sticky_broker_rejects_malformed_header_while_workers_are_full(sockets):
+    frontend, backend, client = sockets
+    broker = full_sticky_broker(frontend, backend)
+
+    client.send_multipart([b"", b"not a header", b""])
+    assert frontend.poll(2000)
+    broker._on_frontend(frontend.recv_multipart(copy=False))
+
+    assert client.poll(2000)
+    _, reply = client.recv_multipart()
+    assert json.loads(reply)["status"] == "ERROR"
+    assert all(stats.outstanding == broker.worker_queue for stats in broker.workers.values())
+
+
+def test_sticky_broker_routes_past_the_queue_limit(sockets):
+    frontend, backend, client = sockets
+    broker = full_sticky_broker(frontend, backend)
+
+    header = pack_header(FrameHeader(frame=1, width=2, height=2, channels=4, payload_size=16, sensor_id=3))
+    client.send_multipart([b"", header, bytes(16)])
+    assert frontend.poll(2000)
+    broker._on_frontend(frontend.recv_multipart(copy=False))
+
+    assert sum(stats.outstanding for stats in broker.workers.values()) == 2 * broker.worker_queue + 1
@@ -0,0 +1,58 @@
+import json
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from json_scan import _bounded_map, iter_json_files, list_json_files, merge_counters, scan_json_files
+
+
+def _name(data):
+    return data['name']
+
+
+def _weather(data):
+    return Counter([data['attributes']['weather']])
+
+
+@pytest.fixture
+def label_dir(tmp_path):
+    for i in range(11):
+        data = {'name': f'video{i:02d}', 'attributes': {'weather': 'rainy' if i % 3 == 0 else 'clear'}, 'frames': []}
+        (tmp_path / f'{i:02d}.json').write_text(json.dumps(data))
+    return tmp_path
+
+
+def test_scan_json_files_merges_every_file(label_dir):
+    counts = scan_json_files(list_json_files(str(label_dir)), _weather, merge_counters, Counter(),
+                             workers=2, chunk_size=2)
+
+    assert counts == Counter(rainy=4, clear=7)
+
+
+def test_iter_json_files_yields_every_file_in_order(label_dir):
+    chunks = list(iter_json_files(list_json_files(str(label_dir)), _name, workers=2, chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 2, 2, 2, 1]
+    assert [name for chunk in chunks for name in chunk] == [f'video{i:02d}' for i in range(11)]
+
+
+def test_bounded_map_limits_chunks_ahead_of_the_consumer():
+    lock = threading.Lock()
+    submitted = []
+
+    def work(offset, chunk):
+        with lock:
+            submitted.append(chunk)
+        return [offset + value for value in chunk]
+
+    chunks = [[i] for i in range(20)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = []
+        for result in _bounded_map(pool, work, chunks, 3, 100):
+            # The chunk being consumed plus at most three submitted behind it.
+            assert len(submitted) <= len(results) + 1 + 3
+            results.append(result)
+
+    assert results == [[100 + i] for i in range(20)]
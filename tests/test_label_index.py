@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pytest
+
+import label_index
+from label_index import INDEX_NAME, load_label_index
+
+
+@pytest.fixture
+def label_dir(tmp_path):
+    (tmp_path / 'a.txt').write_text('2 0.5 0.5 0.1 0.1\n0 0.2 0.2 0.05 0.1\n')
+    (tmp_path / 'b.txt').write_text('9 0.1 0.1 0.01 0.02\n')
+    return tmp_path
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Counts how often the index is parsed from the label files rather than loaded from its cache."""
+    calls = []
+    build = label_index.build_label_index
+
+    def counting_build(*args, **kwargs):
+        calls.append(args)
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(label_index, 'build_label_index', counting_build)
+    return calls
+
+
+def test_index_is_built_once_and_then_loaded_from_cache(label_dir, builds):
+    index = load_label_index(label_dir, workers=1)
+    cached = load_label_index(label_dir, workers=1)
+
+    assert len(builds) == 1
+    assert (label_dir / INDEX_NAME).exists()
+    assert list(cached.image_names) == ['a', 'b']
+    np.testing.assert_array_equal(cached.image_ids, index.image_ids)
+    np.testing.assert_array_equal(cached.class_ids, [2, 0, 9])
+    np.testing.assert_allclose(cached.boxes[2], [0.1, 0.1, 0.01, 0.02])
+
+
+def test_added_file_rebuilds_index(label_dir, builds):
+    load_label_index(label_dir, workers=1)
+
+    (label_dir / 'c.txt').write_text('4 0.5 0.5 0.2 0.2\n')
+    index = load_label_index(label_dir, workers=1)
+
+    assert len(builds) == 2
+    assert list(index.image_names) == ['a', 'b', 'c']
+    assert index.class_counts(10)[4] == 1
+
+
+def test_removed_file_rebuilds_index(label_dir, builds):
+    load_label_index(label_dir, workers=1)
+
+    (label_dir / 'b.txt').unlink()
+    index = load_label_index(label_dir, workers=1)
+
+    assert len(builds) == 2
+    assert list(index.image_names) == ['a']
+    assert 9 not in index.class_ids
+
+
+def test_rewritten_file_rebuilds_index(label_dir, builds):
+    load_label_index(label_dir, workers=1)
+
+    path = label_dir / 'b.txt'
+    mtime_ns = path.stat().st_mtime_ns
+    path.write_text('7 0.1 0.1 0.01 0.02\n')
+    os.utime(path, ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))
+    index = load_label_index(label_dir, workers=1)
+
+    assert len(builds) == 2
+    np.testing.assert_array_equal(index.class_ids, [2, 0, 7])
+
+
+def test_rebuild_flag_ignores_cache(label_dir, builds):
+    load_label_index(label_dir, workers=1)
+    load_label_index(label_dir, rebuild=True, workers=1)
+
+    assert len(builds) == 2
@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+import pytest
+
+from perception.postprocess import decode_batch
+
+NUM_CLASSES = 10
+SCORE_THRESHOLD = 0.5
+IOU_THRESHOLD = 0.45
+
+
+def random_outputs(rng, batch=3, anchors=500):
+    """Raw YOLOv8-style outputs with heavily overlapping boxes and sigmoid class scores."""
+    centres = rng.uniform(0, 160, size=(batch, 2, anchors))
+    sizes = rng.uniform(40, 120, size=(batch, 2, anchors))
+    scores = 1 / (1 + np.exp(-rng.normal(-1.0, 1.5, size=(batch, NUM_CLASSES, anchors))))
+    return np.concatenate([centres, sizes, scores], axis=1).astype(np.float32)
+
+
+def reference_decode(output):
+    """
+    Decodes one image the way the baseline did, with cv2.dnn.NMSBoxes per
+    class; returns the kept (class id, anchor) pairs.
+    """
+    predictions = output.T
+    class_ids = predictions[:, 4:].argmax(axis=1)
+    scores = predictions[:, 4:].max(axis=1)
+    kept = set()
+    for class_id in range(NUM_CLASSES):
+        candidates = np.nonzero((class_ids == class_id) & (scores > SCORE_THRESHOLD))[0]
+        if not len(candidates):
+            continue
+        rects = [[float(cx - w / 2), float(cy - h / 2), float(w), float(h)]
+                 for cx, cy, w, h in predictions[candidates, :4]]
+        indices = cv2.dnn.NMSBoxes(rects, scores[candidates].tolist(), SCORE_THRESHOLD, IOU_THRESHOLD)
+        kept.update((class_id, int(candidates[index])) for index in np.asarray(indices).reshape(-1))
+    return kept
+
+
+def anchors_of(boxes, output):
+    """Finds the anchor each decoded (x1, y1, x2, y2) box came from by its centre, up to rounding."""
+    centres = (boxes[:, :2] + boxes[:, 2:]) / 2
+    distances = np.abs(centres[:, None, :] - output[:2].T[None, :, :]).max(axis=-1)
+    assert np.all(distances.min(axis=1) < 1e-3)
+    return distances.argmin(axis=1)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_decode_batch_matches_per_class_nms_boxes(seed):
+    outputs = random_outputs(np.random.default_rng(seed))
+
+    results = decode_batch(outputs, SCORE_THRESHOLD, IOU_THRESHOLD, max_detections=10_000)
+
+    assert len(results) == len(outputs)
+    for output, (boxes, scores, class_ids) in zip(outputs, results):
+        assert np.all(np.diff(scores) <= 0)
+        decoded = set(zip(class_ids.tolist(), anchors_of(boxes, output).tolist()))
+        assert len(decoded) == len(boxes)
+        assert decoded == reference_decode(output)
+
+
+def test_decode_batch_without_detections():
+    outputs = np.zeros((2, 4 + NUM_CLASSES, 50), dtype=np.float32)
+
+    for boxes, scores, class_ids in decode_batch(outputs, SCORE_THRESHOLD, IOU_THRESHOLD):
+        assert boxes.shape == (0, 4) and len(scores) == 0 and len(class_ids) == 0
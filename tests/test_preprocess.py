@@ -0,0 +1,52 @@
+import numpy as np
+
+from perception.preprocess import PAD_VALUE, Letterbox, scale_boxes
+
+
+def bgra_frame(width, height, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, size=(height, width, 4), dtype=np.uint8)
+
+
+def test_rect_letterbox_round_trip():
+    frame = bgra_frame(1280, 720)
+    letterbox = Letterbox(1280, 1280, rect=True)
+
+    blob, (transform,) = letterbox([frame])
+
+    assert blob.shape == (1, 3, 736, 1280)
+    assert (transform.scale, transform.pad_x, transform.pad_y) == (1.0, 0, 8)
+    # Padding rows above and below the frame are grey.
+    pad = np.float32(PAD_VALUE / 255.0)
+    assert np.all(blob[0, :, :8] == pad) and np.all(blob[0, :, 728:] == pad)
+    # The frame itself is RGB, CHW and scaled to [0, 1]; alpha is dropped.
+    expected = frame[:, :, 2::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    np.testing.assert_allclose(blob[0, :, 8:728], expected, atol=1e-6)
+
+    # Boxes in model input coordinates map back to the frame, clipped to it.
+    boxes = np.array([[100, 108, 300, 408], [-50, 0, 1400, 760]], dtype=np.float32)
+    np.testing.assert_allclose(scale_boxes(boxes, transform), [[100, 100, 300, 400], [0, 0, 1280, 720]])
+
+
+def test_square_letterbox_scales_and_centres():
+    frame = bgra_frame(1920, 1080)
+    letterbox = Letterbox(1280, 1280)
+
+    blob, (transform,) = letterbox([frame])
+
+    assert blob.shape == (1, 3, 1280, 1280)
+    assert (transform.pad_x, transform.pad_y) == (0, 280)
+    np.testing.assert_allclose(transform.scale, 2 / 3)
+    boxes = np.array([[0, 280, 1280, 1000], [640, 640, 700, 700]], dtype=np.float32)
+    np.testing.assert_allclose(scale_boxes(boxes, transform), [[0, 0, 1920, 1080], [960, 540, 1050, 630]],
+                               rtol=1e-5)
+
+
+def test_padding_is_repainted_when_geometry_changes():
+    letterbox = Letterbox(1280, 1280)
+    letterbox([bgra_frame(1280, 1280)])
+
+    blob, (transform,) = letterbox([bgra_frame(1280, 720, seed=1)])
+
+    assert transform.pad_y == 280
+    pad = np.float32(PAD_VALUE / 255.0)
+    assert np.all(blob[0, :, :280] == pad) and np.all(blob[0, :, 1000:] == pad)
@@ -0,0 +1,54 @@
+import pytest
+
+from shm_transport import SharedFrameReader, SharedFrameRing
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing(slot_count=1, slot_capacity=64)
+    yield ring
+    ring.close()
+
+
+@pytest.fixture
+def reader():
+    reader = SharedFrameReader()
+    yield reader
+    reader.close()
+
+
+def test_published_frame_is_read_intact(ring, reader):
+    slot = ring.acquire()
+    slot.fill(b"A" * 16)
+    frame = reader.read(slot.publish())
+
+    assert bytes(frame.view) == b"A" * 16
+    assert frame.intact()
+
+
+def test_reusing_slot_while_server_holds_frame_is_detected(ring, reader):
+    slot = ring.acquire()
+    slot.fill(b"A" * 16)
+    frame = reader.read(slot.publish())
+
+    # The reply timed out, so the client reuses the slot while the server still reads it.
+    ring.release(slot)
+    reused = ring.acquire()
+    assert reused is slot
+    assert not frame.intact()
+
+    reused.fill(b"B" * 16)
+    assert not frame.intact()
+    reused.publish()
+    assert not frame.intact()
+
+
+def test_stale_descriptor_of_reused_slot_is_rejected(ring, reader):
+    slot = ring.acquire()
+    descriptor = slot.publish()
+    reader.read(descriptor)
+
+    ring.release(slot)
+    ring.acquire().fill(b"B" * 16)
+    with pytest.raises(ValueError):
+        reader.read(descriptor)